@@ -0,0 +1,303 @@
+# Actividad de envíos en el tiempo: conteos por bucket de minuto, hora, día y semana (hora local
+# America/Bogota; las semanas empiezan el lunes) y por facultad/carrera, en la base SQLite local
+# (compartida entre workers). agregados suma cada respuesta aquí en la misma transacción que el
+# resto de los agregados (mismo control de duplicados por $id) y reconstruir()/reemplazar() los
+# recalculan desde el export. Los buckets finos se podan: minutos tras ACTIVIDAD_MINUTOS_HORAS y
+# horas tras ACTIVIDAD_HORAS_DIAS; días y semanas se conservan.
+import os
+import re
+import time
+import itertools
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    TZ_LOCAL = ZoneInfo("America/Bogota")
+except Exception:
+    TZ_LOCAL = timezone(timedelta(hours=-5))
+
+try:
+    from .sqlite_local import connect
+except ImportError:
+    from sqlite_local import connect
+
+# America/Bogota no tiene horario de verano: UTC-5 fijo (como analisis_datos)
+OFFSET_LOCAL = -5 * 3600
+GRANULARIDADES = {"minuto": 60, "hora": 3600, "dia": 86400, "semana": 7 * 86400}
+ACTIVIDAD_MINUTOS_HORAS = float(os.getenv("ACTIVIDAD_MINUTOS_HORAS", "48"))
+ACTIVIDAD_HORAS_DIAS = float(os.getenv("ACTIVIDAD_HORAS_DIAS", "90"))
+# Cada cuántas respuestas sumadas (por proceso) se podan los buckets vencidos
+PODA_CADA = 500
+# Ventanas del endpoint en vivo y serie por minuto que lo acompaña
+VENTANAS = ("5m", "1h", "24h", "7d")
+SERIE_VIVO_MINUTOS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS actividad (
+    granularidad TEXT NOT NULL,            -- minuto | hora | dia | semana
+    inicio       INTEGER NOT NULL,         -- epoch s del inicio del bucket (en hora local)
+    facultad     TEXT NOT NULL DEFAULT '',
+    carrera      TEXT NOT NULL DEFAULT '',
+    conteo       INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularidad, inicio, facultad, carrera)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = (
+    "INSERT INTO actividad (granularidad, inicio, facultad, carrera, conteo) VALUES (?, ?, ?, ?, ?) "
+    "ON CONFLICT (granularidad, inicio, facultad, carrera) DO UPDATE SET conteo = conteo + excluded.conteo"
+)
+
+_schema_ready = set()
+_sumadas = itertools.count(1)  # next() es atómico: lo comparten los threads de cada worker
+
+
+def _conn(conn=None):
+    """Conexión con el esquema listo (agregados lo prepara en la suya antes de abrir transacciones)."""
+    conn = conn or connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+def _texto(value):
+    if value is None:
+        return ""
+    value = str(value).strip()
+    return "" if value == "nan" else value
+
+
+# -----------------------------
+# Buckets
+# -----------------------------
+def instante(creado_en):
+    """Epoch s de un timestamp ISO (o epoch ms), o None si no se puede interpretar."""
+    if isinstance(creado_en, (int, float)) and not isinstance(creado_en, bool):
+        return creado_en / 1000
+    try:
+        ts = datetime.fromisoformat(_texto(creado_en))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def inicio(ts, granularidad):
+    """Inicio (epoch s) del bucket local de `granularidad` que contiene el instante `ts`."""
+    local = int(ts // 1) + OFFSET_LOCAL
+    if granularidad == "semana":
+        dia = local // 86400
+        return (dia - (dia + 3) % 7) * 86400 - OFFSET_LOCAL  # 1970-01-01 fue jueves
+    paso = GRANULARIDADES[granularidad]
+    return local // paso * paso - OFFSET_LOCAL
+
+
+def limites(ahora=None):
+    """{granularidad: inicio mínimo que se conserva} (None = sin poda)."""
+    ahora = time.time() if ahora is None else ahora
+    return {
+        "minuto": ahora - ACTIVIDAD_MINUTOS_HORAS * 3600,
+        "hora": ahora - ACTIVIDAD_HORAS_DIAS * 86400,
+        "dia": None,
+        "semana": None,
+    }
+
+
+def _vigente(granularidad, inicio_bucket, minimos):
+    minimo = minimos[granularidad]
+    return minimo is None or inicio_bucket + GRANULARIDADES[granularidad] > minimo
+
+
+# -----------------------------
+# Escritura (desde agregados)
+# -----------------------------
+def aplicar(conn, respuesta, signo=1):
+    """Suma (o resta, signo=-1) una respuesta en los buckets de su creado_en."""
+    ts = instante(respuesta.get("creado_en"))
+    if ts is None:
+        return
+    clave = (_texto(respuesta.get("facultad")), _texto(respuesta.get("carrera")))
+    minimos = limites()
+    filas = []
+    for g in GRANULARIDADES:
+        ini = inicio(ts, g)
+        if _vigente(g, ini, minimos):  # importaciones viejas: solo días y semanas
+            filas.append((g, ini, *clave, signo))
+    conn.executemany(_UPSERT, filas)
+    if next(_sumadas) % PODA_CADA == 0:
+        podar(conn)
+
+
+def vaciar(conn):
+    conn.execute("DELETE FROM actividad")
+
+
+def reemplazar(conn, conteos):
+    """Reemplaza todos los buckets por `conteos` ({(granularidad, inicio, facultad, carrera): n})."""
+    vaciar(conn)
+    minimos = limites()
+    conn.executemany(
+        "INSERT INTO actividad (granularidad, inicio, facultad, carrera, conteo) VALUES (?, ?, ?, ?, ?)",
+        ((*clave, n) for clave, n in conteos.items() if _vigente(clave[0], clave[1], minimos)),
+    )
+
+
+def conteos_store(store):
+    """Buckets de un almacén compacto (EDA por bloques): {(granularidad, inicio, facultad, carrera): n}."""
+    import numpy as np
+
+    try:
+        from .respuestas_compactas import TS_NULO, SIN_DATO
+    except ImportError:
+        from respuestas_compactas import TS_NULO, SIN_DATO
+
+    ok = store.creado_en != TS_NULO
+    ts = store.creado_en[ok] // 1000 + OFFSET_LOCAL
+    fac = store.simple("facultad")[ok].astype(np.int64)
+    car = store.simple("carrera")[ok].astype(np.int64)
+    nombres = {campo: list(store.cats[campo]) for campo in ("facultad", "carrera")}
+    nombre = lambda campo, code: "" if code == SIN_DATO else nombres[campo][code]
+    minimos = limites()
+    conteos = {}
+    for g, paso in GRANULARIDADES.items():
+        if g == "semana":
+            dia = ts // 86400
+            ini = (dia - (dia + 3) % 7) * 86400
+        else:
+            ini = ts // paso * paso
+        if not len(ini):
+            continue
+        # un solo entero por (bucket, facultad, carrera): códigos uint8 en los 16 bits bajos
+        base = int(ini.min())
+        claves, n = np.unique(((ini - base) // paso << 16) | (fac << 8) | car, return_counts=True)
+        for clave, cnt in zip(claves.tolist(), n.tolist()):
+            bucket = base + (clave >> 16) * paso - OFFSET_LOCAL
+            if _vigente(g, bucket, minimos):
+                fila = (g, bucket, nombre("facultad", (clave >> 8) & 0xFF), nombre("carrera", clave & 0xFF))
+                conteos[fila] = conteos.get(fila, 0) + cnt
+    return conteos
+
+
+def podar(conn=None, ahora=None):
+    """Borra los buckets de minuto y hora más viejos que su retención."""
+    conn = _conn(conn)
+    for g, minimo in limites(ahora).items():
+        if minimo is not None:
+            conn.execute(
+                "DELETE FROM actividad WHERE granularidad = ? AND inicio < ?",
+                (g, minimo - GRANULARIDADES[g]),
+            )
+
+
+# -----------------------------
+# Consultas
+# -----------------------------
+def _filtro(facultades=None, carreras=None):
+    sql, params = "", []
+    for columna, valores in (("facultad", facultades), ("carrera", carreras)):
+        if valores:
+            sql += f" AND {columna} IN ({','.join('?' * len(valores))})"
+            params += list(valores)
+    return sql, params
+
+
+def serie(granularidad, desde, hasta, facultades=None, carreras=None, por=None):
+    """
+    Buckets de `granularidad` con inicio en [desde, hasta) (epoch s) y conteo > 0, en orden:
+    [(inicio, conteo)], o [(inicio, valor, conteo)] con por="facultad" | "carrera".
+    """
+    if granularidad not in GRANULARIDADES:
+        raise ValueError(f"granularidad debe ser una de: {', '.join(GRANULARIDADES)}")
+    if por not in (None, "facultad", "carrera"):
+        raise ValueError("'por' debe ser facultad o carrera.")
+    filtro, params = _filtro(facultades, carreras)
+    columnas = f"inicio, {por}" if por else "inicio"
+    rows = _conn().execute(
+        f"SELECT {columnas}, SUM(conteo) FROM actividad "
+        f"WHERE granularidad = ? AND inicio >= ? AND inicio < ?{filtro} "
+        f"GROUP BY {columnas} HAVING SUM(conteo) > 0 ORDER BY {columnas}",
+        [granularidad, int(desde), int(hasta), *params],
+    ).fetchall()
+    return [tuple(r) for r in rows]
+
+
+def granularidad_para(segundos):
+    """La granularidad más fina que cubre una ventana de `segundos` dentro de su retención."""
+    if segundos <= min(2 * 3600, ACTIVIDAD_MINUTOS_HORAS * 3600):
+        return "minuto"
+    if segundos <= min(7 * 86400, ACTIVIDAD_HORAS_DIAS * 86400):
+        return "hora"
+    return "dia"
+
+
+def ventana(segundos, ahora=None, facultades=None, carreras=None):
+    """
+    Respuestas de los últimos `segundos`: suma de los buckets que empiezan dentro de la
+    ventana (la precisión es la de granularidad_para: un minuto para la última hora).
+    """
+    ahora = time.time() if ahora is None else ahora
+    g = granularidad_para(segundos)
+    desde = inicio(ahora - segundos, g)
+    if desde < ahora - segundos:
+        desde += GRANULARIDADES[g]
+    return sum(c for _, c in serie(g, desde, ahora + 1, facultades, carreras))
+
+
+_DURACION = re.compile(r"^(\d+)([smhdw])$")
+_UNIDADES = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def duracion(texto):
+    """'5m' / '1h' / '24h' / '7d' / '2w' -> segundos. ValueError si no tiene ese formato."""
+    m = _DURACION.match(texto.strip())
+    if not m or int(m.group(1)) == 0:
+        raise ValueError(f"Ventana inválida: {texto!r} (ejemplos: 5m, 1h, 24h, 7d).")
+    return int(m.group(1)) * _UNIDADES[m.group(2)]
+
+
+def momento(texto):
+    """'YYYY-MM-DD' (medianoche local) o fecha y hora ISO (sin zona = hora local) -> epoch s."""
+    texto = texto.strip()
+    try:
+        ts = datetime.fromisoformat(texto)
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {texto!r} (YYYY-MM-DD o YYYY-MM-DDTHH:MM).")
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=TZ_LOCAL)
+    return ts.timestamp()
+
+
+def iso_local(ts):
+    return datetime.fromtimestamp(ts, TZ_LOCAL).isoformat()
+
+
+def en_vivo(ventanas=VENTANAS, facultades=None, carreras=None, ahora=None):
+    """
+    Resumen para el panel durante una campaña: conteo por ventana móvil, serie por minuto de
+    la última hora y reparto por facultad de la última hora.
+    """
+    ahora = time.time() if ahora is None else ahora
+    desde = inicio(ahora, "minuto") - (SERIE_VIVO_MINUTOS - 1) * 60
+    minutos = serie("minuto", desde, ahora + 1, facultades, carreras)
+    return {
+        "ahora": iso_local(ahora),
+        "ventanas": {v: ventana(duracion(v), ahora, facultades, carreras) for v in ventanas},
+        "ultimo_minuto": iso_local(minutos[-1][0]) if minutos else None,
+        "por_minuto": [{"inicio": iso_local(ini), "conteo": c} for ini, c in minutos],
+        "por_facultad": [
+            {"facultad": fac, "conteo": c}
+            for fac, c in sorted(
+                _por_valor(serie("minuto", desde, ahora + 1, facultades, carreras, por="facultad")),
+                key=lambda kv: -kv[1],
+            )
+        ],
+    }
+
+
+def _por_valor(filas):
+    totales = {}
+    for _, valor, conteo in filas:
+        totales[valor] = totales.get(valor, 0) + conteo
+    return totales.items()
@@ -0,0 +1,517 @@
+# Agregados incrementales del EDA (los mismos conteos que analisis_datos.main()).
+# Cada respuesta aceptada suma sus conteos con UPSERTs en la base SQLite local (O(1) por
+# respuesta, compartida entre workers); reconstruir() recalcula todo desde respuestas_ia.csv.
+# Lo registrado queda además en eda_pendientes hasta que un export lo trae: reconstruir() y
+# reemplazar() vuelven a sumar esas respuestas, que el CSV todavía no tiene.
+import os
+import csv
+import json
+import time
+from itertools import product
+from datetime import datetime, timedelta, timezone
+
+try:
+    from zoneinfo import ZoneInfo
+    TZ_LOCAL = ZoneInfo("America/Bogota")
+except Exception:
+    TZ_LOCAL = timezone(timedelta(hours=-5))
+
+try:
+    from . import actividad, columnar
+    from .sqlite_local import connect, transaction
+    from .utils import (
+        MULTI_COLS, SIMPLE_ENUMS, LIKERT_ORDERS, CRUCES, atomic_write, edad_banda, vocabulario,
+    )
+except ImportError:
+    import actividad, columnar
+    from sqlite_local import connect, transaction
+    from utils import (
+        MULTI_COLS, SIMPLE_ENUMS, LIKERT_ORDERS, CRUCES, atomic_write, edad_banda, vocabulario,
+    )
+
+BASE_DIR = os.path.dirname(__file__)
+SRC_CSV = os.path.join(BASE_DIR, "respuestas_ia.csv")
+IDS_PATH = os.path.join(BASE_DIR, "respuestas_ia.ids")
+ENCODING = "utf-8-sig"
+# Horas que una respuesta registrada espera a aparecer en un export antes de descartarla
+# (p. ej. un documento borrado en el almacén)
+AGREGADOS_PENDIENTES_HORAS = float(os.getenv("AGREGADOS_PENDIENTES_HORAS", "72"))
+
+# Separador de los valores de un cruce dentro de clave1
+SEP = "\x1f"
+
+# Columnas de eda_ia_consolidado.csv (mismo orden que genera analisis_datos)
+EDA_COLUMNS = ["dataset", "metric", "value", "fecha", "conteo", "facultad", "carrera", "campo", "categoria"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS eda_conteos (
+    dataset TEXT NOT NULL,
+    clave1  TEXT NOT NULL,
+    clave2  TEXT NOT NULL DEFAULT '',
+    conteo  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (dataset, clave1, clave2)
+);
+CREATE TABLE IF NOT EXISTS eda_registrados (id TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS eda_meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+-- respuestas registradas que aún no trae el export (seq nunca se reutiliza: ver consultas.py)
+CREATE TABLE IF NOT EXISTS eda_pendientes (
+    seq       INTEGER PRIMARY KEY AUTOINCREMENT,
+    id        TEXT NOT NULL UNIQUE,
+    datos     TEXT NOT NULL,
+    recibido  REAL NOT NULL
+);
+"""
+
+_UPSERT = (
+    "INSERT INTO eda_conteos (dataset, clave1, clave2, conteo) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (dataset, clave1, clave2) DO UPDATE SET conteo = conteo + excluded.conteo"
+)
+
+_schema_ready = set()
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        actividad._conn(conn)  # _aplicar también suma en sus buckets, dentro de la transacción
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+# -----------------------------
+# Normalización de una respuesta
+# -----------------------------
+def _texto(value):
+    if value is None:
+        return ""
+    value = str(value).strip()
+    return "" if value == "nan" else value
+
+
+def _multi(value):
+    if isinstance(value, (list, tuple)):
+        return [_texto(v) for v in value if _texto(v)]
+    return [x.strip() for x in _texto(value).split(";") if x.strip()]
+
+
+def _edad(value):
+    """Edad entera en 1..255 (como el almacén compacto); None si falta o no es válida."""
+    try:
+        edad = float(value)
+    except (TypeError, ValueError):
+        return None
+    return int(edad) if edad.is_integer() and 0 < edad < 256 else None
+
+
+def fecha_local(creado_en):
+    """Fecha (America/Bogota) de un timestamp ISO, o None si no se puede interpretar."""
+    try:
+        ts = datetime.fromisoformat(_texto(creado_en))
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.astimezone(TZ_LOCAL).date().isoformat()
+
+
+def conteos_de(respuesta):
+    """Lista de (dataset, clave1, clave2) que aporta una respuesta (payload validado o fila CSV)."""
+    claves = [("total", "", "")]
+    fecha = fecha_local(respuesta.get("creado_en"))
+    if fecha:
+        claves.append(("por_fecha", fecha, ""))
+    valores = {campo: [v] if (v := _texto(respuesta.get(campo))) else [] for campo in SIMPLE_ENUMS}
+    for campo in MULTI_COLS:
+        # orden del vocabulario (como los bits del almacén compacto); desconocidos al final
+        rango = {v: i for i, v in enumerate(vocabulario(campo))}
+        distintos = list(dict.fromkeys(_multi(respuesta.get(campo))))
+        valores[campo] = sorted(distintos, key=lambda v: rango.get(v, len(rango)))
+    edad = _edad(respuesta.get("edad"))
+    if edad is not None:
+        # histograma de edades: min/max/promedio salen de él y se pueden restar (actualizar)
+        claves.append(("edad", str(edad), ""))
+    banda = edad_banda(edad) if edad is not None else None
+    valores["edad_banda"] = [banda] if banda else []
+    for campo in SIMPLE_ENUMS:
+        for valor in valores[campo]:
+            claves.append((f"simple:{campo}", valor, ""))
+    for campo in MULTI_COLS:
+        for valor in valores[campo]:
+            claves.append((f"multi:{campo}", valor, ""))
+    for campos in CRUCES:
+        dataset = "cross:" + ":".join(campos)
+        for combo in product(*(valores[c] for c in campos)):
+            claves.append((dataset, SEP.join(combo), ""))
+    return claves
+
+
+def _aplicar(conn, respuesta, signo=1):
+    conn.executemany(_UPSERT, [(*clave, signo) for clave in conteos_de(respuesta)])
+    actividad.aplicar(conn, respuesta, signo)
+
+
+def _bump_version(conn):
+    conn.execute(
+        "INSERT INTO eda_meta (clave, valor) VALUES ('version', 1) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = valor + 1"
+    )
+
+
+def _pendiente(conn, respuesta, doc_id):
+    conn.execute(
+        "INSERT OR IGNORE INTO eda_pendientes (id, datos, recibido) VALUES (?, ?, ?)",
+        (doc_id, json.dumps(respuesta, ensure_ascii=False, default=str), time.time()),
+    )
+
+
+# -----------------------------
+# API del almacén
+# -----------------------------
+def registrar(respuesta, doc_id=None):
+    """
+    Suma una respuesta a los agregados. Con doc_id se ignora si ya estaba contada (la API y el
+    exportador pueden ver el mismo documento) y queda pendiente hasta que la traiga un export.
+    Retorna True si se contó.
+    """
+    with transaction(_conn()) as conn:
+        if doc_id:
+            nuevo = conn.execute(
+                "INSERT OR IGNORE INTO eda_registrados (id) VALUES (?)", (doc_id,)
+            ).rowcount
+            if not nuevo:
+                return False
+            _pendiente(conn, respuesta, doc_id)
+        _aplicar(conn, respuesta)
+        _bump_version(conn)
+    return True
+
+
+def registrar_lote(pares):
+    """registrar() de varias [(respuesta, doc_id)] en una sola transacción. Retorna cuántas se contaron."""
+    n = 0
+    with transaction(_conn()) as conn:
+        for respuesta, doc_id in pares:
+            if doc_id:
+                if not conn.execute(
+                    "INSERT OR IGNORE INTO eda_registrados (id) VALUES (?)", (doc_id,)
+                ).rowcount:
+                    continue
+                _pendiente(conn, respuesta, doc_id)
+            _aplicar(conn, respuesta)
+            n += 1
+        if n:
+            _bump_version(conn)
+    return n
+
+
+def descartar_pendientes(ids):
+    """Saca de eda_pendientes respuestas que el export vio pero omitió (duplicados colapsados)."""
+    ids = [(i,) for i in ids if i]
+    if ids:
+        with transaction(_conn()) as conn:
+            conn.executemany("DELETE FROM eda_pendientes WHERE id = ?", ids)
+
+
+def pendientes(desde=0):
+    """[(seq, id, respuesta)] de eda_pendientes con seq > `desde`, en orden de llegada."""
+    return [
+        (row["seq"], row["id"], json.loads(row["datos"]))
+        for row in _conn().execute(
+            "SELECT seq, id, datos FROM eda_pendientes WHERE seq > ? ORDER BY seq", (desde,)
+        )
+    ]
+
+
+def ultimo_pendiente():
+    """seq de la última respuesta anotada en eda_pendientes (0 si nunca hubo)."""
+    return _conn().execute("SELECT COALESCE(MAX(seq), 0) FROM eda_pendientes").fetchone()[0]
+
+
+def actualizar(anterior, nueva):
+    """Reemplaza los aportes de una respuesta modificada (anterior -> nueva)."""
+    with transaction(_conn()) as conn:
+        _aplicar(conn, anterior, signo=-1)
+        _aplicar(conn, nueva)
+        _bump_version(conn)
+
+
+def _marcar_base(conn, publicada):
+    _bump_version(conn)
+    conn.execute(
+        "INSERT INTO eda_meta (clave, valor) VALUES ('base', 1) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor"
+    )
+    if publicada:
+        conn.execute(
+            "INSERT INTO eda_meta (clave, valor) SELECT 'publicada', valor FROM eda_meta "
+            "WHERE clave = 'version' ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor"
+        )
+
+
+def _reaplicar_pendientes(conn, con_ids):
+    """
+    Vuelve a sumar las respuestas registradas que el CSV recién cargado todavía no trae. Las
+    que ya están en él salen de eda_pendientes, igual que las que nunca llegaron a un export
+    en AGREGADOS_PENDIENTES_HORAS. Sin el archivo de ids no se puede saber cuáles trae: se
+    descartan todas. Retorna cuántas se sumaron.
+    """
+    if not con_ids:
+        conn.execute("DELETE FROM eda_pendientes")
+        return 0
+    conn.execute("DELETE FROM eda_pendientes WHERE id IN (SELECT id FROM eda_registrados)")
+    conn.execute("DELETE FROM eda_pendientes WHERE recibido < ?",
+                 (time.time() - AGREGADOS_PENDIENTES_HORAS * 3600,))
+    n = 0
+    for row in conn.execute("SELECT id, datos FROM eda_pendientes ORDER BY seq").fetchall():
+        conn.execute("INSERT OR IGNORE INTO eda_registrados (id) VALUES (?)", (row["id"],))
+        _aplicar(conn, json.loads(row["datos"]))
+        n += 1
+    if n:
+        _bump_version(conn)
+    return n
+
+
+def reconstruir(csv_path=SRC_CSV, ids_path=IDS_PATH, publicada=False):
+    """
+    Recalcula todos los agregados desde el CSV exportado (reconciliación) más las respuestas
+    pendientes. Sin CSV no toca nada (retorna None). Con `publicada` el EDA en disco se da por
+    calculado desde este mismo CSV.
+    """
+    if not os.path.exists(csv_path) or os.path.getsize(csv_path) == 0:
+        print(f"⚠️  {csv_path} no existe: se conservan los agregados actuales.")
+        return None
+    ids = None
+    if os.path.exists(ids_path):
+        with open(ids_path, encoding="utf-8") as f:
+            ids = [line.strip() for line in f]
+    t0 = time.perf_counter()
+    n = 0
+    with transaction(_conn()) as conn:
+        conn.execute("DELETE FROM eda_conteos")
+        conn.execute("DELETE FROM eda_registrados")
+        actividad.vaciar(conn)
+        with open(csv_path, encoding=ENCODING, newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                _aplicar(conn, row)
+                if ids and i < len(ids) and ids[i]:
+                    conn.execute("INSERT OR IGNORE INTO eda_registrados (id) VALUES (?)", (ids[i],))
+                n = i + 1
+        _marcar_base(conn, publicada)
+        extra = _reaplicar_pendientes(conn, ids is not None)
+    print(f"🧮 Agregados reconstruidos: {n} respuestas (+{extra} pendientes) en {time.perf_counter() - t0:.2f}s")
+    return n
+
+
+def reemplazar(agg, ids_path=IDS_PATH, publicada=False):
+    """
+    Reemplaza los agregados por `agg` (formato de leer(), ya calculado desde el CSV, p. ej. por
+    el EDA por bloques) sin volver a recorrer las respuestas una por una, y vuelve a sumar las
+    pendientes (ver reconstruir). Si trae "actividad" (ver actividad.conteos_store) también
+    reemplaza los buckets de tiempo.
+    """
+    def claves():
+        yield "total", "", "", agg["total"]
+        for edad, conteo in agg["edad"]["conteos"].items():
+            yield "edad", str(edad), "", conteo
+        for fecha, conteo in agg["por_fecha"].items():
+            yield "por_fecha", fecha, "", conteo
+        for kind in ("simple", "multi"):
+            for campo, conteos in agg[kind].items():
+                for valor, conteo in conteos.items():
+                    yield f"{kind}:{campo}", valor, "", conteo
+        for campos, conteos in agg["cross"].items():
+            for combo, conteo in conteos.items():
+                yield "cross:" + ":".join(campos), SEP.join(combo), "", conteo
+
+    with transaction(_conn()) as conn:
+        conn.execute("DELETE FROM eda_conteos")
+        conn.execute("DELETE FROM eda_registrados")
+        conn.executemany(_UPSERT, claves())
+        if "actividad" in agg:
+            actividad.reemplazar(conn, agg["actividad"])
+        con_ids = os.path.exists(ids_path)
+        if con_ids:
+            with open(ids_path, encoding="utf-8") as f:
+                ids = ((line.strip(),) for line in f)
+                conn.executemany("INSERT OR IGNORE INTO eda_registrados (id) VALUES (?)", (i for i in ids if i[0]))
+        _marcar_base(conn, publicada)
+        extra = _reaplicar_pendientes(conn, con_ids)
+    print(f"🧮 Agregados reemplazados: {agg['total']} respuestas (+{extra} pendientes)")
+    return agg["total"]
+
+
+def version():
+    row = _conn().execute("SELECT valor FROM eda_meta WHERE clave = 'version'").fetchone()
+    return row[0] if row else 0
+
+
+def con_base():
+    """
+    True si los agregados ya se reconstruyeron alguna vez desde el CSV. En una base local nueva
+    (arranque en frío) solo tienen lo recibido desde el arranque: no representan el total.
+    """
+    return _conn().execute("SELECT 1 FROM eda_meta WHERE clave = 'base'").fetchone() is not None
+
+
+def _total(conn):
+    row = conn.execute("SELECT conteo FROM eda_conteos WHERE dataset = 'total'").fetchone()
+    return row[0] if row else 0
+
+
+def _total_publicado(path):
+    """total_respuestas del EDA en `path` (0 si no existe o no se puede leer)."""
+    try:
+        with open(path, encoding=ENCODING, newline="") as f:
+            for row in csv.DictReader(f):
+                if row.get("dataset") == "resumen" and row.get("metric") == "total_respuestas":
+                    return float(row.get("value") or 0)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def representativos(path):
+    """
+    True si los agregados pueden reemplazar al EDA publicado en `path`: tienen base y no están
+    en cero mientras ese EDA sí tiene respuestas (una base local recreada o vaciada nunca
+    publica ceros sobre un EDA real).
+    """
+    if not con_base():
+        return False
+    return _total(_conn()) > 0 or _total_publicado(path) == 0
+
+
+def vacios():
+    """Agregados sin respuestas (formato de leer())."""
+    return {
+        "total": 0,
+        "edad": {"minimo": None, "maximo": None, "suma": 0, "n": 0, "conteos": {}},
+        "por_fecha": {},
+        "simple": {campo: {} for campo in SIMPLE_ENUMS},
+        "multi": {campo: {} for campo in MULTI_COLS},
+        "cross": {tuple(campos): {} for campos in CRUCES},
+    }
+
+
+def leer():
+    """
+    Agregados actuales: {"total", "edad", "por_fecha", "simple", "multi", "cross"}. "edad" trae
+    minimo/maximo/suma/n calculados desde su histograma ("conteos": {edad: conteo}).
+    """
+    conn = _conn()
+    agg = vacios()
+    edades = agg["edad"]["conteos"]
+    # rowid = orden de primera aparición (desempate igual que value_counts)
+    for dataset, k1, k2, conteo in conn.execute(
+        "SELECT dataset, clave1, clave2, conteo FROM eda_conteos WHERE conteo > 0 ORDER BY rowid"
+    ):
+        kind, _, campo = dataset.partition(":")
+        if kind == "total":
+            agg["total"] = conteo
+        elif kind == "edad":
+            edades[int(k1)] = conteo
+        elif kind == "por_fecha":
+            agg["por_fecha"][k1] = conteo
+        elif kind == "simple" and campo in agg["simple"]:
+            agg["simple"][campo][k1] = conteo
+        elif kind == "multi" and campo in agg["multi"]:
+            agg["multi"][campo][k1] = conteo
+        elif kind == "cross":
+            campos = tuple(campo.split(":"))
+            combo = tuple(k1.split(SEP))
+            if campos in agg["cross"] and len(combo) == len(campos):
+                agg["cross"][campos][combo] = conteo
+    if edades:
+        agg["edad"].update(
+            minimo=float(min(edades)), maximo=float(max(edades)),
+            suma=sum(e * c for e, c in edades.items()), n=sum(edades.values()),
+        )
+    return agg
+
+
+def _desc(conteos):
+    return sorted(conteos.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def _rangos(agg, campo):
+    """Posición de cada valor al ordenar un cruce: vocabulario, luego valores desconocidos."""
+    vocab = vocabulario(campo)
+    vistos = agg["simple"].get(campo) or agg["multi"].get(campo) or {}
+    extra = [v for v in vistos if v not in vocab]  # orden de aparición, como el almacén compacto
+    return {v: i for i, v in enumerate(vocab + extra)}
+
+
+def filas_eda(agg):
+    """Filas del EDA consolidado a partir de los agregados (mismo formato que analisis_datos)."""
+    edad = agg["edad"]
+    media = edad["suma"] / edad["n"] if edad["n"] else None
+    rows = [
+        {"dataset": "resumen", "metric": "total_respuestas", "value": agg["total"]},
+        {"dataset": "resumen", "metric": "facultades_unicas", "value": len(agg["simple"]["facultad"])},
+        {"dataset": "resumen", "metric": "carreras_unicas", "value": len(agg["simple"]["carrera"])},
+        {"dataset": "edad_stats", "metric": "edad_min", "value": edad["minimo"]},
+        {"dataset": "edad_stats", "metric": "edad_max", "value": edad["maximo"]},
+        {"dataset": "edad_stats", "metric": "edad_promedio", "value": round(media, 2) if media is not None else None},
+    ]
+    for fecha in sorted(agg["por_fecha"]):
+        rows.append({"dataset": "por_fecha", "fecha": fecha, "conteo": agg["por_fecha"][fecha]})
+    for campo in ("facultad", "carrera"):
+        for val, cnt in _desc(agg["simple"][campo]):
+            rows.append({"dataset": f"por_{campo}", campo: val, "conteo": cnt})
+    for campo in SIMPLE_ENUMS:
+        conteos = agg["simple"][campo]
+        order = LIKERT_ORDERS.get(campo)
+        items = [(k, conteos.get(k, 0)) for k in order] if order else _desc(conteos)
+        for val, cnt in items:
+            rows.append({"dataset": "freq_simple", "campo": campo, "categoria": val, "conteo": cnt})
+    for campo in MULTI_COLS:
+        for val, cnt in _desc(agg["multi"][campo]):
+            rows.append({"dataset": "freq_multi", "campo": campo, "categoria": val, "conteo": cnt})
+    for campos, conteos in agg["cross"].items():
+        rangos = [_rangos(agg, c) for c in campos]
+        clave = lambda kv: tuple(r.get(v, len(r)) for r, v in zip(rangos, kv[0]))
+        for combo, cnt in sorted(conteos.items(), key=clave):
+            rows.append({"dataset": "cross_" + "_".join(campos), **dict(zip(campos, combo)), "conteo": cnt})
+    return rows
+
+
+def escribir_eda_csv(path):
+    """Escribe eda_ia_consolidado.csv (y su Parquet) desde los agregados, sin releer respuestas_ia.csv."""
+    rows = filas_eda(leer())
+    columns = list(EDA_COLUMNS)
+    for row in rows:
+        columns += [k for k in row if k not in columns]
+    with atomic_write(path, encoding=ENCODING) as f:
+        writer = csv.DictWriter(f, fieldnames=columns, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
+    if columnar.HAS_ARROW:
+        columnar.escribir_eda(rows, columnar.ruta_parquet(path), columns)
+    return len(rows)
+
+
+def publicar_si_cambio(path):
+    """
+    Reescribe el EDA en `path` solo si los agregados cambiaron desde la última publicación.
+    Si no lo representan (ver representativos) se conserva el EDA que haya en disco.
+    """
+    if os.path.exists(path) and not representativos(path):
+        return False
+    conn = _conn()
+    actual = version()
+    row = conn.execute("SELECT valor FROM eda_meta WHERE clave = 'publicada'").fetchone()
+    if row and row[0] == actual and os.path.exists(path):
+        return False
+    escribir_eda_csv(path)
+    marcar_publicada(actual)
+    return True
+
+
+def marcar_publicada(valor=None):
+    """Registra que el EDA en disco corresponde a la versión `valor` de los agregados."""
+    valor = version() if valor is None else valor
+    _conn().execute(
+        "INSERT INTO eda_meta (clave, valor) VALUES ('publicada', ?) "
+        "ON CONFLICT (clave) DO UPDATE SET valor = excluded.valor", (valor,)
+    )
@@ -0,0 +1,223 @@
+# Almacén de respuestas intercambiable (ALMACEN=appwrite | sqlite).
+# - appwrite (por defecto): la colección remota de siempre, vía el client compartido.
+# - sqlite: base embebida en WAL (ALMACEN_SQLITE_PATH), para despliegues pequeños y pruebas
+#   locales: escribir una respuesta es un INSERT local y el export lee la tabla directamente
+#   en vez de paginar una API REST.
+# Ambos entregan documentos con la forma de Appwrite ({"$id", "$createdAt", "$updatedAt", ...}),
+# así exportar_csv, cola_respuestas e importar no distinguen cuál está detrás.
+# El SDK de Appwrite (requests incluido) se importa en la primera llamada, no al arrancar.
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+try:
+    from .sqlite_local import connect, transaction
+except ImportError:
+    from sqlite_local import connect, transaction
+
+BASE_DIR = os.path.dirname(__file__)
+ALMACEN = os.getenv("ALMACEN", "appwrite").strip().lower()
+ALMACEN_SQLITE_PATH = os.getenv("ALMACEN_SQLITE_PATH", os.path.join(BASE_DIR, "respuestas.sqlite3"))
+# NORMAL en WAL: un commit no espera fsync (se pierde como mucho lo último ante un corte de
+# luz, nunca ante un fallo del proceso); FULL si se prefiere durabilidad a latencia
+ALMACEN_SQLITE_SYNC = os.getenv("ALMACEN_SQLITE_SYNC", "NORMAL").strip().upper()
+PAGE_SIZE = 1000
+
+
+class Conflicto(Exception):
+    """El $id ya existe (mismo código que Appwrite, así los llamadores tratan ambos igual)."""
+    code = 409
+
+
+def nuevo_id():
+    """$id nuevo con el generador del SDK (importado aquí: arrancar la app no carga appwrite)."""
+    from appwrite.id import ID
+    return ID.unique()
+
+
+def _exportar_csv():
+    # el motor de paginación de Appwrite vive en exportar_csv (que a su vez usa este módulo)
+    try:
+        from . import exportar_csv
+    except ImportError:
+        import exportar_csv
+    return exportar_csv
+
+
+def _appwrite():
+    try:
+        from . import appwrite_config
+    except ImportError:
+        import appwrite_config
+    return appwrite_config
+
+
+class AlmacenAppwrite:
+    """Colección de Appwrite (la implementación original)."""
+
+    nombre = "appwrite"
+
+    def guardar(self, data, doc_id=None):
+        """Crea un documento y retorna su $id (con doc_id propio, 409 si ya existe)."""
+        aw = _appwrite()
+        document = aw.get_databases().create_document(
+            database_id=aw.APPWRITE_DATABASE_ID,
+            collection_id=aw.APPWRITE_COLLECTION_ID,
+            document_id=doc_id or "unique()",   # ID automático
+            data=data,
+        )
+        return document.get("$id")
+
+    def obtener(self, doc_id):
+        """Documento con ese $id, None si no existe."""
+        aw = _appwrite()
+        try:
+            return aw.get_databases().get_document(aw.APPWRITE_DATABASE_ID, aw.APPWRITE_COLLECTION_ID, doc_id)
+        except Exception as e:
+            if getattr(e, "code", None) == 404:
+                return None
+            raise
+
+    def guardar_lote(self, docs):
+        """Upsert de [(doc_id, data)] en una llamada: idempotente aunque el lote se reintente."""
+        aw = _appwrite()
+        aw.get_databases().upsert_documents(
+            aw.APPWRITE_DATABASE_ID, aw.APPWRITE_COLLECTION_ID,
+            [{"$id": doc_id, **data} for doc_id, data in docs],
+        )
+
+    def paginas(self, page_size=None):
+        """Páginas de documentos ordenadas por $createdAt (ver exportar_csv.iter_documents)."""
+        ex, aw = _exportar_csv(), _appwrite()
+        yield from ex.iter_documents(aw.get_databases(), aw.APPWRITE_DATABASE_ID, aw.APPWRITE_COLLECTION_ID, page_size)
+
+    def modificados_desde(self, updated_at):
+        """Documentos con $updatedAt >= updated_at, ordenados por $updatedAt."""
+        ex, aw = _exportar_csv(), _appwrite()
+        return ex.fetch_since(aw.get_databases(), aw.APPWRITE_DATABASE_ID, aw.APPWRITE_COLLECTION_ID, updated_at)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    n           INTEGER PRIMARY KEY,   -- orden de inserción (= orden de $createdAt)
+    id          TEXT NOT NULL UNIQUE,  -- $id
+    creado      TEXT NOT NULL,         -- $createdAt
+    actualizado TEXT NOT NULL,         -- $updatedAt
+    creado_en   TEXT,
+    facultad    TEXT,
+    carrera     TEXT,
+    datos       TEXT NOT NULL          -- payload validado (JSON)
+);
+-- consultas por fecha / facultad / carrera directo sobre la tabla (sqlite3 backend/respuestas.sqlite3)
+CREATE INDEX IF NOT EXISTS idx_respuestas_creado_en ON respuestas (creado_en);
+CREATE INDEX IF NOT EXISTS idx_respuestas_facultad ON respuestas (facultad);
+CREATE INDEX IF NOT EXISTS idx_respuestas_carrera ON respuestas (carrera);
+CREATE INDEX IF NOT EXISTS idx_respuestas_actualizado ON respuestas (actualizado, id);
+"""
+
+# Sentencias fijas: sqlite3 las prepara una vez y las reutiliza de su caché por conexión
+_INSERT = (
+    "INSERT INTO respuestas (id, creado, actualizado, creado_en, facultad, carrera, datos) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_UPSERT = _INSERT + (
+    " ON CONFLICT (id) DO UPDATE SET actualizado = excluded.actualizado, "
+    "creado_en = excluded.creado_en, facultad = excluded.facultad, "
+    "carrera = excluded.carrera, datos = excluded.datos"
+)
+_COLUMNAS = "id, creado, actualizado, datos"
+
+
+def _ahora():
+    # mismo formato que $createdAt/$updatedAt de Appwrite (ms, +00:00)
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _fila(doc_id, data, ts):
+    return (doc_id, ts, ts, data.get("creado_en"), data.get("facultad"), data.get("carrera"),
+            json.dumps(data, ensure_ascii=False))
+
+
+def _documento(row):
+    doc = json.loads(row["datos"])
+    doc.update({"$id": row["id"], "$createdAt": row["creado"], "$updatedAt": row["actualizado"]})
+    return doc
+
+
+class AlmacenSQLite:
+    """Tabla `respuestas` en una base SQLite embebida (WAL, compartida entre workers)."""
+
+    nombre = "sqlite"
+
+    def __init__(self, path=ALMACEN_SQLITE_PATH, synchronous=ALMACEN_SQLITE_SYNC):
+        if synchronous not in {"OFF", "NORMAL", "FULL", "EXTRA"}:
+            raise RuntimeError(f"ALMACEN_SQLITE_SYNC inválido: {synchronous}")
+        self.path = path
+        self.synchronous = synchronous
+        self._schema_ready = set()
+
+    def _conn(self):
+        conn = connect(self.path, synchronous=self.synchronous)
+        if os.getpid() not in self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready.add(os.getpid())
+        return conn
+
+    def guardar(self, data, doc_id=None):
+        doc_id = doc_id or nuevo_id()
+        try:
+            self._conn().execute(_INSERT, _fila(doc_id, data, _ahora()))
+        except sqlite3.IntegrityError:
+            raise Conflicto(f"Ya existe una respuesta con id {doc_id}")
+        return doc_id
+
+    def obtener(self, doc_id):
+        row = self._conn().execute(f"SELECT {_COLUMNAS} FROM respuestas WHERE id = ?", (doc_id,)).fetchone()
+        return _documento(row) if row is not None else None
+
+    def guardar_lote(self, docs):
+        ts = _ahora()
+        with transaction(self._conn()) as conn:
+            conn.executemany(_UPSERT, [_fila(doc_id, data, ts) for doc_id, data in docs])
+
+    def paginas(self, page_size=None):
+        page_size = page_size or PAGE_SIZE
+        ultimo = 0
+        while True:
+            rows = self._conn().execute(
+                f"SELECT n, {_COLUMNAS} FROM respuestas WHERE n > ? ORDER BY n LIMIT ?",
+                (ultimo, page_size),
+            ).fetchall()
+            if rows:
+                yield [_documento(r) for r in rows]
+            if len(rows) < page_size:
+                return
+            ultimo = rows[-1]["n"]
+
+    def modificados_desde(self, updated_at):
+        rows = self._conn().execute(
+            f"SELECT {_COLUMNAS} FROM respuestas WHERE actualizado >= ? ORDER BY actualizado, id",
+            (updated_at,),
+        ).fetchall()
+        return [_documento(r) for r in rows]
+
+
+IMPLEMENTACIONES = {"appwrite": AlmacenAppwrite, "sqlite": AlmacenSQLite}
+
+_lock = threading.Lock()
+_almacen = None
+
+
+def get_almacen():
+    """Almacén configurado en ALMACEN (uno por proceso)."""
+    global _almacen
+    if _almacen is None:
+        with _lock:
+            if _almacen is None:
+                clase = IMPLEMENTACIONES.get(ALMACEN)
+                if clase is None:
+                    raise RuntimeError(f"ALMACEN debe ser uno de {sorted(IMPLEMENTACIONES)} (es '{ALMACEN}')")
+                _almacen = clase()
+    return _almacen
@@ -1,5 +1,6 @@
 import os
 import sys
+import numpy as np
 import pandas as pd
 
 BASE_DIR = os.path.dirname(__file__)
@@ -7,178 +8,263 @@ SRC_CSV = os.path.join(BASE_DIR, "respuestas_ia.csv")
 OUT_CSV = os.path.join(BASE_DIR, "eda_ia_consolidado.csv")
 ENCODING = "utf-8-sig"
 
-# Campos multi (exportados como "a;b;c" en respuestas_ia.csv)
-MULTI_COLS = ["usos", "herramientas", "sectores"]
-
-# Enums simples
-SIMPLE_ENUMS = [
-    "familiaridad", "definicion", "frecuencia", "confianza",
-    "percepcion_social", "regulacion", "emocion",
-    "facultad", "carrera"
-]
-
-# Orden para Likert (útil para ordenar resultados)
-LIKERT_ORDERS = {
-    "familiaridad": ["nada", "poco", "algo", "bastante", "muy"],
-    "confianza":    ["nada", "poca", "regular", "bastante", "total"],
-    "percepcion_social": ["muy_negativo", "negativo", "neutro", "positivo", "muy_positivo"],
-    "frecuencia": ["nunca", "mensual", "semanal", "varios_dias_semana", "diaria"],
-    "regulacion": ["estricta", "flexible", "libre", "nsnc"],
-    "emocion": ["curiosidad", "entusiasmo", "indiferencia", "inquietud", "miedo"],
-}
-
-def safe_read_csv(path: str) -> pd.DataFrame:
+# Campos multi, enums simples y orden Likert (compartidos con el resto del backend)
+try:
+    from . import agregados, artefactos, columnar, estadisticas, metricas
+    from .respuestas_compactas import RespuestasCompactas, SIN_DATO, EDAD_NULA, TS_NULO
+    from .utils import MULTI_COLS, SIMPLE_ENUMS, LIKERT_ORDERS, CRUCES, atomic_write, vocabulario
+except ImportError:
+    import agregados, artefactos, columnar, estadisticas, metricas
+    from respuestas_compactas import RespuestasCompactas, SIN_DATO, EDAD_NULA, TS_NULO
+    from utils import MULTI_COLS, SIMPLE_ENUMS, LIKERT_ORDERS, CRUCES, atomic_write, vocabulario
+
+# America/Bogota no tiene horario de verano: UTC-5 fijo
+OFFSET_LOCAL_MS = -5 * 3600 * 1000
+DIA_MS = 86400 * 1000
+
+# memoria: todo el export en el almacén compacto; bloques: agregados parciales por bloque
+# (ver eda_bloques.py); auto: bloques cuando el CSV supera EDA_MEMORIA_MAX_MB
+EDA_MODO = os.getenv("EDA_MODO", "auto").strip().lower()
+EDA_MEMORIA_MAX_MB = float(os.getenv("EDA_MEMORIA_MAX_MB", "256"))
+
+def cargar_respuestas(path: str) -> RespuestasCompactas:
+    """
+    Carga las respuestas en el almacén compacto: desde respuestas_ia.parquet si está al día
+    (memory map, sin parsear texto) o desde el CSV por bloques.
+    """
+    parquet = columnar.ruta_parquet(path)
+    if columnar.vigente(parquet, path):
+        try:
+            return RespuestasCompactas.desde_parquet(parquet)
+        except Exception as e:
+            print(f"⚠️  No se pudo leer {parquet} ({e}). Se usa el CSV.")
     if not os.path.exists(path) or os.path.getsize(path) == 0:
         print("⚠️  respuestas_ia.csv no existe o está vacío. Exporta primero: python exportar_csv.py")
         sys.exit(0)
     try:
-        return pd.read_csv(path, encoding=ENCODING)
+        return RespuestasCompactas.desde_csv(path, encoding=ENCODING)
     except pd.errors.EmptyDataError:
         print("⚠️  El CSV está vacío (sin cabecera/filas). Vuelve a exportar.")
         sys.exit(0)
 
-def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    # strings: strip
-    for col in df.columns:
-        if df[col].dtype == object:
-            df[col] = df[col].astype(str).str.strip().replace({"nan": ""})
-    # edad: numérica
-    if "edad" in df.columns:
-        df["edad"] = pd.to_numeric(df["edad"], errors="coerce").astype("Float64")
-    # fechas derivadas
-    if "creado_en" in df.columns:
-        df["creado_en_ts"] = pd.to_datetime(df["creado_en"], errors="coerce", utc=True)
-        df["fecha"] = (
-            df["creado_en_ts"]
-            .dt.tz_convert("America/Bogota")
-            .dt.date
-        )
-    # id_respuesta para referencia
-    df = df.reset_index(drop=True)
-    df.insert(0, "id_respuesta", df.index + 1)
-    return df
-
-def explode_multi_col(df: pd.DataFrame, col: str) -> pd.DataFrame:
-    if col not in df.columns:
-        return pd.DataFrame(columns=["id_respuesta", col])
-    tmp = df[["id_respuesta", col]].copy()
-    tmp[col] = tmp[col].fillna("").astype(str).apply(
-        lambda s: [x.strip() for x in s.split(";") if x.strip()]
-    )
-    tmp = tmp.explode(col)
-    tmp = tmp[tmp[col].astype(str).str.len() > 0].reset_index(drop=True)
-    return tmp
-
-def main():
-    df = safe_read_csv(SRC_CSV)
-    df = normalize_df(df)
-
-    rows = []  # lista de dicts; luego se convierte en un único DataFrame
+def conteos_desc(codes: np.ndarray, cats: list) -> list:
+    """[(categoria, conteo)] de mayor a menor; empates por primera aparición (como value_counts)."""
+    valid = codes[codes >= 0]
+    counts = np.bincount(valid, minlength=len(cats))
+    present, first = np.unique(valid, return_index=True)
+    order = sorted(zip(present, first), key=lambda cf: (-counts[cf[0]], cf[1]))
+    return [(cats[c], int(counts[c])) for c, _ in order]
 
-    # ===== Resumen =====
-    total = len(df)
-    facs = df["facultad"].nunique() if "facultad" in df.columns else 0
-    cars = df["carrera"].nunique() if "carrera" in df.columns else 0
-    edad_min = float(df["edad"].min()) if "edad" in df.columns and df["edad"].notna().any() else None
-    edad_max = float(df["edad"].max()) if "edad" in df.columns and df["edad"].notna().any() else None
-    edad_mean = float(df["edad"].mean()) if "edad" in df.columns and df["edad"].notna().any() else None
+def freq_multi(matrix, cats) -> list:
+    """[(categoria, conteo)] con conteo > 0, de mayor a menor (suma por columna)."""
+    if not len(matrix):  # CSV solo con encabezado
+        return []
+    counts = matrix.sum(axis=0, dtype=np.int64)
+    first_row = matrix.argmax(axis=0)
+    items = [j for j in range(len(cats)) if counts[j] > 0]
+    # empates: primera respuesta que la marcó, luego orden del vocabulario
+    return [(cats[j], int(counts[j])) for j in sorted(items, key=lambda j: (-counts[j], first_row[j], j))]
+
+def codificar(store: RespuestasCompactas, mask=None) -> dict:
+    """
+    Vista de cruce de cada campo del almacén (opcionalmente solo las filas de `mask`).
+    Simples (y edad_banda): códigos enteros según vocabulario() (-1 = sin dato). Multi: la
+    matriz de bits en forma dispersa (categoría de cada par respuesta/categoría, y cuántas
+    categorías marcó cada respuesta).
+    """
+    sel = slice(None) if mask is None else mask
+    enc = {}
+    for campo in SIMPLE_ENUMS:
+        codes = store.simple(campo)[sel].astype(np.int64)
+        codes[codes == SIN_DATO] = -1
+        enc[campo] = {"kind": "simple", "codes": codes, "cats": list(store.cats[campo])}
+    enc["edad_banda"] = {"kind": "simple", "codes": store.edad_banda()[sel], "cats": vocabulario("edad_banda")}
+    for campo in MULTI_COLS:
+        matrix = store.bits(campo, mask)
+        _, cols = np.nonzero(matrix)  # recorrido fila por fila
+        per_row = matrix.sum(axis=1, dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(per_row)[:-1]]).astype(np.int64)
+        enc[campo] = {
+            "kind": "multi", "matrix": matrix, "cols": cols,
+            "per_row": per_row, "offsets": offsets, "cats": list(store.cats[campo]),
+        }
+    return enc
+
+def crosstab(enc: dict, campos, n: int) -> np.ndarray:
+    """
+    Tabla de conteos N-dimensional para `campos` (uno de cada eje, en ese orden).
+    Cada respuesta aporta una combinación por campo simple y una por cada categoría marcada
+    en los multi; todas se combinan en un índice plano y se cuentan con un solo bincount.
+    """
+    rows = np.arange(n)
+    coords = []
+    for campo in campos:
+        e = enc[campo]
+        if e["kind"] == "simple":
+            codes = e["codes"][rows]
+            keep = codes >= 0
+            rows, coords = rows[keep], [c[keep] for c in coords] + [codes[keep]]
+        else:
+            reps = e["per_row"][rows]
+            starts = np.repeat(e["offsets"][rows], reps)
+            within = np.arange(int(reps.sum())) - np.repeat(np.cumsum(reps) - reps, reps)
+            coords = [np.repeat(c, reps) for c in coords] + [e["cols"][starts + within]]
+            rows = np.repeat(rows, reps)
+    shape = tuple(len(enc[c]["cats"]) for c in campos)
+    flat = np.ravel_multi_index(coords, shape) if coords and len(rows) else np.zeros(0, dtype=np.int64)
+    return np.bincount(flat, minlength=int(np.prod(shape))).reshape(shape)
+
+def filas_cruces(enc: dict, n: int, cruces=CRUCES) -> list:
+    """Filas cross_* de todos los cruces declarados (los que tengan sus campos en el CSV)."""
+    rows = []
+    for campos in cruces:
+        if not all(c in enc for c in campos):
+            continue
+        counts = crosstab(enc, campos, n)
+        dataset = "cross_" + "_".join(campos)
+        # np.nonzero recorre en orden de códigos = orden de vocabulario de cada campo
+        for idx in zip(*np.nonzero(counts)):
+            row = {"dataset": dataset}
+            row.update({c: enc[c]["cats"][i] for c, i in zip(campos, idx)})
+            row["conteo"] = int(counts[idx])
+            rows.append(row)
+    return rows
+
+def reconciliar_agregados(agg=None):
+    """
+    Reconstruye los agregados incrementales desde el CSV (o los reemplaza por `agg`, ya
+    calculados por bloques), los da por publicados y publica el snapshot de /api/stats.
+    Las respuestas pendientes que se vuelven a sumar quedan para la próxima publicación del EDA.
+    """
+    try:
+        if agg is not None:
+            agregados.reemplazar(agg, publicada=True)
+        else:
+            agregados.reconstruir(SRC_CSV, publicada=True)
+        estadisticas.publicar()
+    except Exception as e:
+        print(f"⚠️  No se pudieron reconstruir los agregados: {e}")
+
+def fechas_locales(creado_en: np.ndarray) -> list:
+    """[(fecha America/Bogota, conteo)] ordenado por fecha, desde epoch ms."""
+    ms = creado_en[creado_en != TS_NULO]
+    if not len(ms):
+        return []
+    dias = (ms + OFFSET_LOCAL_MS) // DIA_MS
+    present, counts = np.unique(dias, return_counts=True)
+    return [(str(np.datetime64(int(d), "D")), int(c)) for d, c in zip(present, counts)]
 
+def filas_eda(store: RespuestasCompactas, mask=None) -> list:
+    """Filas del EDA consolidado (lista de dicts) de las respuestas del almacén (o de `mask`)."""
+    sel = slice(None) if mask is None else mask
+    enc = codificar(store, mask)
+    total = len(enc["facultad"]["codes"])
+    rows = []
+    crono = metricas.Cronometro("analisis")
+    crono.marca("codificar")
+
+    # ===== Resumen =====
+    edad = store.edad[sel]
+    edad = edad[edad != EDAD_NULA].astype(np.float64)
+    edad_min = float(edad.min()) if len(edad) else None
+    edad_max = float(edad.max()) if len(edad) else None
+    edad_mean = float(edad.mean()) if len(edad) else None
     rows += [
         {"dataset": "resumen", "metric": "total_respuestas", "value": total},
-        {"dataset": "resumen", "metric": "facultades_unicas", "value": facs},
-        {"dataset": "resumen", "metric": "carreras_unicas", "value": cars},
+        {"dataset": "resumen", "metric": "facultades_unicas", "value": len(np.unique(enc["facultad"]["codes"][enc["facultad"]["codes"] >= 0]))},
+        {"dataset": "resumen", "metric": "carreras_unicas", "value": len(np.unique(enc["carrera"]["codes"][enc["carrera"]["codes"] >= 0]))},
         {"dataset": "edad_stats", "metric": "edad_min", "value": edad_min},
         {"dataset": "edad_stats", "metric": "edad_max", "value": edad_max},
         {"dataset": "edad_stats", "metric": "edad_promedio", "value": round(edad_mean, 2) if edad_mean is not None else None},
     ]
 
+    crono.marca("resumen")
+
     # ===== Por fecha =====
-    if "fecha" in df.columns:
-        fecha_counts = df["fecha"].value_counts().sort_index()
-        for fecha, cnt in fecha_counts.items():
-            rows.append({"dataset": "por_fecha", "fecha": str(fecha), "conteo": int(cnt)})
+    for fecha, cnt in fechas_locales(store.creado_en[sel]):
+        rows.append({"dataset": "por_fecha", "fecha": fecha, "conteo": cnt})
+
+    crono.marca("por_fecha")
 
     # ===== Por facultad / carrera =====
-    if "facultad" in df.columns:
-        for val, cnt in df["facultad"].value_counts().items():
-            rows.append({"dataset": "por_facultad", "facultad": val, "conteo": int(cnt)})
+    for campo in ("facultad", "carrera"):
+        for val, cnt in conteos_desc(enc[campo]["codes"], enc[campo]["cats"]):
+            rows.append({"dataset": f"por_{campo}", campo: val, "conteo": cnt})
 
-    if "carrera" in df.columns:
-        for val, cnt in df["carrera"].value_counts().items():
-            rows.append({"dataset": "por_carrera", "carrera": val, "conteo": int(cnt)})
+    crono.marca("facultad_carrera")
 
     # ===== Frecuencias de enums simples =====
     for campo in SIMPLE_ENUMS:
-        if campo in df.columns:
-            vc = df[campo].value_counts(dropna=True)
-            # ordenar si hay orden predefinido
-            order = LIKERT_ORDERS.get(campo)
-            items = (
-                [(k, vc.get(k, 0)) for k in order]
-                if order else list(vc.items())
-            )
-            for val, cnt in items:
-                rows.append({
-                    "dataset": "freq_simple",
-                    "campo": campo,
-                    "categoria": val,
-                    "conteo": int(cnt),
-                })
+        e = enc[campo]
+        # ordenar si hay orden predefinido
+        order = LIKERT_ORDERS.get(campo)
+        if order:
+            counts = np.bincount(e["codes"][e["codes"] >= 0], minlength=len(e["cats"]))
+            items = [(k, int(counts[i])) for i, k in enumerate(order)]  # vocabulario = orden Likert
+        else:
+            items = conteos_desc(e["codes"], e["cats"])
+        for val, cnt in items:
+            rows.append({"dataset": "freq_simple", "campo": campo, "categoria": val, "conteo": cnt})
+
+    crono.marca("simples")
 
     # ===== Frecuencias de multi =====
-    exploded = {}
     for col in MULTI_COLS:
-        exploded[col] = explode_multi_col(df, col)
-        if not exploded[col].empty:
-            vc = exploded[col][col].value_counts()
-            for val, cnt in vc.items():
-                rows.append({
-                    "dataset": "freq_multi",
-                    "campo": col,
-                    "categoria": val,
-                    "conteo": int(cnt),
-                })
-
-    # ===== Cruces: facultad x familiaridad / confianza =====
-    if "facultad" in df.columns and "familiaridad" in df.columns:
-        pivot = df.groupby(["facultad", "familiaridad"]).size().reset_index(name="conteo")
-        # ordenar familiaridad
-        if "familiaridad" in LIKERT_ORDERS:
-            pivot["familiaridad"] = pd.Categorical(
-                pivot["familiaridad"], categories=LIKERT_ORDERS["familiaridad"], ordered=True
-            )
-            pivot = pivot.sort_values(["facultad", "familiaridad"])
-        for _, r in pivot.iterrows():
-            rows.append({
-                "dataset": "cross_facultad_familiaridad",
-                "facultad": r["facultad"],
-                "familiaridad": str(r["familiaridad"]),
-                "conteo": int(r["conteo"]),
-            })
-
-    if "facultad" in df.columns and "confianza" in df.columns:
-        pivot = df.groupby(["facultad", "confianza"]).size().reset_index(name="conteo")
-        if "confianza" in LIKERT_ORDERS:
-            pivot["confianza"] = pd.Categorical(
-                pivot["confianza"], categories=LIKERT_ORDERS["confianza"], ordered=True
-            )
-            pivot = pivot.sort_values(["facultad", "confianza"])
-        for _, r in pivot.iterrows():
-            rows.append({
-                "dataset": "cross_facultad_confianza",
-                "facultad": r["facultad"],
-                "confianza": str(r["confianza"]),
-                "conteo": int(r["conteo"]),
-            })
+        for val, cnt in freq_multi(enc[col]["matrix"], enc[col]["cats"]):
+            rows.append({"dataset": "freq_multi", "campo": col, "categoria": val, "conteo": cnt})
+
+    crono.marca("multi")
+
+    # ===== Cruces (utils.CRUCES) =====
+    rows += filas_cruces(enc, total)
+    crono.marca("cruces")
+    return rows
+
+def por_bloques(path=None):
+    """True si el EDA de `path` se calcula por bloques (EDA_MODO / tamaño del CSV)."""
+    if EDA_MODO in ("memoria", "bloques"):
+        return EDA_MODO == "bloques"
+    path = path or SRC_CSV
+    return os.path.exists(path) and os.path.getsize(path) > EDA_MEMORIA_MAX_MB * 1024 * 1024
+
+@metricas.cronometrado("analisis")
+def main(reconciliar=True):
+    crono = metricas.Cronometro("analisis")
+    agg = None
+    if por_bloques(SRC_CSV):
+        if not os.path.exists(SRC_CSV) or os.path.getsize(SRC_CSV) == 0:
+            print("⚠️  respuestas_ia.csv no existe o está vacío. Exporta primero: python exportar_csv.py")
+            sys.exit(0)
+        try:
+            from . import eda_bloques
+        except ImportError:
+            import eda_bloques
+        agg = eda_bloques.calcular(SRC_CSV)
+        crono.marca("bloques")
+        rows = agregados.filas_eda(agg)
+        detalle = f"{agg['total']} respuestas, por bloques de {eda_bloques.EDA_BLOQUE_MB:g} MB"
+    else:
+        store = cargar_respuestas(SRC_CSV)
+        crono.marca("carga")
+        rows = filas_eda(store)
+        detalle = f"{store.n} respuestas, {store.nbytes() / 1e6:.1f} MB en memoria"
+    crono.marca("filas")
 
     # ===== Construir y guardar CSV único =====
     eda_df = pd.DataFrame(rows)
-    eda_df.to_csv(OUT_CSV, index=False, encoding=ENCODING)
+    with atomic_write(OUT_CSV, encoding=ENCODING) as f:  # /api/stats puede leerlo mientras tanto
+        eda_df.to_csv(f, index=False)
+    artefactos.comprimir_seguro(OUT_CSV)
+    if columnar.HAS_ARROW:
+        columnar.escribir_eda(rows, columnar.ruta_parquet(OUT_CSV), list(eda_df.columns))
+    crono.marca("escritura")
 
     print(f"✅ EDA consolidado generado: {OUT_CSV}")
-    print(f"   Filas totales: {len(eda_df)}")
+    print(f"   Filas totales: {len(eda_df)} ({detalle})")
     print("   Columna clave para segmentar: 'dataset'")
 
+    if reconciliar:
+        reconciliar_agregados(agg)
+
 if __name__ == "__main__":
     main()
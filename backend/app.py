@@ -1,19 +1,52 @@
 import os
+import time
 import importlib
-from datetime import datetime
+import threading
+from datetime import date
 from flask import (
-    Flask, request, jsonify, send_from_directory
+    Flask, Response, g, request, jsonify, send_file, send_from_directory
 )
+from werkzeug.security import safe_join
 from dotenv import load_dotenv
 
-# Appwrite
-from appwrite.client import Client
-from appwrite.services.databases import Databases
-
 # Validación de payload
 # from utils import validate_payload
 from .utils import validate_payload
 
+# Arranque liviano: solo se importa lo que usa el formulario. El SDK de Appwrite (vía almacen),
+# pyarrow (vía columnar), pandas/numpy (exportar_csv, analisis_datos) e importar se cargan en
+# su primer uso; ver backend_module().
+
+# Almacén de respuestas (ALMACEN=appwrite por defecto, o sqlite embebido)
+from .almacen import get_almacen
+
+# Agregados incrementales del EDA (se actualizan con cada respuesta aceptada)
+from . import agregados
+
+# JSON del EDA para el panel (cacheado por versión de los agregados, con ETag)
+from . import estadisticas
+
+# Buckets de actividad por minuto/hora/día/semana (se suman junto con los agregados)
+from . import actividad
+
+# Archivos generados: copias .gz/.br y descarga filtrada en streaming
+from . import artefactos
+
+# Frontend estático en memoria: CSS/JS con huella, precomprimido y cacheable como inmutable
+from .estaticos import Estaticos
+
+# Trabajos en segundo plano (recompute) con una sola ejecución a la vez entre workers
+from . import trabajos
+
+# Contadores e histogramas por proceso, sumados entre workers en /metrics
+from . import metricas
+
+# Claves de idempotencia de /api/response (tabla acotada en la base local)
+from . import idempotencia
+
+# Escritura diferida opcional (WRITE_BEHIND=1): bitácora local + envío en segundo plano
+from . import cola_respuestas
+
 # -------------------------------------------------------------------
 # Configuración base
 # -------------------------------------------------------------------
@@ -22,37 +55,70 @@ FRONT_DIR = os.path.abspath(os.path.join(BASE_DIR, "..", "frontend"))
 
 load_dotenv(os.path.join(BASE_DIR, ".env"))
 
-APPWRITE_ENDPOINT       = os.getenv("APPWRITE_ENDPOINT", "https://cloud.appwrite.io/v1")
-APPWRITE_PROJECT_ID     = os.getenv("APPWRITE_PROJECT_ID") or os.getenv("APPWRITE_PROJECT")
-APPWRITE_API_KEY        = os.getenv("APPWRITE_API_KEY")
-APPWRITE_DATABASE_ID    = os.getenv("APPWRITE_DATABASE_ID") or os.getenv("APPWRITE_DATABASE")
-APPWRITE_COLLECTION_ID  = os.getenv("APPWRITE_COLLECTION_ID") or os.getenv("APPWRITE_COLLECTION")
+# Importación masiva: tamaño máximo del cuerpo, errores por fila en la respuesta y clave.
+# /api/responses/batch solo existe con IMPORT_TOKEN definido ("Authorization: Bearer <IMPORT_TOKEN>");
+# sin él responde 404 (el formulario público solo necesita /api/response). La CLI
+# (python -m backend.importar) no pasa por aquí.
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(64 * 1024 * 1024)))
+IMPORT_MAX_ERRORES = int(os.getenv("IMPORT_MAX_ERRORES", "1000"))
+IMPORT_TOKEN = os.getenv("IMPORT_TOKEN", "").strip()
+
+# /api/actividad: ventanas por petición y buckets por serie como máximo
+MAX_VENTANAS = 10
+MAX_BUCKETS_SERIE = 5000
+
+# /metrics: clave opcional (Authorization: Bearer <METRICAS_TOKEN>). Perfilado de una
+# petición con cProfile: solo si PERFIL_TOKEN está definido y llega en X-Perfil o ?_perfil=
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN", "").strip()
+PERFIL_TOKEN = os.getenv("PERFIL_TOKEN", "").strip()
+
+# Pipeline de arranque (export + EDA):
+# - fondo (por defecto): se lanza como trabajo "recompute" PIPELINE_RETRASO segundos después de
+#   la primera petición atendida; mientras tanto el panel usa el último EDA persistido.
+#   No se repite si otro worker lo terminó hace menos de PIPELINE_VIGENCIA segundos.
+# - bloqueante: corre antes de app.run (servidor de desarrollo, comportamiento anterior).
+# - no: solo con el botón Recalcular.
+PIPELINE_ARRANQUE = os.getenv("PIPELINE_ARRANQUE", "fondo").strip().lower()
+PIPELINE_RETRASO = float(os.getenv("PIPELINE_RETRASO", "3"))
+PIPELINE_VIGENCIA = float(os.getenv("PIPELINE_VIGENCIA", "600"))
+
+# Archivos generados que se pueden descargar por /csv-data (nunca .env, la base local, etc.)
+DESCARGABLES = {".csv": "text/csv", ".parquet": "application/vnd.apache.parquet"}
 
 # Flask
 app = Flask(__name__, static_folder=FRONT_DIR, template_folder=None)
 app.config["JSON_SORT_KEYS"] = False
 
+# Se construye al arrancar cada worker (y se rehace si cambia algún archivo del frontend)
+estaticos = Estaticos(FRONT_DIR)
+estaticos.archivos()
+
 
 # -------------------------------------------------------------------
 # Utilidades
 # -------------------------------------------------------------------
 def make_appwrite():
-    """Crea un cliente Appwrite configurado desde .env."""
-    missing = [k for k, v in {
-        "APPWRITE_ENDPOINT": APPWRITE_ENDPOINT,
-        "APPWRITE_PROJECT_ID": APPWRITE_PROJECT_ID,
-        "APPWRITE_API_KEY": APPWRITE_API_KEY,
-        "APPWRITE_DATABASE_ID": APPWRITE_DATABASE_ID,
-        "APPWRITE_COLLECTION_ID": APPWRITE_COLLECTION_ID,
-    }.items() if not v]
-    if missing:
-        raise RuntimeError(f"Faltan variables en .env: {', '.join(missing)}")
-
-    client = Client()
-    client.set_endpoint(APPWRITE_ENDPOINT)
-    client.set_project(APPWRITE_PROJECT_ID)
-    client.set_key(APPWRITE_API_KEY)
-    return client
+    """Cliente Appwrite del proceso (se crea una vez y reutiliza conexiones)."""
+    return backend_module("appwrite_config").get_client()
+
+
+def registrar_agregados(data, doc_id):
+    """
+    Suma la respuesta a los agregados del EDA (y a su bitácora de pendientes, de donde la toma
+    el índice de /api/query); un fallo aquí no afecta el envío.
+    """
+    try:
+        agregados.registrar(data, doc_id)
+    except Exception as e:
+        print(f"[agregados] No se pudo registrar {doc_id}: {e}")
+
+
+def backend_module(name):
+    """
+    Importa un módulo del backend (exportar_csv, analisis_datos...) dentro del mismo paquete
+    que app, para que comparta estado de proceso (p. ej. el client de Appwrite).
+    """
+    return importlib.import_module(f"{__package__}.{name}" if __package__ else name)
 
 
 def run_pipeline_once():
@@ -62,15 +128,15 @@ def run_pipeline_once():
     """
     if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
         try:
-            exportar = importlib.import_module("exportar_csv")
+            exportar = backend_module("exportar_csv")
             # Debe existir una función exportar() en exportar_csv.py
-            exportar.exportar()
+            exportar.exportar(fondo=True)
             print("[pipeline] Exportación completada.")
         except Exception as e:
             print(f"[pipeline] Error exportando CSV: {e}")
 
         try:
-            analisis = importlib.import_module("analisis_datos")
+            analisis = backend_module("analisis_datos")
             # Debe existir una función main() en analisis_datos.py
             analisis.main()
             print("[pipeline] Análisis (EDA) completado.")
@@ -78,23 +144,88 @@ def run_pipeline_once():
             print(f"[pipeline] Error en análisis: {e}")
 
 
+_pipeline_programado = threading.Event()
+
+
+def pipeline_en_fondo():
+    """Lanza export + EDA como trabajo "recompute", salvo que uno reciente ya haya terminado."""
+    try:
+        previo = trabajos.ultimo("recompute")
+        if previo and previo["estado"] == "terminado" and time.time() - previo["fin"] < PIPELINE_VIGENCIA:
+            print("[pipeline] Recálculo reciente; se omite el de arranque.")
+            return
+        trabajo, nuevo = trabajos.iniciar("recompute", etapas_recompute())
+        print(f"[pipeline] Recálculo de arranque {'lanzado' if nuevo else 'en curso'}: {trabajo['id']}")
+    except Exception as e:
+        print(f"[pipeline] No se pudo lanzar el recálculo de arranque: {e}")
+
+
+# -------------------------------------------------------------------
+# Instrumentación de peticiones
+# -------------------------------------------------------------------
+@app.before_request
+def programar_pipeline():
+    # una vez por proceso, ya atendiendo peticiones: el recálculo no retrasa la primera respuesta
+    if PIPELINE_ARRANQUE == "fondo" and not _pipeline_programado.is_set():
+        _pipeline_programado.set()
+        temporizador = threading.Timer(PIPELINE_RETRASO, pipeline_en_fondo)
+        temporizador.daemon = True
+        temporizador.start()
+
+
+@app.before_request
+def iniciar_medicion():
+    g.t0 = time.perf_counter()
+    if PERFIL_TOKEN and PERFIL_TOKEN in (request.headers.get("X-Perfil"), request.args.get("_perfil")):
+        g.perfil = metricas.Perfil()
+
+
+@app.after_request
+def terminar_medicion(resp):
+    """Latencia por endpoint (regla de la ruta, no la URL) y, si se pidió, el perfil en texto."""
+    regla = request.url_rule.rule if request.url_rule else "sin_ruta"
+    metricas.observar(
+        "http_duracion_segundos", time.perf_counter() - g.t0,
+        endpoint=regla, metodo=request.method, estado=resp.status_code,
+    )
+    perfil = g.pop("perfil", None)
+    if perfil is not None:
+        return Response(perfil.texto(), mimetype="text/plain", headers={"X-Estado-Original": str(resp.status_code)})
+    return resp
+
+
+@app.get("/metrics")
+def metrics():
+    """Métricas de todos los workers en formato de exposición de Prometheus."""
+    if METRICAS_TOKEN and request.headers.get("Authorization", "") != f"Bearer {METRICAS_TOKEN}":
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    try:
+        texto = metricas.prometheus()
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return Response(texto, mimetype="text/plain; version=0.0.4", headers={"Cache-Control": "no-store"})
+
+
 # -------------------------------------------------------------------
 # Rutas para FRONTEND estático
 # -------------------------------------------------------------------
 @app.get("/")
 def home():
     """Entrega el formulario principal."""
-    return send_from_directory(FRONT_DIR, "index.html")
+    return estaticos.respuesta("index.html", request, Response)
 
 @app.get("/csv.html")
 def csv_panel():
     """Entrega la página del panel CSV (con clave simple en el front)."""
-    return send_from_directory(FRONT_DIR, "csv.html")
+    return estaticos.respuesta("csv.html", request, Response)
 
 @app.get("/<path:path>")
 def assets(path):
-    """Entrega cualquier archivo estático del frontend (CSS/JS/imagenes)."""
-    return send_from_directory(FRONT_DIR, path)
+    """
+    Entrega cualquier archivo estático del frontend (CSS/JS/imagenes). Los construidos en
+    memoria salen precomprimidos; el resto (imágenes...) se lee del disco.
+    """
+    return estaticos.respuesta(path, request, Response) or send_from_directory(FRONT_DIR, path)
 
 
 # -------------------------------------------------------------------
@@ -103,35 +234,133 @@ def assets(path):
 @app.post("/api/response")
 def create_response():
     """
-    Recibe el JSON del formulario, valida y guarda en Appwrite.
+    Recibe el JSON del formulario, valida y guarda en el almacén (Appwrite por defecto).
+    Con Idempotency-Key los reintentos no duplican la respuesta.
     """
     try:
-        payload = request.get_json(force=True, silent=False)
+        with metricas.medir("response.json"):
+            payload = request.get_json(force=True, silent=False)
     except Exception:
         return jsonify({"ok": False, "error": "JSON inválido"}), 400
 
-    ok, data_or_errors = validate_payload(payload or {})
+    with metricas.medir("response.validacion"):
+        ok, data_or_errors = validate_payload(payload or {})
     if not ok:
         return jsonify({"ok": False, "errors": data_or_errors}), 422
 
-    # Crear documento en Appwrite
+    # Idempotency-Key: un reintento recibe la respuesta original sin otra escritura
+    try:
+        clave = idempotencia.clave_de(request.headers.get("Idempotency-Key"))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    if clave is None:
+        return guardar_respuesta(data_or_errors)
     try:
-        client = make_appwrite()
-        databases = Databases(client)
+        estado, previa = idempotencia.reservar(clave, idempotencia.huella(data_or_errors))
+    except Exception as e:
+        # sin la tabla de claves queda el $id determinista: el almacén rechaza la segunda escritura
+        print(f"[idempotencia] No se pudo reservar la clave: {e}")
+        return guardar_respuesta(data_or_errors, idempotencia.doc_id(clave))
+    metricas.contar("idempotencia_total", resultado=estado)
+    if estado == "hecho":
+        codigo, cuerpo = previa
+        return Response(cuerpo, status=codigo, mimetype="application/json", headers={"Idempotent-Replayed": "true"})
+    if estado == "en_curso":
+        error = "Hay un envío en curso con esta clave; reintenta en un momento."
+        return jsonify({"ok": False, "error": error}), 409, {"Retry-After": "1"}
+    if estado == "distinta":
+        return jsonify({"ok": False, "error": "La clave de idempotencia ya se usó con otras respuestas."}), 422
+
+    try:
+        resp, codigo = guardar_respuesta(data_or_errors, idempotencia.doc_id(clave))
+    except BaseException:
+        idempotencia.liberar(clave)
+        raise
+    if codigo < 500:
+        idempotencia.completar(clave, codigo, resp.get_data(as_text=True))
+    else:
+        idempotencia.liberar(clave)
+    return resp, codigo
 
-        # El SDK moderno suele crear ID automático con ID.unique(); aquí
-        # si no lo tienes, Appwrite genera uno si pasas "unique()".
-        document = databases.create_document(
-            database_id=APPWRITE_DATABASE_ID,
-            collection_id=APPWRITE_COLLECTION_ID,
-            document_id="unique()",   # ID automático
-            data=data_or_errors
-        )
-        # Devuelve el documento creado y ok True
-        return jsonify({"ok": True, "id": document.get("$id"), **data_or_errors}), 201
 
+def guardar_respuesta(data, doc_id=None):
+    """Escribe una respuesta validada (bitácora o almacén). Retorna (Response JSON, código)."""
+    # Modo write-behind: se confirma al guardar en la bitácora local
+    if cola_respuestas.WRITE_BEHIND:
+        try:
+            with metricas.medir("response.encolar"):
+                doc_id = cola_respuestas.encolar(data, doc_id)
+        except Exception as e:
+            return jsonify({"ok": False, "error": str(e)}), 500
+        registrar_agregados(data, doc_id)
+        return jsonify({"ok": True, "id": doc_id, "pendiente": True, **data}), 202
+
+    # Crear documento en el almacén (Appwrite o SQLite, ver almacen.py)
+    try:
+        with metricas.medir("response.almacen"):
+            doc_id = get_almacen().guardar(data, doc_id=doc_id)
+    except Exception as e:
+        if doc_id and getattr(e, "code", None) == 409:
+            # ya hay un documento con esta clave (p. ej. la tabla de idempotencia se podó
+            # entretanto): es un reintento solo si guarda las mismas respuestas
+            return respuesta_duplicada(data, doc_id)
+        return jsonify({"ok": False, "error": str(e)}), 500
+    with metricas.medir("response.agregados"):
+        registrar_agregados(data, doc_id)
+    # Devuelve el documento creado y ok True
+    return jsonify({"ok": True, "id": doc_id, **data}), 201
+
+
+def respuesta_duplicada(data, doc_id):
+    """Respuesta a un 409 del almacén con un $id de idempotencia: reintento (200) o clave reusada (422)."""
+    try:
+        previo = get_almacen().obtener(doc_id)
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
+    if previo is None or not idempotencia.misma_respuesta(previo, data):
+        return jsonify({"ok": False, "error": "La clave de idempotencia ya se usó con otras respuestas."}), 422
+    guardado = {k: v for k, v in previo.items() if not k.startswith("$")}
+    return jsonify({"ok": True, "id": doc_id, "duplicado": True, **guardado}), 200
+
+
+@app.post("/api/responses/batch")
+def create_responses_batch():
+    """
+    Importación masiva: cuerpo NDJSON (una respuesta por línea), CSV con el esquema de
+    respuestas_ia.csv o un arreglo JSON (según Content-Type o ?formato=). Cada fila se valida
+    con las reglas de /api/response y conserva su creado_en si lo trae. ?validar=1 solo valida.
+    Responde el reporte con los errores por fila (200 si todas entraron, 207 si hubo rechazos).
+    Desactivado (404) mientras no se configure IMPORT_TOKEN.
+    """
+    if not IMPORT_TOKEN:
+        return jsonify({"ok": False, "error": "No encontrado"}), 404
+    if request.headers.get("Authorization", "") != f"Bearer {IMPORT_TOKEN}":
+        return jsonify({"ok": False, "error": "No autorizado"}), 401
+    if (request.content_length or 0) > IMPORT_MAX_BYTES:
+        return jsonify({"ok": False, "error": f"El cuerpo supera {IMPORT_MAX_BYTES} bytes"}), 413
+    importar = backend_module("importar")
+    formato = request.args.get("formato") or importar.detectar_formato(content_type=request.content_type or "")
+    if formato not in importar.FORMATOS:
+        return jsonify({"ok": False, "error": f"Formato no soportado: {formato}"}), 400
+    try:
+        texto = request.get_data(cache=False).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        return jsonify({"ok": False, "error": "El cuerpo debe estar en UTF-8"}), 400
+
+    try:
+        reporte = importar.importar_texto(
+            texto, formato, guardar=request.args.get("validar", "0") not in {"1", "true"},
+        )
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    errores = reporte["errores"]
+    if len(errores) > IMPORT_MAX_ERRORES:
+        reporte["errores"] = errores[:IMPORT_MAX_ERRORES]
+        reporte["errores_omitidos"] = len(errores) - IMPORT_MAX_ERRORES
+    return jsonify({"ok": not errores, **reporte}), 207 if errores else 200
 
 
 # -------------------------------------------------------------------
@@ -141,30 +370,223 @@ def create_response():
 def csv_data(filename):
     """
     Sirve archivos CSV generados en el backend (p.ej. respuestas_ia.csv, eda_ia_consolidado.csv).
+    El EDA se regenera desde los agregados incrementales si hubo respuestas nuevas.
+    Usa la copia precomprimida (br/gzip) que acepte el cliente si está al día (si no, la
+    programa en segundo plano y sirve el original); responde 304 con
+    If-None-Match/If-Modified-Since y 206 con Range (descargas reanudables).
     """
-    return send_from_directory(BASE_DIR, filename)
+    mimetype = DESCARGABLES.get(os.path.splitext(filename)[1])
+    path = safe_join(BASE_DIR, filename)
+    if mimetype is None or path is None or not os.path.isfile(path):
+        return jsonify({"ok": False, "error": "Archivo no encontrado"}), 404
+    if filename == "eda_ia_consolidado.csv":
+        try:
+            if agregados.publicar_si_cambio(path):
+                artefactos.comprimir_seguro(path)
+        except Exception as e:
+            print(f"[agregados] No se pudo actualizar el EDA: {e}")
+    elif filename.endswith(".csv"):
+        try:
+            artefactos.programar(path)  # copias .gz/.br viejas: se regeneran en segundo plano
+        except Exception as e:
+            print(f"[artefactos] No se pudo programar la compresión de {filename}: {e}")
+
+    servido, encoding = artefactos.variante(path, request.accept_encodings)
+    resp = send_file(servido, mimetype=mimetype, conditional=True, etag=True, max_age=None)
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
+@app.get("/api/export/respuestas.csv")
+def export_filtrado():
+    """
+    Descarga respuestas_ia.csv filtrado, en streaming (gzip si el cliente lo acepta).
+    Filtros: ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD (fecha local, inclusive), ?facultad=a,b, ?carrera=x.
+    """
+    path = os.path.join(BASE_DIR, "respuestas_ia.csv")
+    if not os.path.isfile(path):
+        return jsonify({"ok": False, "error": "Aún no hay export. Usa Recalcular."}), 404
+    fechas = {}
+    for nombre in ("desde", "hasta"):
+        valor = request.args.get(nombre)
+        if valor:
+            try:
+                # normalizada (2024-01-02): filtrar_csv la compara como texto con la fecha local
+                fechas[nombre] = date.fromisoformat(valor).isoformat()
+            except ValueError:
+                return jsonify({"ok": False, "error": f"'{nombre}' debe tener formato YYYY-MM-DD."}), 400
+    desde, hasta = fechas.get("desde"), fechas.get("hasta")
+
+    gz = bool(request.accept_encodings["gzip"])
+    chunks = artefactos.filtrar_csv(
+        path, desde=desde, hasta=hasta,
+        facultades=request.args.get("facultad"), carreras=request.args.get("carrera"),
+        gzip_stream=gz,
+    )
+    resp = Response(chunks, mimetype="text/csv")
+    resp.headers["Content-Disposition"] = 'attachment; filename="respuestas_ia_filtrado.csv"'
+    if gz:
+        resp.headers["Content-Encoding"] = "gzip"
+    resp.vary.add("Accept-Encoding")
+    return resp
+
+
+@app.get("/api/stats")
+def stats():
+    """
+    Bloques del EDA como JSON: {"datasets": {dataset: [filas]}}. ?dataset=resumen,por_fecha
+    limita los bloques. Con If-None-Match igual al ETag actual responde 304 sin cuerpo.
+    """
+    nombres = ",".join(request.args.getlist("dataset")).split(",")
+    try:
+        etag, body = estadisticas.respuesta(nombres)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.if_none_match.contains(etag.strip('"')):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
+
+
+@app.get("/api/query")
+def query():
+    """
+    EDA de un subconjunto: ?facultad=a,b&herramientas=copilot&edad_min=18&desde=YYYY-MM-DD...
+    (OR dentro de un campo, AND entre campos). Responde {"total", "filtros", "ms", "datasets"};
+    ?dataset=freq_multi,cross_... limita los bloques como en /api/stats.
+    """
+    consultas = backend_module("consultas")
+    try:
+        filtros = consultas.filtros_de(request.args)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    nombres = [n for n in ",".join(request.args.getlist("dataset")).split(",") if n]
+    t0 = time.perf_counter()
+    try:
+        with metricas.medir("consulta"):
+            total, rows = consultas.consultar(filtros, nombres)
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    return jsonify({
+        "ok": True,
+        "total": total,
+        "filtros": {k: str(v) if isinstance(v, date) else v for k, v in filtros.items()},
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+        "datasets": estadisticas.agrupar(rows),
+    })
+
+
+def _lista_param(nombre):
+    """?x=a,b&x=c -> ["a", "b", "c"]"""
+    return [v.strip() for v in ",".join(request.args.getlist(nombre)).split(",") if v.strip()]
+
+
+@app.get("/api/actividad")
+def actividad_en_vivo():
+    """
+    Actividad reciente para que el panel la consulte durante una campaña: conteos por ventana
+    móvil (?ventanas=5m,1h,24h,7d), serie por minuto de la última hora y reparto por facultad.
+    Filtros opcionales ?facultad=a,b&carrera=x.
+    """
+    ventanas = _lista_param("ventanas") or list(actividad.VENTANAS)
+    if len(ventanas) > MAX_VENTANAS:
+        return jsonify({"ok": False, "error": f"Máximo {MAX_VENTANAS} ventanas."}), 400
+    try:
+        for v in ventanas:
+            actividad.duracion(v)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    try:
+        datos = actividad.en_vivo(ventanas, _lista_param("facultad"), _lista_param("carrera"))
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    resp = jsonify({"ok": True, **datos})
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
+
+@app.get("/api/actividad/serie")
+def actividad_serie():
+    """
+    Serie de envíos: ?granularidad=minuto|hora|dia|semana (hora por defecto), ?desde/?hasta
+    (YYYY-MM-DD o fecha y hora ISO, hora local; por defecto los últimos 48 buckets),
+    ?facultad=a,b&carrera=x y ?por=facultad|carrera para separar la serie.
+    """
+    granularidad = request.args.get("granularidad", "hora")
+    por = request.args.get("por") or None
+    try:
+        if granularidad not in actividad.GRANULARIDADES:
+            raise ValueError(f"granularidad debe ser una de: {', '.join(actividad.GRANULARIDADES)}")
+        paso = actividad.GRANULARIDADES[granularidad]
+        hasta = actividad.momento(request.args["hasta"]) if request.args.get("hasta") else time.time() + 1
+        desde = actividad.momento(request.args["desde"]) if request.args.get("desde") else hasta - 48 * paso
+        if hasta <= desde:
+            raise ValueError("'hasta' debe ser posterior a 'desde'.")
+        if (hasta - desde) / paso > MAX_BUCKETS_SERIE:
+            raise ValueError(f"El rango pide más de {MAX_BUCKETS_SERIE} buckets; usa una granularidad mayor.")
+        desde = actividad.inicio(desde, granularidad)
+        filas = actividad.serie(granularidad, desde, hasta, _lista_param("facultad"), _lista_param("carrera"), por)
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"ok": False, "error": str(e)}), 500
+    claves = ("inicio", por, "conteo") if por else ("inicio", "conteo")
+    return jsonify({
+        "ok": True,
+        "granularidad": granularidad,
+        "desde": actividad.iso_local(desde),
+        "hasta": actividad.iso_local(hasta),
+        "serie": [dict(zip(claves, (actividad.iso_local(f[0]), *f[1:]))) for f in filas],
+    })
+
+
+def etapas_recompute():
+    """
+    Etapas del recálculo completo: export desde el almacén + EDA. Los módulos (y pandas) se
+    importan dentro del trabajo, no en la petición que lo lanza.
+    """
+    return [
+        ("exportar", lambda: backend_module("exportar_csv").exportar(fondo=True)),
+        ("analisis", lambda: backend_module("analisis_datos").main()),
+    ]
 
 
 @app.post("/api/recompute")
 def recompute():
     """
-    Recalcula export + EDA bajo demanda desde el botón del panel CSV.
+    Lanza export + EDA en segundo plano desde el botón del panel CSV y responde de inmediato
+    con el id del trabajo. Si ya hay un recálculo en curso (en cualquier worker) se une a él.
     """
     try:
-        exportar = importlib.import_module("exportar_csv")
-        exportar.exportar()
-        analisis = importlib.import_module("analisis_datos")
-        analisis.main()
-        return jsonify({"ok": True, "msg": "Recalculado"}), 200
+        trabajo, nuevo = trabajos.iniciar("recompute", etapas_recompute())
+        return jsonify({"ok": True, "id": trabajo["id"], "nuevo": nuevo, "trabajo": trabajo}), 202
     except Exception as e:
         return jsonify({"ok": False, "error": str(e)}), 500
 
 
+@app.get("/api/recompute/<job_id>")
+def recompute_status(job_id):
+    """Estado, progreso y tiempos por etapa de un recálculo."""
+    trabajo = trabajos.estado(job_id)
+    if trabajo is None:
+        return jsonify({"ok": False, "error": "Trabajo no encontrado"}), 404
+    return jsonify({"ok": True, "trabajo": trabajo}), 200
+
+
+if cola_respuestas.WRITE_BEHIND:
+    # drena lo que haya quedado en la bitácora de una ejecución anterior
+    cola_respuestas.asegurar_flusher()
+
+
 # -------------------------------------------------------------------
 # Main
 # -------------------------------------------------------------------
 if __name__ == "__main__":
-    # Ejecutar pipeline al iniciar (y en cada recarga del reloader)
-    run_pipeline_once()
+    # Ejecutar pipeline antes de levantar el servidor (y en cada recarga del reloader)
+    if PIPELINE_ARRANQUE == "bloqueante":
+        run_pipeline_once()
     # Levantar servidor
     app.run(host="0.0.0.0", port=5000, debug=True)
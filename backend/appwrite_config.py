@@ -1,22 +1,163 @@
 import os
+import re
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
+import appwrite.client as _sdk
 from appwrite.client import Client
 from appwrite.services.databases import Databases
 
-load_dotenv()
+try:
+    from . import metricas
+except ImportError:
+    import metricas
 
-APPWRITE_ENDPOINT = os.getenv("APPWRITE_ENDPOINT")
-APPWRITE_PROJECT_ID = os.getenv("APPWRITE_PROJECT_ID")
-APPWRITE_API_KEY = os.getenv("APPWRITE_API_KEY")
-APPWRITE_DATABASE_ID = os.getenv("APPWRITE_DATABASE_ID")
-APPWRITE_COLLECTION_ID = os.getenv("APPWRITE_COLLECTION_ID")
+BASE_DIR = os.path.dirname(__file__)
+load_dotenv(os.path.join(BASE_DIR, ".env"))
 
-if not all([APPWRITE_ENDPOINT, APPWRITE_PROJECT_ID, APPWRITE_API_KEY, APPWRITE_DATABASE_ID, APPWRITE_COLLECTION_ID]):
-    raise RuntimeError("Faltan variables de entorno de Appwrite en .env")
+APPWRITE_ENDPOINT      = os.getenv("APPWRITE_ENDPOINT", "https://cloud.appwrite.io/v1")
+APPWRITE_PROJECT_ID    = os.getenv("APPWRITE_PROJECT_ID") or os.getenv("APPWRITE_PROJECT")
+APPWRITE_API_KEY       = os.getenv("APPWRITE_API_KEY")
+APPWRITE_DATABASE_ID   = os.getenv("APPWRITE_DATABASE_ID") or os.getenv("APPWRITE_DATABASE")
+APPWRITE_COLLECTION_ID = os.getenv("APPWRITE_COLLECTION_ID") or os.getenv("APPWRITE_COLLECTION")
 
-client = Client()
-client.set_endpoint(APPWRITE_ENDPOINT)
-client.set_project(APPWRITE_PROJECT_ID)
-client.set_key(APPWRITE_API_KEY)
+# Pool de conexiones HTTP (keep-alive) por proceso
+APPWRITE_POOL_SIZE       = int(os.getenv("APPWRITE_POOL_SIZE", "16"))
+APPWRITE_CONNECT_TIMEOUT = float(os.getenv("APPWRITE_CONNECT_TIMEOUT", "5"))
+APPWRITE_READ_TIMEOUT    = float(os.getenv("APPWRITE_READ_TIMEOUT", "30"))
 
-databases = Databases(client)
+# Ruta de la llamada sin ids (etiqueta de métricas de cardinalidad acotada)
+_IDS_EN_RUTA = re.compile(r"/(databases|collections|documents|tables|rows)/[^/]+")
+
+
+def assert_env():
+    missing = [k for k, v in {
+        "APPWRITE_ENDPOINT": APPWRITE_ENDPOINT,
+        "APPWRITE_PROJECT_ID": APPWRITE_PROJECT_ID,
+        "APPWRITE_API_KEY": APPWRITE_API_KEY,
+        "APPWRITE_DATABASE_ID": APPWRITE_DATABASE_ID,
+        "APPWRITE_COLLECTION_ID": APPWRITE_COLLECTION_ID,
+    }.items() if not v]
+    if missing:
+        raise RuntimeError(f"Faltan variables en .env: {', '.join(missing)}")
+
+
+# Único punto de contacto con el interior del SDK: appwrite.client hace `import requests` y
+# Client.call() llama requests.request() (conexión nueva cada vez). Ese nombre se reemplaza por
+# _Transporte, que dentro de PooledClient.call() usa la Session del client (pool keep-alive) y
+# fuera de ella es `requests` tal cual. tests/test_appwrite_config.py verifica el contrato; si
+# una versión del SDK lo cambia, no se instala y las llamadas siguen sin pool.
+_en_llamada = threading.local()
+
+
+class _Transporte:
+    """`requests` visto desde appwrite.client: request() por la Session del PooledClient en curso."""
+
+    def request(self, method, url, **kwargs):
+        actual = getattr(_en_llamada, "client", None)
+        if actual is None:
+            return requests.request(method, url, **kwargs)
+        kwargs.setdefault("timeout", actual.timeout)
+        return actual.sesion().request(method, url, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+
+_TRANSPORTE = _Transporte()
+
+
+def _instalar_transporte():
+    """Pone _TRANSPORTE como el `requests` de appwrite.client. Retorna True si quedó instalado."""
+    if getattr(_sdk, "requests", None) is requests:
+        _sdk.requests = _TRANSPORTE
+    return getattr(_sdk, "requests", None) is _TRANSPORTE
+
+
+class PooledClient(Client):
+    """
+    Client de Appwrite con su propia requests.Session (HTTPAdapter con pool keep-alive, timeout
+    por defecto) y métricas por llamada. call() solo envuelve Client.call() (ver _Transporte).
+    """
+
+    def __init__(self, pool_size=APPWRITE_POOL_SIZE,
+                 timeout=(APPWRITE_CONNECT_TIMEOUT, APPWRITE_READ_TIMEOUT)):
+        super().__init__()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._sesion_lock = threading.Lock()
+        self._session = None
+        self._session_pid = None
+
+    def sesion(self):
+        # una sesión por proceso: tras un fork no se comparten sockets
+        if self._session is None or self._session_pid != os.getpid():
+            with self._sesion_lock:
+                if self._session is None or self._session_pid != os.getpid():
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session, self._session_pid = session, os.getpid()
+        return self._session
+
+    def call(self, method, path='', headers=None, params=None, response_type='json'):
+        """Client.call() por la Session de este client, midiendo duración, llamadas y errores (ver metricas.py)."""
+        ruta = _IDS_EN_RUTA.sub(r"/\1/{id}", path)
+        estado = "ok"
+        previo = getattr(_en_llamada, "client", None)
+        _en_llamada.client = self
+        t0 = time.perf_counter()
+        try:
+            return super().call(method, path, headers, params, response_type)
+        except Exception as e:
+            estado = str(getattr(e, "code", None) or "red")
+            metricas.contar("appwrite_errores_total", metodo=method, ruta=ruta, estado=estado)
+            raise
+        finally:
+            _en_llamada.client = previo
+            metricas.observar("appwrite_duracion_segundos", time.perf_counter() - t0, metodo=method, ruta=ruta)
+            metricas.contar("appwrite_llamadas_total", metodo=method, ruta=ruta, estado=estado)
+
+
+_lock = threading.Lock()
+_client = None
+_client_pid = None
+
+
+def get_client():
+    """
+    Client Appwrite compartido por todo el proceso (uno por worker de gunicorn).
+    Se crea en el primer uso; si el proceso se bifurcó después de crearlo, se crea otro
+    para no compartir sockets entre procesos.
+    """
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            assert_env()
+            if not _instalar_transporte():
+                print("⚠️ appwrite.client no usa requests.request(); llamadas a Appwrite sin pool keep-alive.")
+            client = PooledClient()
+            client.set_endpoint(APPWRITE_ENDPOINT)
+            client.set_project(APPWRITE_PROJECT_ID)
+            client.set_key(APPWRITE_API_KEY)
+            _client, _client_pid = client, os.getpid()
+    return _client
+
+
+def get_databases():
+    """Servicio Databases sobre el client compartido (es solo un envoltorio liviano)."""
+    return Databases(get_client())
+
+
+def __getattr__(name):
+    # compatibilidad: `from appwrite_config import client, databases`
+    if name == "client":
+        return get_client()
+    if name == "databases":
+        return get_databases()
+    raise AttributeError(name)
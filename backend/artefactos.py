@@ -0,0 +1,142 @@
+# Archivos generados (CSV del export y del EDA): copias precomprimidas para servirlas con
+# Content-Encoding, y la descarga filtrada en streaming de respuestas_ia.csv.
+# Las copias de respuestas_ia.csv se generan al pedir el archivo, en segundo plano (programar):
+# el export no recomprime todo el CSV cada vez que agrega unas filas.
+import os
+import io
+import csv
+import gzip
+import zlib
+import shutil
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except Exception:
+    HAS_BROTLI = False
+
+try:
+    from .utils import atomic_write
+    from .agregados import fecha_local
+except ImportError:
+    from utils import atomic_write
+    from agregados import fecha_local
+
+ENCODING = "utf-8-sig"
+BLOQUE = 64 * 1024
+# Content-Encoding -> sufijo de la copia precomprimida (en orden de preferencia)
+SUFIJOS = {"br": ".br", "gzip": ".gz"}
+
+
+def comprimir(path):
+    """
+    Escribe path.gz (y path.br si hay brotli) junto al archivo, por bloques y de forma atómica.
+    Las copias quedan con el mtime que tenía el original al empezar: si cambia mientras tanto,
+    variante() no las sirve.
+    """
+    if not os.path.exists(path):
+        return
+    mtime = os.stat(path).st_mtime_ns
+    with open(path, "rb") as src, atomic_write(path + ".gz", mode="wb") as dst:
+        with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6, mtime=0) as gz:
+            shutil.copyfileobj(src, gz, BLOQUE)
+    os.utime(path + ".gz", ns=(mtime, mtime))
+    if HAS_BROTLI:
+        comp = brotli.Compressor(quality=9)
+        with open(path, "rb") as src, atomic_write(path + ".br", mode="wb") as dst:
+            for chunk in iter(lambda: src.read(BLOQUE), b""):
+                dst.write(comp.process(chunk))
+            dst.write(comp.finish())
+        os.utime(path + ".br", ns=(mtime, mtime))
+    elif os.path.exists(path + ".br"):
+        os.remove(path + ".br")  # no dejar una copia vieja
+
+
+def comprimir_seguro(path):
+    """comprimir() sin interrumpir el pipeline: si falla se sirve el archivo sin comprimir."""
+    try:
+        comprimir(path)
+    except Exception as e:
+        print(f"⚠️ No se pudo comprimir {os.path.basename(path)}: {e}")
+
+
+def _vigente(comprimido, path):
+    return os.path.exists(comprimido) and os.path.getmtime(comprimido) >= os.path.getmtime(path)
+
+
+def programar(path):
+    """
+    Comprime `path` en segundo plano si alguna de sus copias falta o quedó más vieja que él: un
+    trabajo single-flight entre workers (ver trabajos.py), así varias peticiones seguidas no
+    comprimen dos veces. Mientras tanto variante() sirve el original. Retorna el registro del
+    trabajo (None si las copias están al día).
+    """
+    sufijos = [".gz", ".br"] if HAS_BROTLI else [".gz"]
+    if not os.path.exists(path) or all(_vigente(path + s, path) for s in sufijos):
+        return None
+    try:
+        from . import trabajos
+    except ImportError:
+        import trabajos
+    trabajo, _ = trabajos.iniciar("comprimir-" + os.path.basename(path), [("comprimir", lambda: comprimir(path))])
+    return trabajo
+
+
+def variante(path, accept_encodings):
+    """
+    (ruta, content_encoding) a servir según Accept-Encoding: la copia precomprimida preferida
+    que el cliente acepte y no sea más vieja que el original; si no, el original (None).
+    """
+    for encoding, sufijo in SUFIJOS.items():
+        comprimido = path + sufijo
+        if accept_encodings[encoding] and _vigente(comprimido, path):
+            return comprimido, encoding
+    return path, None
+
+
+def _lista(valor):
+    return {v.strip() for v in (valor or "").split(",") if v.strip()}
+
+
+def filtrar_csv(path, desde=None, hasta=None, facultades=None, carreras=None, gzip_stream=False):
+    """
+    Genera respuestas_ia.csv filtrado en bloques de ~64 KB (memoria constante).
+    desde/hasta: fechas YYYY-MM-DD (America/Bogota, ambas inclusive); facultades/carreras:
+    valores separados por coma. Con gzip_stream los bloques salen comprimidos.
+    """
+    facultades, carreras = _lista(facultades), _lista(carreras)
+    comp = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip_stream else None  # wbits 31 = gzip
+    emitir = (lambda b: comp.compress(b)) if comp else (lambda b: b)
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    buf.write("\ufeff")  # BOM, como el CSV original (Excel)
+    with open(path, encoding=ENCODING, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None) or []
+        writer.writerow(header)
+        col = {c: i for i, c in enumerate(header)}
+        i_creado, i_fac, i_car = col.get("creado_en"), col.get("facultad"), col.get("carrera")
+        for row in reader:
+            if len(row) != len(header):  # línea vacía o truncada (como csv.DictReader, se omite)
+                continue
+            if facultades and (i_fac is None or row[i_fac] not in facultades):
+                continue
+            if carreras and (i_car is None or row[i_car] not in carreras):
+                continue
+            if desde or hasta:
+                fecha = fecha_local(row[i_creado]) if i_creado is not None else None
+                if fecha is None or (desde and fecha < desde) or (hasta and fecha > hasta):
+                    continue
+            writer.writerow(row)
+            if buf.tell() >= BLOQUE:
+                out = emitir(buf.getvalue().encode("utf-8"))
+                if out:
+                    yield out
+                buf.seek(0)
+                buf.truncate()
+    out = emitir(buf.getvalue().encode("utf-8"))
+    if comp:
+        out += comp.flush()
+    if out:
+        yield out
@@ -0,0 +1,184 @@
+# Escritura diferida (write-behind) de respuestas hacia el almacén (Appwrite por defecto).
+# El payload validado se guarda en una bitácora SQLite local y se confirma al cliente con un
+# id generado aquí; un hilo por proceso vacía la bitácora hacia el almacén en lotes, con
+# reintentos. Ese id es el $id del documento, así un reintento nunca duplica la respuesta.
+import os
+import json
+import time
+import random
+import threading
+
+try:
+    from .sqlite_local import connect, transaction
+    from .almacen import get_almacen, nuevo_id
+except ImportError:
+    from sqlite_local import connect, transaction
+    from almacen import get_almacen, nuevo_id
+
+WRITE_BEHIND = os.getenv("WRITE_BEHIND", "0").strip().lower() in {"1", "true", "si", "yes"}
+FLUSH_BATCH = int(os.getenv("WRITE_BEHIND_BATCH", "50"))
+FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "1"))
+MAX_BACKOFF = 300.0
+LEASE_SECONDS = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cola_respuestas (
+    id              TEXT PRIMARY KEY,
+    datos           TEXT NOT NULL,
+    encolado        REAL NOT NULL,
+    intentos        INTEGER NOT NULL DEFAULT 0,
+    proximo_intento REAL NOT NULL DEFAULT 0,
+    reservado_hasta REAL NOT NULL DEFAULT 0,
+    fallido         INTEGER NOT NULL DEFAULT 0,
+    ultimo_error    TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cola_pendientes ON cola_respuestas (fallido, proximo_intento, encolado);
+"""
+
+_schema_ready = set()
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+def encolar(data, doc_id=None):
+    """
+    Guarda el payload validado en la bitácora y retorna el id del futuro documento. Con un
+    doc_id propio (clave de idempotencia) un segundo encolado del mismo id no hace nada.
+    """
+    doc_id = doc_id or nuevo_id()
+    _conn().execute(
+        "INSERT INTO cola_respuestas (id, datos, encolado) VALUES (?, ?, ?) ON CONFLICT (id) DO NOTHING",
+        (doc_id, json.dumps(data, ensure_ascii=False), time.time()),
+    )
+    asegurar_flusher().despertar()
+    return doc_id
+
+
+def pendientes():
+    """Conteo de la bitácora: {"pendientes": n, "fallidos": n}."""
+    row = _conn().execute(
+        "SELECT COALESCE(SUM(fallido = 0), 0), COALESCE(SUM(fallido = 1), 0) FROM cola_respuestas"
+    ).fetchone()
+    return {"pendientes": row[0], "fallidos": row[1]}
+
+
+def _reservar(limit):
+    """Toma un lote de pendientes con un lease, para que otro worker no lo envíe a la vez."""
+    now = time.time()
+    with transaction(_conn()) as conn:
+        rows = conn.execute(
+            "SELECT id, datos, intentos FROM cola_respuestas "
+            "WHERE fallido = 0 AND proximo_intento <= ? AND reservado_hasta <= ? "
+            "ORDER BY encolado LIMIT ?",
+            (now, now, limit),
+        ).fetchall()
+        conn.executemany(
+            "UPDATE cola_respuestas SET reservado_hasta = ? WHERE id = ?",
+            [(now + LEASE_SECONDS, r["id"]) for r in rows],
+        )
+    return rows
+
+
+def _confirmar(ids):
+    with transaction(_conn()) as conn:
+        conn.executemany("DELETE FROM cola_respuestas WHERE id = ?", [(i,) for i in ids])
+
+
+def _reprogramar(row, error, definitivo=False):
+    intentos = row["intentos"] + 1
+    espera = min(MAX_BACKOFF, 2 ** intentos) + random.uniform(0, 1)
+    _conn().execute(
+        "UPDATE cola_respuestas SET intentos = ?, proximo_intento = ?, reservado_hasta = 0, "
+        "fallido = ?, ultimo_error = ? WHERE id = ?",
+        (intentos, time.time() + espera, int(definitivo), str(error)[:500], row["id"]),
+    )
+
+
+def _retryable(exc):
+    code = getattr(exc, "code", None)
+    return not code or code == 429 or code >= 500
+
+
+def _enviar_uno(almacen, row):
+    try:
+        almacen.guardar(json.loads(row["datos"]), doc_id=row["id"])
+    except Exception as e:
+        # 409: ya existe (un envío anterior llegó aunque no vimos la respuesta)
+        if getattr(e, "code", None) != 409:
+            raise
+    return row["id"]
+
+
+def vaciar_lote(limit=FLUSH_BATCH):
+    """Envía un lote de la bitácora al almacén. Retorna cuántas respuestas quedaron guardadas."""
+    rows = _reservar(limit)
+    if not rows:
+        return 0
+    almacen = get_almacen()
+    try:
+        # upsert con $id propio: idempotente aunque el lote se reintente
+        almacen.guardar_lote([(r["id"], json.loads(r["datos"])) for r in rows])
+        _confirmar([r["id"] for r in rows])
+        return len(rows)
+    except Exception as e:
+        if _retryable(e):
+            for r in rows:
+                _reprogramar(r, e)
+            print(f"[write-behind] Lote de {len(rows)} reprogramado: {e}")
+            return 0
+
+    # el lote fue rechazado (p. ej. un documento inválido o sin soporte bulk): uno por uno
+    ok = []
+    for r in rows:
+        try:
+            ok.append(_enviar_uno(almacen, r))
+        except Exception as e:
+            _reprogramar(r, e, definitivo=not _retryable(e))
+            print(f"[write-behind] Respuesta {r['id']} no enviada: {e}")
+    _confirmar(ok)
+    return len(ok)
+
+
+class Flusher(threading.Thread):
+    """Hilo de fondo (uno por proceso) que vacía la bitácora hacia Appwrite."""
+
+    def __init__(self):
+        super().__init__(name="write-behind", daemon=True)
+        self._evento = threading.Event()
+
+    def despertar(self):
+        self._evento.set()
+
+    def run(self):
+        while True:
+            try:
+                enviados = vaciar_lote()
+            except Exception as e:
+                print(f"[write-behind] Error vaciando la bitácora: {e}")
+                enviados = 0
+            if enviados < FLUSH_BATCH:
+                self._evento.wait(FLUSH_INTERVAL)
+                self._evento.clear()
+
+
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def asegurar_flusher():
+    """Arranca el hilo de vaciado de este proceso si aún no corre (p. ej. tras el fork de gunicorn)."""
+    global _flusher, _flusher_pid
+    if _flusher is not None and _flusher_pid == os.getpid() and _flusher.is_alive():
+        return _flusher
+    with _flusher_lock:
+        if _flusher is None or _flusher_pid != os.getpid() or not _flusher.is_alive():
+            _flusher, _flusher_pid = Flusher(), os.getpid()
+            _flusher.start()
+    return _flusher
@@ -0,0 +1,145 @@
+# Copias columnares (Parquet) de respuestas_ia.csv y eda_ia_consolidado.csv.
+# Los CSV se mantienen para descarga; el análisis lee el Parquet (memory-mapped) cuando existe.
+# Enums y multi como diccionarios (categóricos), creado_en como timestamp UTC, edad como uint8.
+# pyarrow se importa al leer o escribir el primer Parquet (importarlo cuesta ~0.1 s de arranque).
+# Dentro del servidor el Parquet de respuestas se reescribe en segundo plano (ver programar).
+import os
+import time
+import importlib.util
+
+HAS_ARROW = importlib.util.find_spec("pyarrow") is not None
+
+try:
+    from .utils import SIMPLE_ENUMS, MULTI_COLS, atomic_write
+except ImportError:
+    from utils import SIMPLE_ENUMS, MULTI_COLS, atomic_write
+
+BASE_DIR = os.path.dirname(__file__)
+RESPUESTAS_PARQUET = os.path.join(BASE_DIR, "respuestas_ia.parquet")
+EDA_PARQUET = os.path.join(BASE_DIR, "eda_ia_consolidado.parquet")
+ENCODING = "utf-8-sig"
+CHUNK = 100_000
+# Segundos mínimos entre dos reescrituras en segundo plano del Parquet de respuestas
+PARQUET_INTERVALO = float(os.getenv("PARQUET_INTERVALO", "300"))
+
+CATEGORICAS = set(SIMPLE_ENUMS) | set(MULTI_COLS)
+
+
+def _arrow():
+    """(pyarrow, pyarrow.parquet), importados la primera vez."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    return pa, pq
+
+
+def ruta_parquet(csv_path):
+    return os.path.splitext(csv_path)[0] + ".parquet"
+
+
+def vigente(parquet_path, csv_path):
+    """True si hay pyarrow y el Parquet existe y no es más viejo que su CSV."""
+    if not HAS_ARROW or not os.path.exists(parquet_path):
+        return False
+    return not os.path.exists(csv_path) or os.path.getmtime(parquet_path) >= os.path.getmtime(csv_path)
+
+
+def _tabla_respuestas(df):
+    """Bloque de respuestas_ia.csv (todo texto) -> tabla Arrow tipada."""
+    import pandas as pd
+
+    pa, _ = _arrow()
+    cols = {}
+    for col in df.columns:
+        serie = df[col].fillna("").astype(str).str.strip()
+        if col == "creado_en":
+            ts = pd.to_datetime(serie, errors="coerce", utc=True, format="ISO8601")
+            cols[col] = pa.array(ts.dt.as_unit("ms"), type=pa.timestamp("ms", tz="UTC"))
+        elif col == "edad":
+            edad = pd.to_numeric(serie, errors="coerce")
+            edad = edad.where((edad > 0) & (edad < 256))
+            cols[col] = pa.array(edad.astype("UInt8"), type=pa.uint8())
+        elif col in CATEGORICAS:
+            cols[col] = pa.array(serie).dictionary_encode()
+        else:
+            cols[col] = pa.array(serie, type=pa.string())
+    return pa.table(cols)
+
+
+def csv_a_parquet(csv_path, parquet_path=None):
+    """
+    Convierte respuestas_ia.csv a Parquet por bloques (un row group por bloque) con escritura
+    atómica. El Parquet queda con el mtime que tenía el CSV al empezar: si el CSV cambia
+    mientras tanto, vigente() lo sigue viendo viejo. Retorna el número de filas.
+    """
+    import pandas as pd
+
+    pa, pq = _arrow()
+    parquet_path = parquet_path or ruta_parquet(csv_path)
+    mtime = os.stat(csv_path).st_mtime_ns
+    n = 0
+    with atomic_write(parquet_path, mode="wb") as f:
+        writer = None
+        reader = pd.read_csv(csv_path, encoding=ENCODING, dtype=str, keep_default_na=False, chunksize=CHUNK)
+        for chunk in reader:
+            table = _tabla_respuestas(chunk)
+            if writer is None:
+                writer = pq.ParquetWriter(f, table.schema)
+            writer.write_table(table)
+            n += len(chunk)
+        if writer is None:
+            pq.write_table(pa.table({}), f)
+        else:
+            writer.close()
+    os.utime(parquet_path, ns=(mtime, mtime))
+    return n
+
+
+def programar(csv_path, intervalo=None):
+    """
+    Reescribe el Parquet de `csv_path` en segundo plano si quedó viejo: un trabajo single-flight
+    entre workers (ver trabajos.py) que espera a que pasen `intervalo` segundos (PARQUET_INTERVALO)
+    desde la reescritura anterior. Los exports que llegan mientras tanto se unen a ese trabajo,
+    que convierte el CSV más reciente una sola vez; hasta entonces el análisis lee el CSV.
+    Retorna el registro del trabajo (None si el Parquet está al día).
+    """
+    if not HAS_ARROW or vigente(ruta_parquet(csv_path), csv_path):
+        return None
+    try:
+        from . import trabajos
+    except ImportError:
+        import trabajos
+    tipo = "parquet-" + os.path.splitext(os.path.basename(csv_path))[0]
+    intervalo = PARQUET_INTERVALO if intervalo is None else intervalo
+    previo = trabajos.ultimo(tipo)
+    espera = max(0.0, previo["fin"] + intervalo - time.time()) if previo and previo["fin"] else 0.0
+
+    def reescribir():
+        time.sleep(espera)
+        if not vigente(ruta_parquet(csv_path), csv_path):
+            n = csv_a_parquet(csv_path)
+            print(f"🗂️ Parquet escrito en: {ruta_parquet(csv_path)} ({n} filas)")
+
+    trabajo, _ = trabajos.iniciar(tipo, [("parquet", reescribir)])
+    return trabajo
+
+
+def escribir_eda(rows, path, columns):
+    """Escribe las filas del EDA (lista de dicts) como Parquet; dataset/campo como categóricos."""
+    pa, pq = _arrow()
+    data = {c: [row.get(c) for row in rows] for c in columns}
+    cols = {}
+    for c, values in data.items():
+        if c in ("value", "conteo"):
+            cols[c] = pa.array([None if v is None else float(v) for v in values], type=pa.float64())
+        else:
+            arr = pa.array([None if v is None else str(v) for v in values], type=pa.string())
+            cols[c] = arr.dictionary_encode() if c in ("dataset", "campo", "metric") else arr
+    with atomic_write(path, mode="wb") as f:
+        pq.write_table(pa.table(cols), f)
+    return len(rows)
+
+
+def leer(path, columns=None):
+    """Tabla Arrow de un Parquet, leída con memory map (sin parsear texto)."""
+    _, pq = _arrow()
+    return pq.read_table(path, columns=columns, memory_map=True)
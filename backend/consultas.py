@@ -0,0 +1,427 @@
+# Consultas con filtros sobre las respuestas (/api/query). Cada valor de cada enum (y cada banda
+# de edad) tiene un bitmap: un bit por respuesta, empaquetado en uint64. Un filtro es el OR de
+# los bitmaps de los valores pedidos de un campo y el AND entre campos (edad y fechas, sobre las
+# columnas del almacén compacto); los conteos del EDA del subconjunto salen de
+# popcount(bitmap & filtro), sin recorrer las respuestas una por una.
+# El índice se construye al cargar respuestas_ia.csv (o su Parquet) y, en cada consulta, suma
+# las respuestas que el CSV aún no trae desde eda_pendientes (ver agregados.py): la bitácora
+# está en la base SQLite local, así aparecen también las recibidas antes de la primera consulta
+# o por otros workers. Cuando el export reescribe el CSV se reconstruye en segundo plano
+# (mientras tanto responde el anterior).
+import os
+import threading
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+try:
+    from . import agregados
+    from .respuestas_compactas import RespuestasCompactas, SIN_DATO, EDAD_NULA, TS_NULO
+    from .utils import SIMPLE_ENUMS, MULTI_COLS, LIKERT_ORDERS, CRUCES, EDAD_BANDAS, vocabulario
+except ImportError:
+    import agregados
+    from respuestas_compactas import RespuestasCompactas, SIN_DATO, EDAD_NULA, TS_NULO
+    from utils import SIMPLE_ENUMS, MULTI_COLS, LIKERT_ORDERS, CRUCES, EDAD_BANDAS, vocabulario
+
+BASE_DIR = os.path.dirname(__file__)
+SRC_CSV = os.path.join(BASE_DIR, "respuestas_ia.csv")
+IDS_PATH = os.path.join(BASE_DIR, "respuestas_ia.ids")
+OFFSET_LOCAL_MS = -5 * 3600 * 1000   # America/Bogota (sin horario de verano), como analisis_datos
+DIA_MS = 86400 * 1000
+
+# Campos filtrables por valor (?campo=a,b) y parámetros de rango
+CAMPOS = SIMPLE_ENUMS + MULTI_COLS
+RANGOS = ("edad_min", "edad_max", "desde", "hasta")
+# Campos con bitmap: los filtrables más edad_banda (eje de un cruce)
+INDEXADOS = CAMPOS + ["edad_banda"]
+
+if hasattr(np, "bitwise_count"):
+    def _popcount(words):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:  # numpy < 2.0
+    _BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(words):
+        words = np.ascontiguousarray(words)
+        return _BITS[words.view(np.uint8)].sum(axis=-1, dtype=np.int64)
+
+
+def _palabras(n):
+    return (n + 63) // 64
+
+
+def _empacar(bits, palabras):
+    """Matriz bool (..., n) -> bitmaps uint64 (..., palabras); bit i = respuesta i."""
+    packed = np.packbits(bits, axis=-1, bitorder="little")
+    out = np.zeros(bits.shape[:-1] + (palabras * 8,), dtype=np.uint8)
+    out[..., :packed.shape[-1]] = packed
+    return out.view("<u8")
+
+
+def _primeros(y):
+    """Posición del primer bit encendido de cada fila de y (k x palabras); -1 si no hay."""
+    if not y.shape[-1]:
+        return np.full(y.shape[:-1], -1, dtype=np.int64)
+    w = (y != 0).argmax(axis=-1)
+    palabra = np.take_along_axis(y, w[..., None], axis=-1)[..., 0]
+    bajo = palabra & (~palabra + np.uint64(1))
+    with np.errstate(divide="ignore"):
+        bit = np.log2(bajo.astype(np.float64))
+    return np.where(palabra != 0, w * 64 + np.nan_to_num(bit, neginf=0).astype(np.int64), -1)
+
+
+def _banda(edad):
+    for i, (desde, hasta, _) in enumerate(EDAD_BANDAS):
+        if desde <= edad <= hasta:
+            return i
+    return -1
+
+
+class Indice:
+    """Bitmaps por valor sobre un RespuestasCompactas; crece con agregar() y sincronizar()."""
+
+    def __init__(self, store, ids=(), firma=None):
+        self.store = store
+        self.ids = set(ids)
+        self.firma = firma
+        self.visto = 0                # último seq de eda_pendientes ya sumado
+        self.lock = threading.RLock()
+        self._cap = max(16, _palabras(store.n))
+        # las mismas listas del almacén: crecen cuando llega un valor fuera del vocabulario
+        self.cats = {campo: store.cats[campo] for campo in CAMPOS}
+        self.cats["edad_banda"] = vocabulario("edad_banda")
+        self.bitmaps = {campo: self._construir(campo) for campo in INDEXADOS}
+        # día local de cada respuesta (-1 sin fecha): por_fecha sin recalcular desde epoch ms
+        self._dia = np.full(self._cap * 64, -1, dtype=np.int32)
+        self._dia[:store.n] = _dias(store.creado_en)
+
+    def _codigos(self, campo):
+        """Matriz bool (categorías x respuestas) del campo."""
+        k = len(self.cats[campo])
+        if campo in MULTI_COLS:
+            valores = self.store.multi(campo)
+            return ((valores[None, :] >> np.arange(k, dtype=valores.dtype)[:, None]) & 1).astype(bool)
+        codes = self.store.edad_banda() if campo == "edad_banda" else self.store.simple(campo)
+        return codes[None, :] == np.arange(k)[:, None]
+
+    def _construir(self, campo):
+        return _empacar(self._codigos(campo), self._cap)
+
+    # -----------------------------
+    # Mantenimiento
+    # -----------------------------
+    def _reservar(self, n):
+        if _palabras(n) <= self._cap:
+            return
+        cap = max(2 * self._cap, _palabras(n))
+        for campo, b in self.bitmaps.items():
+            grown = np.zeros((b.shape[0], cap), dtype=b.dtype)
+            grown[:, :self._cap] = b
+            self.bitmaps[campo] = grown
+        dia = np.full(cap * 64, -1, dtype=np.int32)
+        dia[:len(self._dia)] = self._dia
+        self._dia = dia
+        self._cap = cap
+
+    def _encender(self, campo, code, i):
+        b = self.bitmaps[campo]
+        if code >= b.shape[0]:  # valor nuevo (el almacén lo agregó a su vocabulario)
+            extra = np.zeros((code + 1 - b.shape[0], b.shape[1]), dtype=b.dtype)
+            b = self.bitmaps[campo] = np.vstack([b, extra])
+        b[code, i >> 6] |= np.uint64(1) << np.uint64(i & 63)
+
+    def agregar(self, respuesta, doc_id=None):
+        """Suma una respuesta (payload validado o fila del CSV) al almacén y a los bitmaps."""
+        with self.lock:
+            if doc_id and doc_id in self.ids:
+                return False
+            i = self.store.agregar(respuesta)
+            self._reservar(i + 1)
+            for campo in SIMPLE_ENUMS:
+                code = int(self.store.simple(campo)[i])
+                if code != SIN_DATO:
+                    self._encender(campo, code, i)
+            for campo in MULTI_COLS:
+                mask = int(self.store.multi(campo)[i])
+                for code in range(mask.bit_length()):
+                    if mask >> code & 1:
+                        self._encender(campo, code, i)
+            edad = int(self.store.edad[i])
+            banda = _banda(edad) if edad != EDAD_NULA else -1
+            if banda >= 0:
+                self._encender("edad_banda", banda, i)
+            self._dia[i] = _dias(self.store.creado_en[i:i + 1])[0]
+            if doc_id:
+                self.ids.add(doc_id)
+            return True
+
+    def sincronizar(self):
+        """Suma las respuestas de eda_pendientes llegadas desde la última vez (las del CSV se saltan)."""
+        with self.lock:
+            for seq, doc_id, respuesta in agregados.pendientes(self.visto):
+                self.agregar(respuesta, doc_id)
+                self.visto = seq
+
+    # -----------------------------
+    # Consulta
+    # -----------------------------
+    def filtro(self, filtros):
+        """Bitmap (palabras de las n respuestas) de las que cumplen todos los filtros."""
+        n = self.store.n
+        palabras = _palabras(n)
+        f = np.full(palabras, np.iinfo(np.uint64).max, dtype="<u8")
+        if n % 64:
+            f[-1] = np.uint64((1 << (n % 64)) - 1)
+        for campo, valores in filtros.items():
+            if campo in RANGOS:
+                continue
+            pos = {v: i for i, v in enumerate(self.cats[campo])}
+            codes = [pos[v] for v in valores if v in pos and pos[v] < self.bitmaps[campo].shape[0]]
+            if not codes:
+                return np.zeros(palabras, dtype="<u8")
+            f &= np.bitwise_or.reduce(self.bitmaps[campo][codes, :palabras], axis=0)
+        columnas = np.ones(n, dtype=bool)
+        usa_columnas = False
+        if filtros.get("edad_min") is not None or filtros.get("edad_max") is not None:
+            edad = self.store.edad
+            columnas &= edad != EDAD_NULA
+            if filtros.get("edad_min") is not None:
+                columnas &= edad >= filtros["edad_min"]
+            if filtros.get("edad_max") is not None:
+                columnas &= edad <= filtros["edad_max"]
+            usa_columnas = True
+        if filtros.get("desde") is not None or filtros.get("hasta") is not None:
+            ts = self.store.creado_en
+            columnas &= ts != TS_NULO
+            if filtros.get("desde") is not None:
+                columnas &= ts >= _inicio_dia_ms(filtros["desde"])
+            if filtros.get("hasta") is not None:
+                columnas &= ts < _inicio_dia_ms(filtros["hasta"] + timedelta(days=1))
+            usa_columnas = True
+        if usa_columnas:
+            f &= _empacar(columnas, palabras)
+        return f
+
+    def _conteos(self, campo, f):
+        """(conteo, primera respuesta) por código del campo dentro del filtro."""
+        y = self.bitmaps[campo][:, :len(f)] & f
+        return _popcount(y), _primeros(y)
+
+    def filas(self, f, datasets=None):
+        """Filas del EDA del subconjunto `f` (mismo formato que analisis_datos.filas_eda)."""
+        quiere = (lambda nombre: True) if not datasets else (lambda nombre: nombre in datasets)
+        n = self.store.n
+        total = int(_popcount(f))
+        conteos = {campo: self._conteos(campo, f) for campo in ("facultad", "carrera")}
+        rows = []
+
+        def desc(campo, counts, first):
+            orden = sorted((j for j in range(len(counts)) if counts[j] > 0), key=lambda j: (-counts[j], first[j], j))
+            return [(self.cats[campo][j], int(counts[j])) for j in orden]
+
+        # ===== Resumen =====
+        mask = None
+        if quiere("resumen"):
+            rows += [
+                {"dataset": "resumen", "metric": "total_respuestas", "value": total},
+                {"dataset": "resumen", "metric": "facultades_unicas", "value": int((conteos["facultad"][0] > 0).sum())},
+                {"dataset": "resumen", "metric": "carreras_unicas", "value": int((conteos["carrera"][0] > 0).sum())},
+            ]
+        if quiere("edad_stats") or quiere("por_fecha"):
+            mask = np.unpackbits(f.view(np.uint8), count=n, bitorder="little").view(bool)
+        if quiere("edad_stats"):
+            hist = np.bincount(self.store.edad[mask], minlength=256)
+            hist[EDAD_NULA] = 0
+            edades = np.flatnonzero(hist)
+            m = int(hist.sum())
+            media = float((hist * np.arange(len(hist))).sum() / m) if m else None
+            rows += [
+                {"dataset": "edad_stats", "metric": "edad_min", "value": float(edades[0]) if m else None},
+                {"dataset": "edad_stats", "metric": "edad_max", "value": float(edades[-1]) if m else None},
+                {"dataset": "edad_stats", "metric": "edad_promedio", "value": round(media, 2) if media is not None else None},
+            ]
+
+        # ===== Por fecha =====
+        if quiere("por_fecha"):
+            counts = np.bincount(self._dia[:n][mask] + 1)[1:]  # -1 (sin fecha) cae en el bin 0
+            for d in np.flatnonzero(counts):
+                rows.append({"dataset": "por_fecha", "fecha": str(np.datetime64(int(d), "D")), "conteo": int(counts[d])})
+
+        # ===== Por facultad / carrera =====
+        for campo in ("facultad", "carrera"):
+            if quiere(f"por_{campo}"):
+                for val, cnt in desc(campo, *conteos[campo]):
+                    rows.append({"dataset": f"por_{campo}", campo: val, "conteo": cnt})
+
+        # ===== Frecuencias de enums simples =====
+        if quiere("freq_simple"):
+            for campo in SIMPLE_ENUMS:
+                counts, first = conteos.get(campo) or self._conteos(campo, f)
+                order = LIKERT_ORDERS.get(campo)
+                items = [(k, int(counts[i]) if i < len(counts) else 0) for i, k in enumerate(order)] if order else desc(campo, counts, first)
+                for val, cnt in items:
+                    rows.append({"dataset": "freq_simple", "campo": campo, "categoria": val, "conteo": cnt})
+
+        # ===== Frecuencias de multi =====
+        if quiere("freq_multi"):
+            for campo in MULTI_COLS:
+                for val, cnt in desc(campo, *self._conteos(campo, f)):
+                    rows.append({"dataset": "freq_multi", "campo": campo, "categoria": val, "conteo": cnt})
+
+        # ===== Cruces (utils.CRUCES) =====
+        for campos in CRUCES:
+            dataset = "cross_" + "_".join(campos)
+            if not quiere(dataset):
+                continue
+            counts = self.cruce(campos, f)
+            for idx in zip(*np.nonzero(counts)):
+                row = {"dataset": dataset}
+                row.update({c: self.cats[c][i] for c, i in zip(campos, idx)})
+                row["conteo"] = int(counts[idx])
+                rows.append(row)
+        return rows
+
+    def cruce(self, campos, f):
+        """
+        Tabla de conteos N-dimensional: popcount del AND de un bitmap de cada campo. En cada
+        nivel solo siguen las combinaciones con alguna respuesta (con filtros suelen ser pocas).
+        """
+        palabras = len(f)
+        acumulado = self.bitmaps[campos[0]][:, :palabras] & f
+        coords = [np.arange(len(acumulado))]
+        for campo in campos[1:]:
+            vivas = np.flatnonzero(acumulado.any(axis=-1))
+            acumulado, coords = acumulado[vivas], [c[vivas] for c in coords]
+            b = self.bitmaps[campo][:, :palabras]
+            acumulado = (acumulado[:, None, :] & b).reshape(-1, palabras)
+            coords = [np.repeat(c, len(b)) for c in coords] + [np.tile(np.arange(len(b)), len(vivas))]
+        shape = tuple(self.bitmaps[c].shape[0] for c in campos)
+        counts = np.zeros(shape, dtype=np.int64)
+        counts[tuple(coords)] = _popcount(acumulado)
+        return counts
+
+
+def _dias(creado_en):
+    """Días (desde 1970-01-01, hora local) de un arreglo de epoch ms; -1 si no hay fecha."""
+    return np.where(creado_en == TS_NULO, -1, (creado_en + OFFSET_LOCAL_MS) // DIA_MS).astype(np.int32)
+
+
+def _inicio_dia_ms(dia):
+    """Epoch ms del inicio del día local `dia` (date)."""
+    inicio = datetime(dia.year, dia.month, dia.day, tzinfo=timezone.utc)
+    return int(inicio.timestamp() * 1000) - OFFSET_LOCAL_MS
+
+
+def filtros_de(args):
+    """
+    Filtros de la query string (MultiDict de Flask o dict): campo=a,b (repetible) para los enums,
+    edad_min/edad_max enteros y desde/hasta YYYY-MM-DD (fecha local, inclusive). ValueError si
+    hay parámetros desconocidos o mal formados. `dataset` y `_perfil` no son filtros.
+    """
+    filtros = {}
+    for clave in args:
+        if clave in ("dataset", "_perfil"):
+            continue
+        valores = args.getlist(clave) if hasattr(args, "getlist") else [args[clave]]
+        texto = ",".join(v for v in valores if v is not None)
+        if clave in CAMPOS:
+            valores = [v.strip() for v in texto.split(",") if v.strip()]
+            if valores:  # ?facultad= vacío: sin filtro (no "ninguna facultad")
+                filtros[clave] = valores
+        elif clave in ("edad_min", "edad_max"):
+            try:
+                filtros[clave] = int(texto)
+            except ValueError:
+                raise ValueError(f"'{clave}' debe ser un entero.")
+        elif clave in ("desde", "hasta"):
+            try:
+                filtros[clave] = date.fromisoformat(texto)
+            except ValueError:
+                raise ValueError(f"'{clave}' debe tener formato YYYY-MM-DD.")
+        else:
+            raise ValueError(f"Filtro desconocido: {clave}. Campos: {', '.join(CAMPOS + list(RANGOS))}")
+    return filtros
+
+
+# -----------------------------
+# Índice del proceso
+# -----------------------------
+_lock = threading.Lock()
+_indice = None
+_recargando = False
+
+
+def _firma(path=None):
+    try:
+        st = os.stat(path or SRC_CSV)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def cargar(path=None, ids_path=None):
+    """Índice nuevo desde respuestas_ia.csv (o su Parquet al día) y los ids del export."""
+    path, ids_path = path or SRC_CSV, ids_path or IDS_PATH
+    try:
+        from . import analisis_datos
+    except ImportError:
+        import analisis_datos
+    firma = _firma(path)
+    store = RespuestasCompactas()
+    if firma is not None and firma[1] > 0:
+        try:
+            store = analisis_datos.cargar_respuestas(path)
+        except SystemExit:  # CSV sin filas
+            pass
+    ids = []
+    if os.path.exists(ids_path):
+        with open(ids_path, encoding="utf-8") as f:
+            ids = [line.strip() for line in f]
+    idx = Indice(store, ids[:store.n], firma)
+    if len(ids) < store.n:
+        # ids del export incompletos (archivo viejo o ausente): no se sabe cuáles de las
+        # pendientes ya trae el CSV, así que solo se suman las que lleguen desde ahora
+        print(f"[consultas] {ids_path} tiene {len(ids)} ids para {store.n} filas; "
+              "las respuestas pendientes anteriores aparecen tras el próximo export.")
+        idx.visto = agregados.ultimo_pendiente()
+    idx.sincronizar()
+    return idx
+
+
+def _recargar():
+    global _indice, _recargando
+    try:
+        nuevo = cargar()
+        with _lock:
+            _indice = nuevo
+        print(f"[consultas] Índice reconstruido: {nuevo.store.n} respuestas")
+    except Exception as e:
+        print(f"[consultas] No se pudo reconstruir el índice: {e}")
+    finally:
+        _recargando = False
+
+
+def indice():
+    """
+    Índice del proceso (se carga en la primera consulta; se reconstruye si cambió el CSV), al
+    día con las respuestas pendientes de export.
+    """
+    global _indice, _recargando
+    with _lock:
+        if _indice is None:
+            _indice = cargar()
+            return _indice
+        if _firma() != _indice.firma and not _recargando:
+            _recargando = True
+            threading.Thread(target=_recargar, name="consultas", daemon=True).start()
+        idx = _indice
+    idx.sincronizar()
+    return idx
+
+
+def consultar(filtros, datasets=None):
+    """(total, filas del EDA) del subconjunto que cumple `filtros` (ver filtros_de)."""
+    idx = indice()
+    with idx.lock:
+        f = idx.filtro(filtros)
+        return int(_popcount(f)), idx.filas(f, set(datasets) if datasets else None)
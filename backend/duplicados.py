@@ -0,0 +1,159 @@
+# Índice de contenido de las respuestas para detectar envíos repetidos al exportar.
+# La huella de una fila es un hash del nombre normalizado (sin tildes, minúsculas, espacios
+# simples) más todas las respuestas (arreglos sin importar el orden); creado_en y los
+# metadatos no cuentan. El export la calcula en la misma pasada en que escribe el CSV.
+# EXPORT_DUPLICADOS:
+# - marcar (por defecto): se listan en respuestas_ia.duplicados.csv (id, id original, ...);
+# - colapsar: además solo la primera respuesta de cada huella queda en respuestas_ia.csv;
+# - no: sin índice.
+# Las huellas viven en la base SQLite local (no en memoria): cada página del export consulta
+# las suyas en un lote y guarda las nuevas, así el export incremental compara las respuestas
+# nuevas con todas las anteriores. El completo llena una tabla aparte que reemplaza a la
+# anterior al terminar.
+import os
+import csv
+import hashlib
+import unicodedata
+
+try:
+    from .sqlite_local import connect, transaction
+    from .utils import ENUMS, ARRAY_FIELDS, OTRO_TEXT_FIELDS, atomic_write
+except ImportError:
+    from sqlite_local import connect, transaction
+    from utils import ENUMS, ARRAY_FIELDS, OTRO_TEXT_FIELDS, atomic_write
+
+BASE_DIR = os.path.dirname(__file__)
+DUPLICADOS_PATH = os.path.join(BASE_DIR, "respuestas_ia.duplicados.csv")
+EXPORT_DUPLICADOS = os.getenv("EXPORT_DUPLICADOS", "marcar").strip().lower()
+MODOS = ("marcar", "colapsar", "no")
+
+CAMPOS = ("nombre_completo", "edad", *sorted(ENUMS), *sorted(OTRO_TEXT_FIELDS.values()))
+COLUMNAS = ["id", "original_id", "huella", "creado_en", "nombre_completo"]
+
+# Huellas por consulta (límite de variables de SQLite: 999 en versiones viejas)
+LOTE_SQL = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS huellas (
+    huella TEXT PRIMARY KEY,
+    id     TEXT NOT NULL        -- primera respuesta exportada con esa huella
+);
+-- la que arma el export completo en curso
+CREATE TABLE IF NOT EXISTS huellas_completo (
+    huella TEXT PRIMARY KEY,
+    id     TEXT NOT NULL
+);
+"""
+
+_schema_ready = set()
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+def _texto(valor):
+    valor = unicodedata.normalize("NFKD", str(valor or ""))
+    valor = "".join(c for c in valor if not unicodedata.combining(c))
+    return " ".join(valor.casefold().split())
+
+
+def huella(row):
+    """Hash del contenido de una fila del CSV (o documento normalizado)."""
+    partes = []
+    for campo in CAMPOS:
+        valor = row.get(campo)
+        if campo in ARRAY_FIELDS:
+            items = valor if isinstance(valor, list) else str(valor or "").split(";")
+            valor = ";".join(sorted({_texto(v) for v in items if str(v).strip()}))
+        else:
+            valor = _texto(valor)
+        partes.append(valor)
+    return hashlib.blake2b("\x1f".join(partes).encode("utf-8"), digest_size=12).hexdigest()
+
+
+class Indice:
+    """
+    Huella -> primer id en la tabla `tabla` de la base local, consultada y ampliada por lotes;
+    en memoria solo queda el lote en curso y los duplicados encontrados en esta pasada.
+    """
+
+    def __init__(self, tabla="huellas"):
+        self.tabla = tabla
+        self.duplicados = []
+
+    def ver_lote(self, pares):
+        """
+        Registra [(doc_id, fila)]; retorna, en el mismo orden, el id original de las que
+        duplican una fila anterior (del lote o de la tabla) y None en las demás.
+        """
+        huellas = [huella(row) for _, row in pares]
+        conn = _conn()
+        vistas = {}
+        unicas = list(dict.fromkeys(huellas))
+        for i in range(0, len(unicas), LOTE_SQL):
+            trozo = unicas[i:i + LOTE_SQL]
+            vistas.update(conn.execute(
+                f"SELECT huella, id FROM {self.tabla} WHERE huella IN ({','.join('?' * len(trozo))})", trozo
+            ).fetchall())
+        nuevas, originales = {}, []
+        for (doc_id, row), h in zip(pares, huellas):
+            original = vistas.get(h)
+            if original is None:
+                vistas[h] = nuevas[h] = doc_id
+            elif original != doc_id:
+                self.duplicados.append({
+                    "id": doc_id, "original_id": original, "huella": h,
+                    "creado_en": row.get("creado_en", ""), "nombre_completo": row.get("nombre_completo", ""),
+                })
+                originales.append(original)
+                continue
+            originales.append(None)
+        if nuevas:
+            with transaction(conn) as c:
+                c.executemany(f"INSERT OR IGNORE INTO {self.tabla} (huella, id) VALUES (?, ?)", nuevas.items())
+        return originales
+
+    def ver(self, doc_id, row):
+        """ver_lote() de una sola fila."""
+        return self.ver_lote([(doc_id, row)])[0]
+
+
+def cargar():
+    """Índice sobre las huellas ya exportadas (export incremental)."""
+    return Indice()
+
+
+def nuevo():
+    """Índice vacío para un export completo (reemplaza a las huellas al llamar guardar())."""
+    _conn().execute("DELETE FROM huellas_completo")
+    return Indice("huellas_completo")
+
+
+def guardar(indice, reemplazar=False):
+    """
+    Cierra la pasada: las huellas del incremental ya quedaron en la tabla; las del export
+    completo (reemplazar=True) pasan a ser las huellas vigentes.
+    """
+    if not reemplazar:
+        return
+    with transaction(_conn()) as conn:
+        conn.execute("DELETE FROM huellas")
+        conn.execute(f"INSERT INTO huellas (huella, id) SELECT huella, id FROM {indice.tabla}")
+        conn.execute(f"DELETE FROM {indice.tabla}")
+
+
+def escribir_reporte(duplicados, agregar=False, path=DUPLICADOS_PATH):
+    """respuestas_ia.duplicados.csv: reescrito en el export completo, agregado en el incremental."""
+    if agregar and os.path.exists(path):
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            csv.DictWriter(f, fieldnames=COLUMNAS, lineterminator="\n").writerows(duplicados)
+        return
+    with atomic_write(path, encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNAS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(duplicados)
@@ -0,0 +1,180 @@
+# EDA por bloques (out-of-core) para exports más grandes que la memoria disponible.
+# respuestas_ia.csv se parte en rangos de ~EDA_BLOQUE_MB que terminan en un fin de registro
+# (fuera de comillas); si el Parquet está al día, cada row group es un bloque. Cada bloque se
+# carga en un almacén compacto propio y se reduce a agregados parciales con el formato de
+# agregados.leer() (total, edad min/max/suma e histograma, por fecha, conteos por valor y cruces), que se
+# suman en el orden del archivo: el resultado es el mismo EDA que con todo en memoria. Cada
+# parcial trae también los buckets de actividad (actividad.conteos_store).
+# Con EDA_PROCESOS > 0 los bloques se procesan en un pool; cada proceso lee su propio rango del
+# archivo (solo viajan offsets y parciales, que son pequeños). La memoria queda acotada por el
+# tamaño del bloque por proceso, no por el del export.
+import io
+import os
+import csv
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from . import actividad, agregados, columnar
+    from .analisis_datos import codificar, crosstab, fechas_locales, ENCODING
+    from .respuestas_compactas import RespuestasCompactas, EDAD_NULA
+    from .utils import SIMPLE_ENUMS, MULTI_COLS, CRUCES
+except ImportError:
+    import actividad, agregados, columnar
+    from analisis_datos import codificar, crosstab, fechas_locales, ENCODING
+    from respuestas_compactas import RespuestasCompactas, EDAD_NULA
+    from utils import SIMPLE_ENUMS, MULTI_COLS, CRUCES
+
+EDA_BLOQUE_MB = float(os.getenv("EDA_BLOQUE_MB", "32"))
+# Procesos del pool (0 = en el mismo proceso; con una sola CPU el pool solo suma costo)
+_CPUS = os.cpu_count() or 1
+EDA_PROCESOS = int(os.getenv("EDA_PROCESOS", str(min(4, _CPUS) if _CPUS > 1 else 0)))
+
+
+# -----------------------------
+# Parciales
+# -----------------------------
+def parcial(store):
+    """Agregados (formato de agregados.leer()) de las respuestas de un almacén compacto."""
+    enc = codificar(store)
+    agg = agregados.vacios()
+    agg["total"] = store.n
+    edad = store.edad[store.edad != EDAD_NULA]
+    if len(edad):
+        hist = np.bincount(edad, minlength=256)
+        agg["edad"] = {"minimo": float(edad.min()), "maximo": float(edad.max()),
+                       "suma": int(edad.sum(dtype=np.int64)), "n": len(edad),
+                       "conteos": {int(e): int(hist[e]) for e in np.flatnonzero(hist)}}
+    agg["por_fecha"] = dict(fechas_locales(store.creado_en))
+    # claves en orden de primera aparición: al sumar bloques en orden se conserva el desempate
+    # del EDA en memoria (value_counts / primera respuesta que marcó la categoría)
+    for campo in SIMPLE_ENUMS:
+        codes, cats = enc[campo]["codes"], enc[campo]["cats"]
+        valid = codes[codes >= 0]
+        counts = np.bincount(valid, minlength=len(cats))
+        present, first = np.unique(valid, return_index=True)
+        agg["simple"][campo] = {cats[c]: int(counts[c]) for c in present[np.argsort(first, kind="stable")]}
+    for campo in MULTI_COLS:
+        matrix, cats = enc[campo]["matrix"], enc[campo]["cats"]
+        if not len(matrix):
+            continue
+        counts = matrix.sum(axis=0, dtype=np.int64)
+        first_row = matrix.argmax(axis=0)
+        items = sorted((j for j in range(len(cats)) if counts[j] > 0), key=lambda j: (first_row[j], j))
+        agg["multi"][campo] = {cats[j]: int(counts[j]) for j in items}
+    for campos in CRUCES:
+        counts = crosstab(enc, campos, store.n)
+        agg["cross"][tuple(campos)] = {
+            tuple(enc[c]["cats"][i] for c, i in zip(campos, idx)): int(counts[idx])
+            for idx in zip(*np.nonzero(counts))
+        }
+    agg["actividad"] = actividad.conteos_store(store)
+    return agg
+
+
+def _sumar(destino, conteos):
+    for clave, conteo in conteos.items():
+        destino[clave] = destino.get(clave, 0) + conteo
+
+
+def unir(total, agg):
+    """Suma los agregados `agg` (de un bloque posterior) en `total`. Retorna `total`."""
+    total["total"] += agg["total"]
+    a, b = total["edad"], agg["edad"]
+    if b["n"]:
+        a["minimo"] = b["minimo"] if not a["n"] else min(a["minimo"], b["minimo"])
+        a["maximo"] = b["maximo"] if not a["n"] else max(a["maximo"], b["maximo"])
+        a["suma"] += b["suma"]
+        a["n"] += b["n"]
+        _sumar(a["conteos"], b["conteos"])
+    _sumar(total["por_fecha"], agg["por_fecha"])
+    for kind in ("simple", "multi", "cross"):
+        for campo, conteos in agg[kind].items():
+            _sumar(total[kind].setdefault(campo, {}), conteos)
+    _sumar(total.setdefault("actividad", {}), agg.get("actividad", {}))
+    return total
+
+
+# -----------------------------
+# Bloques del CSV / Parquet
+# -----------------------------
+def _encabezado(path):
+    """(columnas, offset en bytes donde empiezan los datos)."""
+    with open(path, "rb") as f:
+        linea = f.readline()
+        return next(csv.reader([linea.decode(ENCODING)])), f.tell()
+
+
+def rangos(path, tamano, inicio):
+    """
+    Rangos de bytes [desde, hasta) de ~`tamano` que terminan en un salto de línea fuera de
+    comillas (un registro nunca queda partido, aunque un texto traiga saltos de línea).
+    """
+    fin = os.path.getsize(path)
+    with open(path, "rb") as f:
+        desde = inicio
+        while desde < fin:
+            f.seek(desde)
+            datos = f.read(tamano)
+            if desde + len(datos) >= fin:
+                yield desde, fin
+                return
+            corte = -1
+            while corte < 0:
+                corte = datos.rfind(b"\n")
+                # con un número impar de comillas antes, ese salto está dentro de un campo
+                while corte >= 0 and datos.count(b'"', 0, corte) % 2:
+                    corte = datos.rfind(b"\n", 0, corte)
+                if corte < 0:  # un solo registro más largo que el bloque
+                    mas = f.read(tamano)
+                    if not mas:
+                        corte = len(datos) - 1
+                    datos += mas
+            yield desde, desde + corte + 1
+            desde += corte + 1
+
+
+def parcial_csv(path, columnas, desde, hasta):
+    """Parcial de un rango de bytes del CSV (corre en los procesos del pool)."""
+    with open(path, "rb") as f:
+        f.seek(desde)
+        datos = f.read(hasta - desde)
+    df = pd.read_csv(io.BytesIO(datos), names=columnas, header=None, encoding="utf-8",
+                     dtype=str, keep_default_na=False)
+    store = RespuestasCompactas(capacidad=len(df))
+    store.extender_dataframe(df)
+    return parcial(store)
+
+
+def parcial_parquet(path, grupo):
+    """Parcial de un row group del Parquet."""
+    return parcial(RespuestasCompactas.desde_parquet(path, grupos=[grupo]))
+
+
+def calcular(path, procesos=None, bloque_mb=None):
+    """Agregados de todo el export (formato de agregados.leer()), bloque por bloque."""
+    procesos = EDA_PROCESOS if procesos is None else procesos
+    tamano = int((EDA_BLOQUE_MB if bloque_mb is None else bloque_mb) * 1024 * 1024)
+    parquet = columnar.ruta_parquet(path)
+    if columnar.vigente(parquet, path):
+        import pyarrow.parquet as pq
+
+        grupos = pq.ParquetFile(parquet).num_row_groups
+        fn, tareas = parcial_parquet, ([parquet] * grupos, range(grupos))
+    else:
+        columnas, inicio = _encabezado(path)
+        bloques = list(rangos(path, tamano, inicio))
+        fn, tareas = parcial_csv, ([path] * len(bloques), [columnas] * len(bloques),
+                                   [d for d, _ in bloques], [h for _, h in bloques])
+    total = agregados.vacios()
+    if procesos > 0 and len(tareas[0]) > 1:
+        with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for agg in pool.map(fn, *tareas):  # en orden de bloque
+                unir(total, agg)
+    else:
+        for args in zip(*tareas):
+            unir(total, fn(*args))
+    return total
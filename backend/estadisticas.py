@@ -0,0 +1,259 @@
+# Respuesta JSON de /api/stats: los bloques del EDA agrupados por dataset.
+# Se arma una vez por versión de los agregados (agregados.version(), compartida entre workers)
+# y se publica en eda_ia.snapshot: un índice (versión, ETag, offsets) seguido del JSON ya
+# serializado, con cada dataset en su propio tramo. El archivo se reemplaza entero (os.replace)
+# y cada worker lo mapea en memoria de solo lectura: el cuerpo de la respuesta se copia del mapa
+# (WSGI exige bytes) sin volver a serializar, y las páginas las comparten todos los procesos.
+# Un worker que ve una versión nueva en los agregados republica el snapshot (uno a la vez, con
+# un lock de archivo; como mucho una vez cada ESTADISTICAS_INTERVALO segundos) mientras los
+# demás siguen sirviendo el anterior; luego lo detectan por el inode y lo vuelven a mapear.
+# Mientras los agregados no representen al EDA (arranque en frío, ver agregados.representativos)
+# se sirve el último EDA persistido en eda_ia_consolidado.csv, leído con el módulo csv (sin pandas).
+import os
+import csv
+import json
+import mmap
+import struct
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos (a lo sumo se republica dos veces)
+    fcntl = None
+
+try:
+    from . import agregados
+    from .utils import atomic_write
+except ImportError:
+    import agregados
+    from utils import atomic_write
+
+BASE_DIR = os.path.dirname(__file__)
+EDA_CSV = os.path.join(BASE_DIR, "eda_ia_consolidado.csv")
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", os.path.join(BASE_DIR, "eda_ia.snapshot"))
+# Prefijo del archivo: magia, formato y largo del índice JSON que le sigue
+MAGIA = b"EDAS"
+FORMATO = 1
+_PREFIJO = struct.Struct("<4sIQ")
+# Mínimo entre dos publicaciones: los envíos seguidos se juntan en una sola (el snapshot
+# anterior se sigue sirviendo mientras tanto)
+ESTADISTICAS_INTERVALO = float(os.getenv("ESTADISTICAS_INTERVALO", "2"))
+
+_lock = threading.Lock()          # solo para cambiar el snapshot mapeado
+_publicando = threading.Lock()    # un hilo por proceso arma y escribe el snapshot
+_actual = {"snapshot": None}
+
+
+def agrupar(rows):
+    """{dataset: [filas sin la clave dataset ni columnas vacías]} en el orden del EDA."""
+    datasets = {}
+    for row in rows:
+        fila = {k: v for k, v in row.items() if k != "dataset" and v is not None}
+        datasets.setdefault(row["dataset"], []).append(fila)
+    return datasets
+
+
+def _numero(valor):
+    if valor == "":
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        try:
+            return float(valor)
+        except ValueError:
+            return valor
+
+
+def filas_snapshot(path=EDA_CSV):
+    """Filas del EDA persistido en disco (value/conteo como números, vacíos como None)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding=agregados.ENCODING, newline="") as f:
+        return [
+            {k: _numero(v) if k in ("value", "conteo") else (v or None) for k, v in row.items()}
+            for row in csv.DictReader(f)
+        ]
+
+
+def _fuente():
+    """(versión, función que arma las filas): los agregados si representan al EDA, si no el EDA en disco."""
+    if agregados.representativos(EDA_CSV):
+        return agregados.version(), lambda: agregados.filas_eda(agregados.leer())
+    mtime = os.path.getmtime(EDA_CSV) if os.path.exists(EDA_CSV) else 0
+    return f"snapshot-{mtime:.0f}", filas_snapshot
+
+
+def _seleccion(nombres):
+    if not nombres:
+        return ()
+    return tuple(sorted({n.strip() for n in nombres if n and n.strip()}))
+
+
+# -----------------------------
+# Snapshot binario
+# -----------------------------
+def serializar(version, datasets):
+    """Bytes del snapshot: prefijo + índice JSON + cuerpo {"ok","version","datasets"}."""
+    inicio = b'{"ok":true,"version":' + json.dumps(version).encode("utf-8") + b',"datasets":{'
+    cuerpo = bytearray(inicio)
+    tramos = {}
+    for i, (nombre, filas) in enumerate(datasets.items()):
+        tramo = (json.dumps(nombre, ensure_ascii=False) + ":" + json.dumps(
+            filas, ensure_ascii=False, separators=(",", ":"))).encode("utf-8")
+        if i:
+            cuerpo += b","
+        tramos[nombre] = [len(cuerpo), len(tramo), hashlib.sha1(tramo).hexdigest()]
+        cuerpo += tramo
+    cuerpo += b"}}"
+    indice = json.dumps({
+        "version": version, "inicio": len(inicio), "largo": len(cuerpo),
+        "etag": '"' + hashlib.sha1(cuerpo).hexdigest() + '"', "datasets": tramos,
+    }).encode("utf-8")
+    return _PREFIJO.pack(MAGIA, FORMATO, len(indice)) + indice + bytes(cuerpo)
+
+
+class Snapshot:
+    """Vista de solo lectura de un snapshot (mapa del archivo o bytes en memoria)."""
+
+    def __init__(self, buffer, firma=None):
+        self._buffer = buffer  # mantiene vivo el mapa mientras haya vistas
+        self.firma = firma
+        magia, formato, largo = _PREFIJO.unpack_from(buffer, 0)
+        if magia != MAGIA or formato != FORMATO:
+            raise ValueError("snapshot con formato desconocido")
+        vista = memoryview(buffer)
+        indice = json.loads(bytes(vista[_PREFIJO.size:_PREFIJO.size + largo]))
+        self.version = indice["version"]
+        self.etag = indice["etag"]
+        self.tramos = indice["datasets"]
+        self._cuerpo = vista[_PREFIJO.size + largo:_PREFIJO.size + largo + indice["largo"]]
+        self._inicio = indice["inicio"]
+
+    @classmethod
+    def mapear(cls, path=None):
+        """Snapshot de `path` mapeado en memoria; None si no existe o no es válido."""
+        path = path or SNAPSHOT_PATH
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return cls(mapa, (st.st_ino, st.st_mtime_ns, st.st_size))
+        except (OSError, ValueError, struct.error) as e:
+            if os.path.exists(path):
+                print(f"[estadisticas] Snapshot inválido ({e}); se regenera.")
+            return None
+
+    def respuesta(self, seleccion=()):
+        """(etag, cuerpo en bytes) completo o solo con los datasets de `seleccion`."""
+        if not seleccion:
+            return self.etag, bytes(self._cuerpo)
+        nombres = [n for n in self.tramos if n in seleccion]  # orden del EDA
+        partes = [self._cuerpo[:self._inicio]]
+        for i, nombre in enumerate(nombres):
+            desde, largo, _ = self.tramos[nombre]
+            if i:
+                partes.append(b",")
+            partes.append(self._cuerpo[desde:desde + largo])
+        partes.append(b"}}")
+        huella = hashlib.sha1(json.dumps([self.version] + [self.tramos[n][2] for n in nombres]).encode("utf-8"))
+        return '"' + huella.hexdigest() + '"', b"".join(partes)
+
+
+@contextmanager
+def _exclusivo(esperar=True):
+    """Un solo proceso a la vez republica el snapshot. Con esperar=False entrega False si otro lo tiene."""
+    if fcntl is None:
+        yield True
+        return
+    with open(SNAPSHOT_PATH + ".lock", "a") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if esperar else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _firma():
+    try:
+        st = os.stat(SNAPSHOT_PATH)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _mapeado():
+    """Snapshot del disco, mapeado de nuevo solo si el archivo cambió (otro inode/mtime)."""
+    with _lock:
+        snap = _actual["snapshot"]
+        firma = _firma()
+        if firma is not None and (snap is None or snap.firma != firma):
+            snap = _actual["snapshot"] = Snapshot.mapear() or snap
+        return snap
+
+
+def _reciente(snap):
+    """El snapshot en disco se publicó hace menos de ESTADISTICAS_INTERVALO."""
+    return snap.firma is not None and time.time() - snap.firma[1] / 1e9 < ESTADISTICAS_INTERVALO
+
+
+def publicar(version=None, filas=None):
+    """
+    Escribe el snapshot de `version` (por defecto la fuente actual, ver _fuente) y lo deja
+    mapeado en este proceso. Si no se puede escribir, queda solo en memoria de este worker.
+    Arma y escribe sin tomar `_lock`: las consultas siguen con el snapshot anterior.
+    """
+    if version is None:
+        version, filas = _fuente()
+    datos = serializar(version, agrupar(filas() if callable(filas) else filas))
+    try:
+        with atomic_write(SNAPSHOT_PATH, mode="wb") as f:
+            f.write(datos)
+        snap = Snapshot.mapear()
+    except OSError as e:
+        print(f"[estadisticas] No se pudo escribir {SNAPSHOT_PATH}: {e}")
+        snap = None
+    snap = snap or Snapshot(datos)
+    with _lock:
+        _actual["snapshot"] = snap
+    return snap
+
+
+def vigente():
+    """
+    Snapshot de la versión actual de los agregados. Si quedó atrás lo republica este hilo,
+    salvo que haya uno recién publicado (ESTADISTICAS_INTERVALO) u otro hilo/proceso ya lo esté
+    haciendo: entonces se sirve el anterior. Sin ninguno (arranque) se espera a tenerlo.
+    """
+    version, _ = _fuente()
+    snap = _mapeado()
+    if snap is not None and (snap.version == version or _reciente(snap)):
+        return snap
+    if not _publicando.acquire(blocking=snap is None):
+        return snap
+    try:
+        with _exclusivo(esperar=snap is None) as propio:
+            if not propio:
+                return snap
+            snap = _mapeado()  # otro worker pudo publicarlo mientras tanto
+            version, filas = _fuente()
+            if snap is None or snap.version != version:
+                snap = publicar(version, filas)
+            return snap
+    finally:
+        _publicando.release()
+
+
+def respuesta(nombres=None):
+    """
+    (etag, cuerpo JSON en bytes) de los datasets pedidos (todos si `nombres` está vacío).
+    El ETag es fuerte: hash del cuerpo completo, o de la versión y los tramos de la selección.
+    """
+    return vigente().respuesta(_seleccion(nombres))
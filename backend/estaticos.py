@@ -0,0 +1,152 @@
+# Frontend estático construido en memoria al arrancar: CSS/JS con huella (styles.<hash>.css),
+# referencias reescritas en los HTML y cada archivo ya comprimido (gzip, y br si hay brotli).
+# Los archivos con huella se sirven con Cache-Control immutable: el navegador no vuelve a
+# pedirlos hasta que cambie su contenido (y con él, el nombre).
+# La compresión (brotli 11 es lo más lento del arranque) corre en un hilo aparte: mientras
+# termina, cada archivo sale con las variantes que ya estén listas o sin comprimir.
+import os
+import re
+import gzip
+import hashlib
+import mimetypes
+import threading
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except Exception:
+    HAS_BROTLI = False
+
+# Extensiones que reciben huella en el nombre
+CON_HUELLA = {".css", ".js"}
+# Extensiones que vale la pena comprimir
+COMPRIMIBLES = {".html", ".css", ".js", ".svg", ".json", ".txt"}
+INMUTABLE = "public, max-age=31536000, immutable"
+REVALIDAR = "no-cache"
+
+_REF = re.compile(r'(\b(?:href|src)=")([^"/:?#]+\.(?:css|js))(")')
+
+
+class Archivo:
+    """Bytes de un archivo del frontend y sus variantes comprimidas."""
+
+    def __init__(self, datos, mimetype, inmutable):
+        self.datos = datos
+        self.mimetype = mimetype
+        self.inmutable = inmutable
+        self.etag = hashlib.sha256(datos).hexdigest()[:20]
+        self.variantes = {}
+
+    def comprimir(self):
+        """Calcula las variantes gzip/br (se publican juntas al final)."""
+        if len(self.datos) <= 512 or self.variantes:
+            return
+        variantes = {"gzip": gzip.compress(self.datos, compresslevel=9, mtime=0)}
+        if HAS_BROTLI:
+            variantes["br"] = brotli.compress(self.datos, quality=11)
+        self.variantes = variantes
+
+    def para(self, accept_encodings):
+        """(bytes, content_encoding) según Accept-Encoding (br > gzip > sin comprimir)."""
+        for encoding in ("br", "gzip"):
+            if encoding in self.variantes and accept_encodings[encoding]:
+                return self.variantes[encoding], encoding
+        return self.datos, None
+
+
+def _mimetype(nombre):
+    # Response agrega "; charset=utf-8" a los tipos de texto
+    return mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+
+
+def _fuentes(front_dir):
+    return sorted(
+        n for n in os.listdir(front_dir)
+        if os.path.isfile(os.path.join(front_dir, n)) and os.path.splitext(n)[1] in COMPRIMIBLES
+    )
+
+
+def construir(front_dir, comprimir=True):
+    """
+    {nombre_url: Archivo} del directorio del frontend. Cada CSS/JS queda también con su
+    nombre con huella (inmutable) y los HTML apuntan a esos nombres. Con comprimir=False las
+    variantes quedan pendientes (Archivo.comprimir()).
+    """
+    archivos, huellas = {}, {}
+    nombres = _fuentes(front_dir)
+    for nombre in nombres:
+        base, ext = os.path.splitext(nombre)
+        if ext not in CON_HUELLA:
+            continue
+        with open(os.path.join(front_dir, nombre), "rb") as f:
+            datos = f.read()
+        huella = f"{base}.{hashlib.sha256(datos).hexdigest()[:10]}{ext}"
+        huellas[nombre] = huella
+        archivos[huella] = Archivo(datos, _mimetype(nombre), inmutable=True)
+        archivos[nombre] = Archivo(datos, _mimetype(nombre), inmutable=False)  # HTML viejos en caché
+    for nombre in nombres:
+        if nombre in huellas:
+            continue
+        with open(os.path.join(front_dir, nombre), "rb") as f:
+            datos = f.read()
+        if nombre.endswith(".html"):
+            texto = _REF.sub(lambda m: m.group(1) + huellas.get(m.group(2), m.group(2)) + m.group(3),
+                             datos.decode("utf-8"))
+            datos = texto.encode("utf-8")
+        archivos[nombre] = Archivo(datos, _mimetype(nombre), inmutable=False)
+    if comprimir:
+        for archivo in archivos.values():
+            archivo.comprimir()
+    return archivos
+
+
+def _comprimir_todos(archivos):
+    # primero lo que pide la primera carga de la página (HTML, luego CSS/JS con huella)
+    orden = sorted(archivos.items(), key=lambda kv: (not kv[0].endswith(".html"), not kv[1].inmutable))
+    for _, archivo in orden:
+        archivo.comprimir()
+
+
+class Estaticos:
+    """Archivos construidos de un directorio; se reconstruyen si cambia alguna fuente (dev)."""
+
+    def __init__(self, front_dir, comprimir_en_fondo=True):
+        self.front_dir = front_dir
+        self.comprimir_en_fondo = comprimir_en_fondo
+        self._lock = threading.Lock()
+        self._firma = None
+        self._archivos = {}
+
+    def _firma_actual(self):
+        return tuple(
+            (n, os.path.getmtime(os.path.join(self.front_dir, n))) for n in _fuentes(self.front_dir)
+        )
+
+    def archivos(self, revisar=False):
+        """Mapa construido; con revisar=True compara mtimes y reconstruye si algo cambió."""
+        if self._firma is None or revisar:
+            firma = self._firma_actual()
+            if firma != self._firma:
+                with self._lock:
+                    if firma != self._firma:
+                        archivos = construir(self.front_dir, comprimir=not self.comprimir_en_fondo)
+                        if self.comprimir_en_fondo:
+                            threading.Thread(target=_comprimir_todos, args=(archivos,),
+                                             name="estaticos", daemon=True).start()
+                        self._archivos = archivos
+                        self._firma = firma
+        return self._archivos
+
+    def respuesta(self, nombre, request, response_class):
+        """Response para `nombre` (o None si no es un archivo construido)."""
+        archivo = self.archivos(revisar=nombre.endswith(".html")).get(nombre)
+        if archivo is None:
+            return None
+        datos, encoding = archivo.para(request.accept_encodings)
+        resp = response_class(datos, mimetype=archivo.mimetype)
+        resp.set_etag(archivo.etag + (f"-{encoding}" if encoding else ""))
+        resp.headers["Cache-Control"] = INMUTABLE if archivo.inmutable else REVALIDAR
+        if encoding:
+            resp.headers["Content-Encoding"] = encoding
+        resp.vary.add("Accept-Encoding")
+        return resp.make_conditional(request)
@@ -1,8 +1,6 @@
-import os, sys
-import pandas as pd
-from dotenv import load_dotenv
-from appwrite.client import Client
-from appwrite.services.databases import Databases
+import os, sys, csv, json, time, random, queue, threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 
 try:
     from appwrite.query import Query
@@ -10,17 +8,28 @@ try:
 except Exception:
     HAS_QUERY = False
 
-BASE_DIR = os.path.dirname(__file__)
-ENV_PATH = os.path.join(BASE_DIR, ".env")
-load_dotenv(ENV_PATH)
+try:
+    from . import agregados, columnar, duplicados, metricas
+    from .utils import atomic_write
+    from .almacen import get_almacen
+    from .appwrite_config import get_client
+except ImportError:
+    import agregados, columnar, duplicados, metricas
+    from utils import atomic_write
+    from almacen import get_almacen
+    from appwrite_config import get_client
 
-APPWRITE_ENDPOINT      = os.getenv("APPWRITE_ENDPOINT", "https://cloud.appwrite.io/v1")
-APPWRITE_PROJECT_ID    = os.getenv("APPWRITE_PROJECT_ID") or os.getenv("APPWRITE_PROJECT")
-APPWRITE_API_KEY       = os.getenv("APPWRITE_API_KEY")
-APPWRITE_DATABASE_ID   = os.getenv("APPWRITE_DATABASE_ID") or os.getenv("APPWRITE_DATABASE")
-APPWRITE_COLLECTION_ID = os.getenv("APPWRITE_COLLECTION_ID") or os.getenv("APPWRITE_COLLECTION")
+BASE_DIR = os.path.dirname(__file__)
 
 CSV_PATH = os.path.join(BASE_DIR, "respuestas_ia.csv")
+# Export incremental: ids de documento alineados con las filas del CSV + marca de agua
+IDS_PATH = os.path.join(BASE_DIR, "respuestas_ia.ids")
+STATE_PATH = os.path.join(BASE_DIR, "respuestas_ia.estado.json")
+EXPORT_INCREMENTAL = os.getenv("EXPORT_INCREMENTAL", "1").strip().lower() not in {"0", "false", "no"}
+# Motor de descarga: tamaño de página, hilos en paralelo y reintentos por página
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "4"))
+EXPORT_RETRIES = int(os.getenv("EXPORT_RETRIES", "3"))
 
 ORDERED_HEADER = [
     "creado_en","nombre_completo","edad","facultad","carrera","carrera_otro_texto",
@@ -31,36 +40,75 @@ ORDERED_HEADER = [
     "sectores","sectores_otro_texto",
 ]
 
-def assert_env():
-    missing = [k for k,v in {
-        "APPWRITE_ENDPOINT": APPWRITE_ENDPOINT,
-        "APPWRITE_PROJECT_ID": APPWRITE_PROJECT_ID,
-        "APPWRITE_API_KEY": APPWRITE_API_KEY,
-        "APPWRITE_DATABASE_ID": APPWRITE_DATABASE_ID,
-        "APPWRITE_COLLECTION_ID": APPWRITE_COLLECTION_ID,
-    }.items() if not v]
-    if missing:
-        raise RuntimeError(f"Faltan variables en .env: {', '.join(missing)}")
-
 def make_client():
-    assert_env()
-    client = Client()
-    client.set_endpoint(APPWRITE_ENDPOINT)
-    client.set_project(APPWRITE_PROJECT_ID)
-    client.set_key(APPWRITE_API_KEY)
-    return client
-
-def fetch_all(databases, db_id, col_id, page_size=100):
+    """Client Appwrite compartido del proceso (mismo pool de conexiones que la API)."""
+    return get_client()
+
+def _retryable(exc):
+    """Errores de red (sin código), 429 y 5xx se reintentan; 4xx no."""
+    code = getattr(exc, "code", None)
+    return not code or code == 429 or code >= 500
+
+def list_page(databases, db_id, col_id, queries, retries=None, backoff=0.5):
+    """Una página de list_documents con reintentos y backoff exponencial (con jitter)."""
+    retries = EXPORT_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            with metricas.medir("exportar.pagina"):
+                return databases.list_documents(db_id, col_id, queries=queries)
+        except Exception as e:
+            if attempt == retries or not _retryable(e):
+                raise
+            wait = backoff * (2 ** attempt) + random.uniform(0, backoff)
+            print(f"🔁 Reintentando página ({attempt + 1}/{retries}) en {wait:.1f}s: {e}")
+            time.sleep(wait)
+
+def iter_pages(databases, db_id, col_id, filters=(), order="$createdAt", page_size=None):
+    """
+    Recorre la colección con paginación por cursor (Query.cursorAfter): cada página cuesta
+    lo mismo sin importar la profundidad, a diferencia de Query.offset.
+    """
+    page_size = page_size or EXPORT_PAGE_SIZE
+    cursor = None
+    while True:
+        queries = [*filters, Query.order_asc(order), Query.limit(page_size)]
+        if cursor:
+            queries.append(Query.cursor_after(cursor))
+        batch = list_page(databases, db_id, col_id, queries).get("documents", [])
+        if batch:
+            yield batch
+        if len(batch) < page_size:
+            return
+        cursor = batch[-1]["$id"]
+
+def created_bounds(databases, db_id, col_id):
+    """($createdAt del primer documento, $createdAt del último) o None si la colección está vacía."""
+    bounds = []
+    for order in (Query.order_asc, Query.order_desc):
+        docs = list_page(
+            databases, db_id, col_id, [order("$createdAt"), Query.limit(1)]
+        ).get("documents", [])
+        if not docs:
+            return None
+        bounds.append(docs[0]["$createdAt"])
+    return tuple(bounds)
+
+def split_created_ranges(first, last, parts):
+    """Divide [first, last] en `parts` tramos [lo, hi); el último queda abierto (hi=None)."""
+    start, end = datetime.fromisoformat(first), datetime.fromisoformat(last)
+    if parts <= 1 or end <= start:
+        return [(first, None)]
+    step = (end - start) / parts
+    cuts = [first] + [(start + step * i).isoformat(timespec="milliseconds") for i in range(1, parts)]
+    return list(zip(cuts, cuts[1:] + [None]))
+
+def fetch_all_offset(databases, db_id, col_id, page_size=100):
+    """Paginación por offset con queries en texto (SDKs sin appwrite.query.Query)."""
     docs, offset = [], 0
     while True:
-        if HAS_QUERY:
-            resp = databases.list_documents(
-                db_id, col_id, queries=[Query.limit(page_size), Query.offset(offset)]
-            )
-        else:
-            resp = databases.list_documents(
-                db_id, col_id, queries=[f"limit({page_size})", f"offset({offset})"]
-            )
+        resp = databases.list_documents(
+            db_id, col_id, queries=[f"limit({page_size})", f"offset({offset})"]
+        )
         batch = resp.get("documents", [])
         docs.extend(batch)
         if len(batch) < page_size:
@@ -68,53 +116,326 @@ def fetch_all(databases, db_id, col_id, page_size=100):
         offset += page_size
     return docs
 
+def _produce_range(databases, db_id, col_id, lo, hi, page_size, out, stop):
+    """Productor de un tramo: deja sus páginas en `out` (cola acotada) y termina con None."""
+    def put(item):
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        filters = [Query.greater_than_equal("$createdAt", lo)]
+        if hi:
+            filters.append(Query.less_than("$createdAt", hi))
+        for batch in iter_pages(databases, db_id, col_id, filters, page_size=page_size):
+            if not put(batch):
+                return
+        put(None)
+    except Exception as e:
+        put(e)
+
+def iter_documents(databases, db_id, col_id, page_size=None, workers=None):
+    """
+    Genera las páginas de la colección ordenadas por $createdAt.
+    Con workers > 1 se parte el rango de $createdAt en tramos que se piden en paralelo
+    (pool acotado de hilos), cada uno paginado por cursor. Las páginas se entregan en orden
+    y cada tramo retiene como mucho dos páginas sin consumir, así la memoria no crece con
+    el tamaño de la colección.
+    """
+    page_size = page_size or EXPORT_PAGE_SIZE
+    workers = EXPORT_WORKERS if workers is None else workers
+    if not HAS_QUERY:
+        yield fetch_all_offset(databases, db_id, col_id, min(page_size, 100))
+        return
+    if workers <= 1:
+        yield from iter_pages(databases, db_id, col_id, page_size=page_size)
+        return
+
+    bounds = created_bounds(databases, db_id, col_id)
+    if bounds is None:
+        return
+    # más tramos que hilos para repartir mejor la carga si las respuestas se concentran en pocos días
+    ranges = split_created_ranges(*bounds, parts=workers * 4)
+    stop = threading.Event()
+    queues = [queue.Queue(maxsize=2) for _ in ranges]
+    pool = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for (lo, hi), out in zip(ranges, queues):
+            pool.submit(_produce_range, databases, db_id, col_id, lo, hi, page_size, out, stop)
+        for out in queues:
+            while True:
+                item = out.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+    finally:
+        stop.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def fetch_all(databases, db_id, col_id, page_size=None, workers=None):
+    """Descarga toda la colección ordenada por $createdAt (ver iter_documents)."""
+    return [d for batch in iter_documents(databases, db_id, col_id, page_size, workers) for d in batch]
+
+def fetch_since(databases, db_id, col_id, updated_at, page_size=None):
+    """Documentos con $updatedAt >= updated_at (nuevos o modificados desde la marca de agua)."""
+    if not HAS_QUERY:
+        raise RuntimeError("El export incremental requiere appwrite.query.Query")
+    docs = []
+    filters = [Query.greater_than_equal("$updatedAt", updated_at)]
+    for batch in iter_pages(databases, db_id, col_id, filters, order="$updatedAt", page_size=page_size):
+        docs.extend(batch)
+    return docs
+
+def normalize_document(d):
+    """Convierte un documento de Appwrite a un registro plano (dict)."""
+    # algunos SDK devuelven los campos en d["data"], otros plano
+    payload = d.get("data") if isinstance(d.get("data"), dict) else d
+    # filtramos metadatos de Appwrite para no ensuciar el CSV
+    filtered = {k: v for k, v in payload.items() if not k.startswith("$")}
+    # arrays -> "a;b;c"
+    for k, v in list(filtered.items()):
+        if isinstance(v, list):
+            filtered[k] = ";".join(map(str, v))
+    return filtered
+
 def normalize_documents(docs):
     """Convierte la lista de documentos de Appwrite a registros planos (dicts)."""
-    rows = []
+    return [normalize_document(d) for d in docs]
+
+def csv_writer(f):
+    """Writer con el esquema fijo ORDERED_HEADER (campos extra se descartan)."""
+    return csv.DictWriter(f, fieldnames=ORDERED_HEADER, extrasaction="ignore", lineterminator="\n")
+
+def load_state():
+    """Marca de agua persistida ({"updated_at", "last_id"}) o None si no hay export previo usable."""
+    if not (os.path.exists(STATE_PATH) and os.path.exists(IDS_PATH) and os.path.exists(CSV_PATH)):
+        return None
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("updated_at") else None
+
+def advance_state(state, d):
+    """Avanza la marca de agua si el documento es más reciente ($updatedAt, $id)."""
+    key = (d.get("$updatedAt") or "", d.get("$id") or "")
+    if key > (state.get("updated_at") or "", state.get("last_id") or ""):
+        state["updated_at"], state["last_id"] = key
+
+def save_state(state):
+    with atomic_write(STATE_PATH) as f:
+        json.dump(state, f)
+
+def append_ids(ids):
+    with open(IDS_PATH, "a", encoding="utf-8") as f:
+        for doc_id in ids:
+            f.write(f"{doc_id}\n")
+
+def read_ids():
+    with open(IDS_PATH, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+def merge_into_csv(docs):
+    """
+    Integra documentos nuevos/modificados en el CSV existente.
+    Si solo hay altas y no aparecen columnas nuevas, se agregan al final del archivo;
+    si hay modificaciones se reescribe el CSV (vía archivo temporal) reemplazando esas filas.
+    Retorna (nuevas, actualizadas).
+    """
+    ids = read_ids()
+    index = {doc_id: i for i, doc_id in enumerate(ids)}
+    rows = normalize_documents(docs)
+
+    new_ids, new_rows, changed = [], [], {}
+    for d, row in zip(docs, rows):
+        doc_id = d.get("$id")
+        if doc_id in index:
+            changed[index[doc_id]] = row
+        else:
+            index[doc_id] = len(ids) + len(new_ids)
+            new_ids.append(doc_id)
+            new_rows.append(row)
+
+    with open(CSV_PATH, encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), [])
+
+    if not changed and header == ORDERED_HEADER:
+        with open(CSV_PATH, "a", encoding="utf-8", newline="") as f:
+            csv_writer(f).writerows(new_rows)
+        append_ids(new_ids)
+        update_aggregates(new_ids, new_rows, [])
+        return len(new_rows), 0
+
+    # filas modificadas o CSV con otro esquema: se reescribe completo con ORDERED_HEADER
+    replaced = []
+    with open(CSV_PATH, encoding="utf-8-sig", newline="") as src, \
+         atomic_write(CSV_PATH, encoding="utf-8-sig") as dst:
+        writer = csv_writer(dst)
+        writer.writeheader()
+        for i, row in enumerate(csv.DictReader(src)):
+            if i in changed:
+                replaced.append((row, changed[i]))
+                row = changed[i]
+            writer.writerow(row)
+        writer.writerows(new_rows)
+    with atomic_write(IDS_PATH) as f:
+        f.writelines(f"{doc_id}\n" for doc_id in ids + new_ids)
+    update_aggregates(new_ids, new_rows, replaced)
+    return len(new_rows), len(changed)
+
+def update_aggregates(new_ids, new_rows, replaced):
+    """Lleva las altas/modificaciones del export incremental a los agregados del EDA."""
+    try:
+        for doc_id, row in zip(new_ids, new_rows):
+            agregados.registrar(row, doc_id)
+        for old, new in replaced:
+            agregados.actualizar(old, new)
+    except Exception as e:
+        print(f"⚠️ No se pudieron actualizar los agregados ({e}). Se reconcilian en el próximo análisis.")
+
+def escribir_derivados(fondo=False):
+    """
+    Copia columnar del CSV (respuestas_ia.parquet, requiere pyarrow) para el análisis. Con
+    `fondo` (export incremental dentro del servidor) no se reescribe aquí: se programa en
+    segundo plano y con un intervalo mínimo (ver columnar.programar). Las copias .gz/.br se
+    generan al pedir la descarga (ver artefactos.programar).
+    """
+    if not columnar.HAS_ARROW:
+        return
+    if fondo:
+        try:
+            columnar.programar(CSV_PATH)
+        except Exception as e:
+            print(f"⚠️ No se pudo programar el Parquet ({e}). El análisis usará el CSV.")
+        return
+    try:
+        n = columnar.csv_a_parquet(CSV_PATH)
+        print(f"🗂️ Parquet escrito en: {columnar.ruta_parquet(CSV_PATH)} ({n} filas)")
+    except Exception as e:
+        print(f"⚠️ No se pudo escribir el Parquet ({e}). El análisis usará el CSV.")
+
+def indice_duplicados(incremental):
+    """Índice de huellas según EXPORT_DUPLICADOS (None si está desactivado)."""
+    if duplicados.EXPORT_DUPLICADOS not in duplicados.MODOS:
+        raise RuntimeError(f"EXPORT_DUPLICADOS debe ser uno de {duplicados.MODOS}")
+    if duplicados.EXPORT_DUPLICADOS == "no":
+        return None
+    return duplicados.cargar() if incremental else duplicados.nuevo()
+
+def cerrar_duplicados(indice, incremental):
+    """Persiste las huellas nuevas y el reporte respuestas_ia.duplicados.csv."""
+    if indice is None:
+        return
+    duplicados.guardar(indice, reemplazar=not incremental)
+    duplicados.escribir_reporte(indice.duplicados, agregar=incremental)
+    if duplicados.EXPORT_DUPLICADOS == "colapsar":
+        # omitidos del CSV: la próxima reconstrucción no los vuelve a sumar como pendientes
+        agregados.descartar_pendientes(d["id"] for d in indice.duplicados)
+    if indice.duplicados:
+        accion = "omitidos del CSV" if duplicados.EXPORT_DUPLICADOS == "colapsar" else "marcados"
+        print(f"👯 Posibles duplicados {accion}: {len(indice.duplicados)} (ver {duplicados.DUPLICADOS_PATH})")
+
+def exportar_incremental(almacen, state, fondo=False):
+    """Descarga solo lo creado/modificado desde la marca de agua y lo integra al CSV."""
+    docs = almacen.modificados_desde(state["updated_at"])
+    # los documentos con $updatedAt igual a la marca (todos los de un upsert en lote, no solo
+    # last_id) vuelven por el ">=" de la consulta: si ya están en el CSV no se reescriben
+    marca = state["updated_at"]
+    empatados = {d.get("$id") for d in docs if d.get("$updatedAt") == marca}
+    if empatados:
+        with open(IDS_PATH, encoding="utf-8") as f:
+            exportados = {doc_id for doc_id in (line.rstrip("\n") for line in f) if doc_id in empatados}
+        docs = [d for d in docs if not (d.get("$updatedAt") == marca and d.get("$id") in exportados)]
+    print(f"📦 Documentos nuevos/modificados desde {state['updated_at']}: {len(docs)}")
+    metricas.contar("exportar_documentos_total", len(docs), modo="incremental")
+    indice = indice_duplicados(incremental=True)
     for d in docs:
-        # algunos SDK devuelven los campos en d["data"], otros plano
-        payload = d.get("data") if isinstance(d.get("data"), dict) else d
-        # filtramos metadatos de Appwrite para no ensuciar el CSV
-        filtered = {k: v for k, v in payload.items() if not k.startswith("$")}
-        # arrays -> "a;b;c"
-        for k, v in list(filtered.items()):
-            if isinstance(v, list):
-                filtered[k] = ";".join(map(str, v))
-        rows.append(filtered)
-    return rows
-
-def reorder_columns(df: pd.DataFrame) -> pd.DataFrame:
-    present = [c for c in ORDERED_HEADER if c in df.columns]
-    rest = [c for c in df.columns if c not in present]
-    return df[present + rest]
-
-def exportar():
-    client = make_client()
-    db = Databases(client)
-    docs = fetch_all(db, APPWRITE_DATABASE_ID, APPWRITE_COLLECTION_ID)
-
-    print(f"📦 Documentos recibidos: {len(docs)}")
+        advance_state(state, d)
+    if indice is not None:
+        # con colapsar se omiten los duplicados nuevos (las filas ya exportadas se siguen actualizando)
+        colapsar = duplicados.EXPORT_DUPLICADOS == "colapsar"
+        existentes = set(read_ids()) if colapsar else set()
+        originales = indice.ver_lote([(d.get("$id", ""), normalize_document(d)) for d in docs])
+        docs = [
+            d for d, original in zip(docs, originales)
+            if not (original and colapsar and d.get("$id") not in existentes)
+        ]
     if docs:
-        # muestra un documento crudo
-        sample = docs[0]
-        print("🔎 Ejemplo crudo (truncado):", {k: sample.get(k) for k in list(sample)[:10]})
+        nuevas, actualizadas = merge_into_csv(docs)
+        print(f"🧩 Filas agregadas: {nuevas} | filas actualizadas: {actualizadas}")
+    cerrar_duplicados(indice, incremental=True)
+    save_state(state)
+    parquet_viejo = columnar.HAS_ARROW and not columnar.vigente(columnar.ruta_parquet(CSV_PATH), CSV_PATH)
+    if docs or parquet_viejo:
+        escribir_derivados(fondo)
+    print(f"✅ CSV actualizado en: {CSV_PATH} (tamaño: {os.path.getsize(CSV_PATH)} bytes)")
 
-    rows = normalize_documents(docs)
+@metricas.cronometrado("exportar")
+def exportar(incremental=None, fondo=False):
+    """
+    Exporta la colección (del almacén configurado, ver almacen.py) a respuestas_ia.csv.
+    En modo incremental (por defecto, ver EXPORT_INCREMENTAL) solo se piden al almacén los
+    documentos nuevos o modificados desde la última exportación. Los borrados en Appwrite no se
+    detectan así: un export completo (incremental=False / --full) reconcilia el archivo.
+    `fondo`: el proceso sigue vivo después (servidor), ver escribir_derivados.
+    """
+    if incremental is None:
+        incremental = EXPORT_INCREMENTAL
+    almacen = get_almacen()
+
+    state = load_state() if incremental else None
+    if state is not None:
+        try:
+            return exportar_incremental(almacen, state, fondo)
+        except Exception as e:
+            print(f"⚠️ Export incremental falló ({e}). Se hace export completo.")
 
-    # muestra fila normalizada
-    if rows:
-        print("🧪 Ejemplo normalizado:", {k: rows[0].get(k) for k in list(rows[0])[:10]})
+    # sin marca de agua válida mientras el export completo no termine
+    if os.path.exists(STATE_PATH):
+        os.remove(STATE_PATH)
 
-    # si no hay filas, igual generamos CSV con encabezado base
-    if not rows:
-        print("⚠️ No hay datos para escribir. Generando CSV con encabezado base.")
-        df = pd.DataFrame(columns=ORDERED_HEADER)
-    else:
-        df = pd.DataFrame.from_records(rows)
-        df = reorder_columns(df)
+    total, state = 0, {}
+    indice = indice_duplicados(incremental=False)
+    colapsar = duplicados.EXPORT_DUPLICADOS == "colapsar"
+    with atomic_write(CSV_PATH, encoding="utf-8-sig") as f, atomic_write(IDS_PATH) as ids:
+        writer = csv_writer(f)
+        writer.writeheader()
+        # las páginas se normalizan y escriben a medida que llegan: nunca está toda la colección en memoria
+        for batch in almacen.paginas():
+            if total == 0:
+                # muestra un documento crudo y su fila normalizada
+                sample = batch[0]
+                print("🔎 Ejemplo crudo (truncado):", {k: sample.get(k) for k in list(sample)[:10]})
+                row = normalize_document(sample)
+                print("🧪 Ejemplo normalizado:", {k: row.get(k) for k in list(row)[:10]})
+            rows = [normalize_document(d) for d in batch]
+            # huellas de la página en la misma pasada; con colapsar queda solo la primera de cada una
+            originales = (
+                indice.ver_lote([(d.get("$id", ""), row) for d, row in zip(batch, rows)])
+                if indice is not None else [None] * len(batch)
+            )
+            for d, row, original in zip(batch, rows, originales):
+                advance_state(state, d)
+                if original and colapsar:
+                    continue
+                writer.writerow(row)
+                ids.write(f"{d.get('$id', '')}\n")
+            total += len(batch)
+            metricas.contar("exportar_documentos_total", len(batch), modo="completo")
 
-    # write
-    df.to_csv(CSV_PATH, index=False, encoding="utf-8-sig")
+    print(f"📦 Documentos recibidos: {total}")
+    cerrar_duplicados(indice, incremental=False)
+    if not total:
+        print("⚠️ No hay datos para escribir. CSV generado con encabezado base.")
+    save_state(state)
+    escribir_derivados()
 
     size = os.path.getsize(CSV_PATH) if os.path.exists(CSV_PATH) else 0
     print(f"✅ CSV escrito en: {CSV_PATH} (tamaño: {size} bytes)")
@@ -123,7 +444,7 @@ def exportar():
 
 if __name__ == "__main__":
     try:
-        exportar()
+        exportar(incremental=False if "--full" in sys.argv[1:] else None)
     except Exception as e:
         print(f"❌ Error exportando: {e}", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,148 @@
+# Claves de idempotencia para /api/response (encabezado Idempotency-Key que genera el cliente
+# por envío; respondente_id no sirve: identifica a la persona, no al envío, y perdería sus
+# respuestas posteriores). La primera petición con una clave la reserva y, al terminar, guarda
+# su respuesta; un reintento con la misma clave recibe esa misma respuesta sin volver a
+# escribir en el almacén.
+# La tabla vive en la base SQLite local (compartida entre workers) y se acota por antigüedad
+# (IDEMPOTENCIA_TTL) y por tamaño (IDEMPOTENCIA_MAX, se descartan las menos usadas).
+import os
+import json
+import time
+import hashlib
+
+try:
+    from .sqlite_local import connect, transaction
+except ImportError:
+    from sqlite_local import connect, transaction
+
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", str(24 * 3600)))
+IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", "100000"))
+# Una reserva sin terminar más vieja que esto se da por abandonada (worker reiniciado)
+EN_CURSO_MAX = 60.0
+# Cada cuántas respuestas guardadas (por proceso) se poda la tabla
+PODA_CADA = 500
+MAX_CLAVE = 255
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS idempotencia (
+    clave   TEXT PRIMARY KEY,
+    huella  TEXT NOT NULL,        -- hash del payload validado (sin creado_en)
+    estado  TEXT NOT NULL,        -- en_curso | hecho
+    codigo  INTEGER,
+    cuerpo  TEXT,
+    creado  REAL NOT NULL,
+    usado   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotencia_usado ON idempotencia (usado);
+"""
+
+_schema_ready = set()
+_guardadas = 0
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+def clave_de(encabezado):
+    """
+    Clave de la petición a partir del encabezado Idempotency-Key; None si no viene.
+    ValueError si la clave es vacía o demasiado larga.
+    """
+    if encabezado is None:
+        return None
+    valor = encabezado.strip()
+    if not valor or len(valor) > MAX_CLAVE:
+        raise ValueError(f"La clave de idempotencia debe tener entre 1 y {MAX_CLAVE} caracteres.")
+    return f"k:{valor}"
+
+
+def huella(data):
+    """Hash del payload validado, sin creado_en (lo asigna el servidor en cada intento)."""
+    contenido = {k: v for k, v in data.items() if k != "creado_en"}
+    return hashlib.sha256(json.dumps(contenido, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def huella_documento(doc):
+    """
+    huella() de un documento guardado: sin los campos del sistema ($id, $createdAt...) ni los
+    atributos nulos (Appwrite devuelve todos los del esquema, aunque el payload no los trajera).
+    """
+    return huella({k: v for k, v in doc.items() if not k.startswith("$") and v is not None})
+
+
+def misma_respuesta(doc, data):
+    """El documento guardado con un $id de idempotencia tiene el mismo contenido que `data`."""
+    return huella_documento(doc) == huella_documento(data)
+
+
+def doc_id(clave):
+    """$id determinista de la clave (36 caracteres válidos para Appwrite): el almacén rechaza
+    con 409 una segunda escritura aunque la clave ya no esté en la tabla."""
+    return "i" + hashlib.sha256(clave.encode("utf-8")).hexdigest()[:35]
+
+
+def reservar(clave, huella_payload):
+    """
+    Reserva `clave` para esta petición. Retorna (estado, respuesta):
+    - ("nueva", None): procesar y luego completar() o liberar();
+    - ("hecho", (codigo, cuerpo)): responder lo mismo que la primera vez;
+    - ("en_curso", None): otra petición con la misma clave aún no termina;
+    - ("distinta", None): la clave ya se usó con otro contenido.
+    """
+    ahora = time.time()
+    with transaction(_conn()) as conn:
+        row = conn.execute(
+            "SELECT huella, estado, codigo, cuerpo, creado FROM idempotencia WHERE clave = ?", (clave,)
+        ).fetchone()
+        vencida = row is not None and (
+            row["creado"] < ahora - IDEMPOTENCIA_TTL
+            or (row["estado"] == "en_curso" and row["creado"] < ahora - EN_CURSO_MAX)
+        )
+        if row is None or vencida:
+            conn.execute(
+                "INSERT INTO idempotencia (clave, huella, estado, creado, usado) VALUES (?, ?, 'en_curso', ?, ?) "
+                "ON CONFLICT (clave) DO UPDATE SET huella = excluded.huella, estado = 'en_curso', "
+                "codigo = NULL, cuerpo = NULL, creado = excluded.creado, usado = excluded.usado",
+                (clave, huella_payload, ahora, ahora),
+            )
+            return "nueva", None
+        if row["huella"] != huella_payload:
+            return "distinta", None
+        if row["estado"] == "en_curso":
+            return "en_curso", None
+        conn.execute("UPDATE idempotencia SET usado = ? WHERE clave = ?", (ahora, clave))
+        return "hecho", (row["codigo"], row["cuerpo"])
+
+
+def completar(clave, codigo, cuerpo):
+    """Guarda la respuesta de la petición que reservó `clave`."""
+    global _guardadas
+    _conn().execute(
+        "UPDATE idempotencia SET estado = 'hecho', codigo = ?, cuerpo = ?, usado = ? WHERE clave = ?",
+        (codigo, cuerpo, time.time(), clave),
+    )
+    _guardadas += 1
+    if _guardadas % PODA_CADA == 0:
+        podar()
+
+
+def liberar(clave):
+    """Suelta la reserva (la petición falló): un reintento vuelve a procesarse."""
+    _conn().execute("DELETE FROM idempotencia WHERE clave = ? AND estado = 'en_curso'", (clave,))
+
+
+def podar():
+    """Borra las claves vencidas y, sobre IDEMPOTENCIA_MAX, las usadas hace más tiempo."""
+    with transaction(_conn()) as conn:
+        conn.execute("DELETE FROM idempotencia WHERE usado < ?", (time.time() - IDEMPOTENCIA_TTL,))
+        sobran = conn.execute("SELECT COUNT(*) FROM idempotencia").fetchone()[0] - IDEMPOTENCIA_MAX
+        if sobran > 0:
+            conn.execute(
+                "DELETE FROM idempotencia WHERE clave IN "
+                "(SELECT clave FROM idempotencia ORDER BY usado LIMIT ?)", (sobran,)
+            )
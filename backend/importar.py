@@ -0,0 +1,348 @@
+# Importación masiva de respuestas (migración de encuestas en papel/Excel o re-siembra de la
+# colección) desde NDJSON, CSV con el esquema de respuestas_ia.csv (ORDERED_HEADER) o un
+# arreglo JSON. Por bloques: el parseo y la validación (reglas de validate_payload) se reparten
+# en un pool de procesos, las filas válidas se escriben en el almacén (Appwrite por defecto,
+# ver almacen.py) en lotes concurrentes
+# (pool acotado de hilos, upsert con $id propio para reintentar sin duplicar) y se retorna un
+# reporte con el error de cada fila rechazada. El $id sale de un hash del contenido de la fila
+# (incluido el creado_en de origen), así volver a importar el mismo archivo no duplica nada.
+#
+#   python -m backend.importar respuestas.ndjson|respuestas.csv [--validar] [--reporte errores.json]
+#                              [--procesos N] [--hilos N] [--lote N]
+import os
+import io
+import sys
+import csv
+import json
+import time
+import hashlib
+import random
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    from . import agregados
+    from .utils import ARRAY_FIELDS, validate_many
+    from .exportar_csv import ORDERED_HEADER
+    from .almacen import get_almacen
+except ImportError:
+    import agregados
+    from utils import ARRAY_FIELDS, validate_many
+    from exportar_csv import ORDERED_HEADER
+    from almacen import get_almacen
+
+# Filas por bloque (lo que se tiene en memoria a la vez) y por tarea del pool de procesos
+IMPORT_BLOQUE = int(os.getenv("IMPORT_BLOQUE", "5000"))
+IMPORT_TAREA = int(os.getenv("IMPORT_TAREA", "1000"))
+# Procesos para parsear/validar (0 = en el mismo proceso; con una sola CPU el pool solo suma
+# costo de serialización) y escrituras concurrentes al almacén
+_CPUS = os.cpu_count() or 1
+IMPORT_PROCESOS = int(os.getenv("IMPORT_PROCESOS", str(min(4, _CPUS) if _CPUS > 1 else 0)))
+IMPORT_HILOS = int(os.getenv("IMPORT_HILOS", "4"))
+# Documentos por escritura en lote y reintentos por lote
+IMPORT_LOTE = int(os.getenv("IMPORT_LOTE", "100"))
+IMPORT_RETRIES = int(os.getenv("IMPORT_RETRIES", "3"))
+
+FORMATOS = ("ndjson", "csv", "json")
+
+
+# -----------------------------
+# Parseo y validación (corre en los procesos del pool)
+# -----------------------------
+def _entero(valor):
+    """'20' / '20.0' (CSV exportado con pandas) -> 20; si no es entero se deja tal cual y la validación lo rechaza."""
+    try:
+        return int(valor)
+    except ValueError:
+        try:
+            f = float(valor)
+        except ValueError:
+            return valor
+        return int(f) if f.is_integer() else valor
+
+
+def payload_csv(fila):
+    """Fila CSV ({columna: texto}) -> payload como el del formulario (arreglos, edad entera)."""
+    payload = {}
+    for campo, valor in fila.items():
+        valor = (valor or "").strip()
+        if campo in ARRAY_FIELDS:
+            payload[campo] = [v.strip() for v in valor.split(";") if v.strip()]
+        elif not valor:
+            continue
+        elif campo == "edad":
+            payload[campo] = _entero(valor)
+        else:
+            payload[campo] = valor
+    return payload
+
+
+def _creado_en(payload):
+    """creado_en de origen (se conserva al importar), None si no trae; ValueError si no es ISO 8601."""
+    valor = payload.get("creado_en") if isinstance(payload, dict) else None
+    valor = valor.strip() if isinstance(valor, str) else ""
+    if valor:
+        datetime.fromisoformat(valor)
+    return valor or None
+
+
+def doc_id(datos, creado_en=None):
+    """
+    $id determinista de una fila importada: hash del payload validado (sin el creado_en que pone
+    el backend) más el creado_en de origen si trae. 33 caracteres válidos para Appwrite.
+    """
+    contenido = {k: v for k, v in datos.items() if k != "creado_en"}
+    clave = json.dumps(contenido, sort_keys=True, ensure_ascii=False) + "\x1f" + (creado_en or "")
+    return "i" + hashlib.blake2b(clave.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def procesar(formato, crudas, header=None):
+    """
+    Parsea y valida un trozo de filas crudas (líneas NDJSON, filas CSV como listas u objetos
+    JSON). Retorna [(ok, datos_o_errores, doc_id)] en el mismo orden (doc_id None si no es válida).
+    """
+    payloads, previos = [], {}
+    for i, cruda in enumerate(crudas):
+        try:
+            if formato == "ndjson":
+                payload = json.loads(cruda)
+            elif formato == "csv":
+                if len(cruda) != len(header):
+                    raise ValueError(f"se esperaban {len(header)} columnas y hay {len(cruda)}")
+                payload = payload_csv(dict(zip(header, cruda)))
+            else:
+                payload = cruda
+            _creado_en(payload)
+        except ValueError as e:
+            previos[i] = (False, {"_": f"Fila ilegible: {e}"}, None)
+            payload = None
+        payloads.append(payload)
+
+    resultados = validate_many([p for i, p in enumerate(payloads) if i not in previos])
+    salida, it = [], iter(resultados)
+    for i, payload in enumerate(payloads):
+        if i in previos:
+            salida.append(previos[i])
+            continue
+        ok, datos = next(it)
+        if not ok:
+            salida.append((ok, datos, None))
+            continue
+        creado_en = _creado_en(payload)
+        if creado_en:
+            datos["creado_en"] = creado_en
+        salida.append((ok, datos, doc_id(datos, creado_en)))
+    return salida
+
+
+# -----------------------------
+# Lectura de la entrada
+# -----------------------------
+def detectar_formato(nombre="", content_type=""):
+    """ndjson | csv | json según la extensión del archivo o el Content-Type (ndjson por defecto)."""
+    pista = f"{nombre} {content_type}".lower()
+    if "csv" in pista:
+        return "csv"
+    if "ndjson" in pista or "jsonl" in pista or "json-seq" in pista:
+        return "ndjson"
+    if "json" in pista:
+        return "json"
+    return "ndjson"
+
+
+def filas_crudas(f, formato):
+    """
+    (header, iterador de (n_fila, cruda)) de un archivo de texto abierto. n_fila es la línea
+    del archivo (NDJSON/CSV) o la posición en el arreglo (JSON), desde 1.
+    """
+    if formato == "csv":
+        reader = csv.reader(f)
+        header = [c.strip().lstrip("\ufeff") for c in next(reader, [])]
+        desconocidas = set(header) - set(ORDERED_HEADER)
+        if desconocidas:
+            print(f"⚠️ Columnas fuera de ORDERED_HEADER (se ignoran): {sorted(desconocidas)}")
+        # line_num cuenta líneas físicas: sirve aunque un texto tenga saltos de línea
+        return header, ((reader.line_num, fila) for fila in reader if fila)
+    if formato == "json":
+        datos = json.load(f)
+        if not isinstance(datos, list):
+            raise ValueError("Se esperaba un arreglo JSON de respuestas.")
+        return None, enumerate(datos, 1)
+    return None, ((n, linea) for n, linea in enumerate(f, 1) if linea.strip())
+
+
+def _trozos(seq, n):
+    for i in range(0, len(seq), n):
+        yield seq[i:i + n]
+
+
+def _bloques(it, n):
+    bloque = []
+    for item in it:
+        bloque.append(item)
+        if len(bloque) >= n:
+            yield bloque
+            bloque = []
+    if bloque:
+        yield bloque
+
+
+# -----------------------------
+# Escritura en el almacén
+# -----------------------------
+def _retryable(exc):
+    code = getattr(exc, "code", None)
+    return not code or code == 429 or code >= 500
+
+
+def escribir_lote(almacen, docs, retries=None, backoff=0.5):
+    """
+    Escribe [(doc_id, datos)] con una escritura en lote (reintentos con backoff para red/429/5xx).
+    Si el almacén rechaza el lote se envían uno por uno para saber qué fila falló.
+    Retorna {doc_id: error} de los que no se guardaron.
+    """
+    retries = IMPORT_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            # upsert con $id propio: reintentar un lote que sí llegó no duplica documentos
+            almacen.guardar_lote(docs)
+            return {}
+        except Exception as e:
+            if not _retryable(e):
+                break
+            if attempt == retries:
+                return {doc_id: str(e) for doc_id, _ in docs}
+            time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+    errores = {}
+    for doc_id, datos in docs:
+        try:
+            almacen.guardar(datos, doc_id=doc_id)
+        except Exception as e:
+            if getattr(e, "code", None) != 409:  # 409: ya existe
+                errores[doc_id] = str(e)
+    return errores
+
+
+# -----------------------------
+# Importación
+# -----------------------------
+def importar(filas, formato, header=None, guardar=True, procesos=None, hilos=None, lote=None):
+    """
+    Importa un iterable de (n_fila, cruda) (ver filas_crudas). Con guardar=False solo valida.
+    Retorna el reporte: {total, validas, repetidas, guardadas, rechazadas, errores: [{fila, errores}],
+    segundos}. repetidas: filas válidas idénticas a otra anterior del mismo bloque (mismo $id), que
+    no se vuelven a escribir; entre bloques o importaciones distintas el upsert las deja en un documento.
+    """
+    procesos = IMPORT_PROCESOS if procesos is None else procesos
+    hilos = hilos or IMPORT_HILOS
+    lote = lote or IMPORT_LOTE
+    t0 = time.perf_counter()
+    reporte = {"total": 0, "validas": 0, "repetidas": 0, "guardadas": 0, "rechazadas": 0, "errores": []}
+    almacen = get_almacen() if guardar else None
+
+    # spawn: hacer fork de un worker de gunicorn con hilos vivos puede heredar locks tomados
+    pool = ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context("spawn")) if procesos > 0 else None
+    escritores = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="importar") if guardar else None
+    try:
+        for bloque in _bloques(filas, IMPORT_BLOQUE):
+            numeros = [n for n, _ in bloque]
+            crudas = [c for _, c in bloque]
+            if pool is not None and len(crudas) > IMPORT_TAREA:
+                trozos = pool.map(procesar, *zip(*[
+                    (formato, t, header) for t in _trozos(crudas, IMPORT_TAREA)
+                ]))
+                resultados = [r for trozo in trozos for r in trozo]
+            else:
+                resultados = procesar(formato, crudas, header)
+
+            por_id = {}
+            for n, (ok, datos, id_) in zip(numeros, resultados):
+                if not ok:
+                    reporte["errores"].append({"fila": n, "errores": datos})
+                elif id_ in por_id:
+                    reporte["repetidas"] += 1
+                else:
+                    por_id[id_] = (n, datos)
+            reporte["total"] += len(bloque)
+            reporte["validas"] += sum(1 for ok, _, _ in resultados if ok)
+            if not guardar or not por_id:
+                continue
+
+            lotes = _trozos([(id_, datos) for id_, (_, datos) in por_id.items()], lote)
+            fallidos = {}
+            for errores in escritores.map(lambda docs: escribir_lote(almacen, docs), lotes):
+                fallidos.update(errores)
+            for doc_id, error in fallidos.items():
+                reporte["errores"].append({"fila": por_id[doc_id][0], "errores": {"_": f"{almacen.nombre}: {error}"}})
+            guardados = [(datos, doc_id) for doc_id, (_, datos) in por_id.items() if doc_id not in fallidos]
+            reporte["guardadas"] += len(guardados)
+            try:
+                agregados.registrar_lote(guardados)
+            except Exception as e:
+                print(f"[agregados] No se pudo registrar el bloque importado: {e}")
+            print(f"📥 Importadas {reporte['guardadas']}/{reporte['total']} filas...")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if escritores is not None:
+            escritores.shutdown(cancel_futures=True)
+
+    reporte["errores"].sort(key=lambda e: e["fila"])
+    reporte["rechazadas"] = len(reporte["errores"])
+    reporte["segundos"] = round(time.perf_counter() - t0, 3)
+    return reporte
+
+
+def importar_texto(texto, formato, **kwargs):
+    """importar() de un contenido completo en memoria (cuerpo de una petición HTTP)."""
+    header, filas = filas_crudas(io.StringIO(texto, newline=""), formato)
+    return importar(filas, formato, header=header, **kwargs)
+
+
+def importar_archivo(path, formato=None, **kwargs):
+    """importar() leyendo el archivo por bloques (no se carga completo en memoria, salvo JSON)."""
+    formato = formato or detectar_formato(path)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        header, filas = filas_crudas(f, formato)
+        return importar(filas, formato, header=header, **kwargs)
+
+
+def _opcion(args, nombre, tipo=str, defecto=None):
+    if nombre in args:
+        return tipo(args[args.index(nombre) + 1])
+    return defecto
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0].startswith("-"):
+        print("Uso: python -m backend.importar archivo.ndjson|archivo.csv [--validar] [--reporte errores.json] "
+              "[--formato ndjson|csv|json] [--procesos N] [--hilos N] [--lote N]")
+        sys.exit(2)
+    try:
+        reporte = importar_archivo(
+            args[0],
+            formato=_opcion(args, "--formato"),
+            guardar="--validar" not in args,
+            procesos=_opcion(args, "--procesos", int),
+            hilos=_opcion(args, "--hilos", int),
+            lote=_opcion(args, "--lote", int),
+        )
+    except Exception as e:
+        print(f"❌ Error importando: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    destino = _opcion(args, "--reporte")
+    if destino:
+        with open(destino, "w", encoding="utf-8") as f:
+            json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"✅ {reporte['total']} filas: {reporte['validas']} válidas ({reporte['repetidas']} repetidas), "
+          f"{reporte['guardadas']} guardadas, "
+          f"{reporte['rechazadas']} rechazadas en {reporte['segundos']}s")
+    for error in reporte["errores"][:20]:
+        print(f"   fila {error['fila']}: {error['errores']}")
+    if reporte["rechazadas"] > 20:
+        print(f"   ... y {reporte['rechazadas'] - 20} más" + (f" (ver {destino})" if destino else ""))
+    sys.exit(1 if reporte["rechazadas"] else 0)
@@ -0,0 +1,301 @@
+# Instrumentación liviana: contadores e histogramas de latencia en memoria de cada proceso,
+# volcados cada METRICAS_INTERVALO segundos a la base SQLite local (una fila por proceso).
+# /metrics suma las filas de todos los workers y las expone en formato Prometheus; las filas
+# de procesos que ya murieron se acumulan en una sola para que los contadores no retrocedan.
+import io
+import os
+import json
+import time
+import uuid
+import atexit
+import bisect
+import pstats
+import cProfile
+import functools
+import threading
+from contextlib import contextmanager
+
+try:
+    from .sqlite_local import connect, transaction
+except ImportError:
+    from sqlite_local import connect, transaction
+
+METRICAS = os.getenv("METRICAS", "1").strip().lower() not in {"0", "false", "no"}
+METRICAS_INTERVALO = float(os.getenv("METRICAS_INTERVALO", "5"))
+PREFIJO = "formulario_ia_"
+# Límites superiores (segundos) de los histogramas; el último bucket es +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+ACUMULADO = "acumulado"
+
+# Descripciones para # HELP (las métricas sin entrada salen igual, sin HELP)
+AYUDA = {
+    "http_duracion_segundos": "Latencia de las peticiones HTTP por endpoint, método y estado.",
+    "etapa_duracion_segundos": "Duración de las etapas internas (validación, almacén, export, EDA...).",
+    "appwrite_duracion_segundos": "Duración de las llamadas a la API de Appwrite.",
+    "appwrite_llamadas_total": "Llamadas a la API de Appwrite por método, ruta y estado.",
+    "appwrite_errores_total": "Llamadas a Appwrite que fallaron (red o estado >= 400).",
+    "exportar_documentos_total": "Documentos leídos del almacén por el export.",
+    "idempotencia_total": "Envíos con clave de idempotencia por resultado (nueva, hecho, en_curso, distinta).",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metricas (
+    proceso     TEXT PRIMARY KEY,
+    pid         INTEGER NOT NULL,
+    actualizado REAL NOT NULL,
+    datos       TEXT NOT NULL
+);
+"""
+
+_schema_ready = set()
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+class _Registro:
+    """Métricas de este proceso: {(tipo, nombre, etiquetas): valor}."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.datos = {}
+        self.pid = os.getpid()
+        self.proceso = f"{self.pid}-{uuid.uuid4().hex[:8]}"
+        self.sucio = False
+
+    def contar(self, nombre, valor, etiquetas):
+        clave = ("counter", nombre, etiquetas)
+        with self.lock:
+            self.datos[clave] = self.datos.get(clave, 0) + valor
+            self.sucio = True
+
+    def observar(self, nombre, segundos, etiquetas):
+        clave = ("histogram", nombre, etiquetas)
+        i = bisect.bisect_left(BUCKETS, segundos)
+        with self.lock:
+            h = self.datos.get(clave)
+            if h is None:
+                h = self.datos[clave] = [0] * (len(BUCKETS) + 1) + [0.0, 0]  # buckets, suma, n
+            h[i] += 1
+            h[-2] += segundos
+            h[-1] += 1
+            self.sucio = True
+
+    def foto(self):
+        with self.lock:
+            self.sucio = False
+            return [[t, n, list(e), v if t == "counter" else list(v)] for (t, n, e), v in self.datos.items()]
+
+
+_registro = None
+_registro_lock = threading.Lock()
+
+
+def _actual():
+    """Registro del proceso actual (uno nuevo tras un fork) con su hilo de volcado."""
+    global _registro
+    if _registro is not None and _registro.pid == os.getpid():
+        return _registro
+    with _registro_lock:
+        if _registro is None or _registro.pid != os.getpid():
+            _registro = _Registro()
+            threading.Thread(target=_volcador, args=(_registro,), name="metricas", daemon=True).start()
+    return _registro
+
+
+def _etiquetas(etiquetas):
+    return tuple(sorted((k, str(v)) for k, v in etiquetas.items()))
+
+
+def contar(nombre, valor=1, **etiquetas):
+    """Suma `valor` al contador `nombre` con esas etiquetas."""
+    if METRICAS:
+        _actual().contar(nombre, valor, _etiquetas(etiquetas))
+
+
+def observar(nombre, segundos, **etiquetas):
+    """Registra una duración en el histograma `nombre`."""
+    if METRICAS:
+        _actual().observar(nombre, segundos, _etiquetas(etiquetas))
+
+
+@contextmanager
+def medir(etapa, nombre="etapa_duracion_segundos", **etiquetas):
+    """`with medir("validacion"):` -> observa la duración del bloque (también si falla)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nombre, time.perf_counter() - t0, etapa=etapa, **etiquetas)
+
+
+def cronometrado(etapa):
+    """Decorador: medir(etapa) alrededor de cada llamada a la función."""
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envuelta(*args, **kwargs):
+            with medir(etapa):
+                return fn(*args, **kwargs)
+        return envuelta
+    return decorador
+
+
+class Cronometro:
+    """Vueltas de una función larga: marca(nombre) observa el tiempo desde la marca anterior."""
+
+    def __init__(self, prefijo):
+        self.prefijo = prefijo
+        self._t = time.perf_counter()
+
+    def marca(self, nombre):
+        ahora = time.perf_counter()
+        observar("etapa_duracion_segundos", ahora - self._t, etapa=f"{self.prefijo}.{nombre}")
+        self._t = ahora
+
+
+# -----------------------------
+# Volcado y lectura entre workers
+# -----------------------------
+def volcar(registro=None):
+    """Guarda la foto de este proceso en la base compartida."""
+    registro = registro or _registro
+    if registro is None or registro.pid != os.getpid():
+        return
+    datos = json.dumps(registro.foto())
+    _conn().execute(
+        "INSERT INTO metricas (proceso, pid, actualizado, datos) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (proceso) DO UPDATE SET actualizado = excluded.actualizado, datos = excluded.datos",
+        (registro.proceso, registro.pid, time.time(), datos),
+    )
+
+
+def _volcador(registro):
+    while registro.pid == os.getpid():
+        time.sleep(METRICAS_INTERVALO)
+        if registro.sucio:
+            try:
+                volcar(registro)
+            except Exception as e:
+                print(f"[metricas] No se pudo volcar: {e}")
+
+
+@atexit.register
+def _volcar_al_salir():
+    # scripts (exportar_csv, importar...) dejan sus métricas al terminar
+    if _registro is not None and _registro.sucio:
+        try:
+            volcar(_registro)
+        except Exception:
+            pass
+
+
+def _vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _sumar(total, entradas):
+    for tipo, nombre, etiquetas, valor in entradas:
+        clave = (tipo, nombre, tuple(tuple(e) for e in etiquetas))
+        if tipo == "counter":
+            total[clave] = total.get(clave, 0) + valor
+        else:
+            previo = total.get(clave)
+            total[clave] = list(valor) if previo is None else [a + b for a, b in zip(previo, valor)]
+    return total
+
+
+def _compactar(conn):
+    """Suma las filas de procesos muertos en la fila ACUMULADO (los contadores no retroceden)."""
+    with transaction(conn):
+        rows = conn.execute("SELECT proceso, pid, datos FROM metricas WHERE proceso != ?", (ACUMULADO,)).fetchall()
+        muertos = [r for r in rows if not _vivo(r["pid"])]
+        if not muertos:
+            return
+        fila = conn.execute("SELECT datos FROM metricas WHERE proceso = ?", (ACUMULADO,)).fetchone()
+        total = _sumar({}, json.loads(fila["datos"])) if fila else {}
+        for r in muertos:
+            _sumar(total, json.loads(r["datos"]))
+        datos = json.dumps([[t, n, list(e), v] for (t, n, e), v in total.items()])
+        conn.execute(
+            "INSERT INTO metricas (proceso, pid, actualizado, datos) VALUES (?, 0, ?, ?) "
+            "ON CONFLICT (proceso) DO UPDATE SET actualizado = excluded.actualizado, datos = excluded.datos",
+            (ACUMULADO, time.time(), datos),
+        )
+        conn.executemany("DELETE FROM metricas WHERE proceso = ?", [(r["proceso"],) for r in muertos])
+
+
+def recolectar():
+    """Métricas sumadas de todos los procesos: {(tipo, nombre, etiquetas): valor}."""
+    volcar()
+    conn = _conn()
+    _compactar(conn)
+    total = {}
+    for row in conn.execute("SELECT datos FROM metricas").fetchall():
+        _sumar(total, json.loads(row["datos"]))
+    return total
+
+
+def _formato_etiquetas(etiquetas, extra=()):
+    pares = list(etiquetas) + list(extra)
+    if not pares:
+        return ""
+    escapar = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(v):
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+def prometheus(total=None):
+    """Texto de exposición Prometheus (0.0.4) de recolectar()."""
+    total = recolectar() if total is None else total
+    lineas = []
+    por_nombre = {}
+    for (tipo, nombre, etiquetas), valor in total.items():
+        por_nombre.setdefault((nombre, tipo), []).append((etiquetas, valor))
+    for (nombre, tipo), series in sorted(por_nombre.items()):
+        completo = PREFIJO + nombre
+        if nombre in AYUDA:
+            lineas.append(f"# HELP {completo} {AYUDA[nombre]}")
+        lineas.append(f"# TYPE {completo} {tipo}")
+        for etiquetas, valor in sorted(series):
+            if tipo == "counter":
+                lineas.append(f"{completo}{_formato_etiquetas(etiquetas)} {_numero(valor)}")
+                continue
+            acumulado = 0
+            for limite, n in zip(list(BUCKETS) + ["+Inf"], valor[:-2]):
+                acumulado += n
+                le = limite if limite == "+Inf" else repr(float(limite))
+                lineas.append(f"{completo}_bucket{_formato_etiquetas(etiquetas, [('le', le)])} {acumulado}")
+            lineas.append(f"{completo}_sum{_formato_etiquetas(etiquetas)} {_numero(float(valor[-2]))}")
+            lineas.append(f"{completo}_count{_formato_etiquetas(etiquetas)} {valor[-1]}")
+    return "\n".join(lineas) + "\n"
+
+
+# -----------------------------
+# Perfilado por petición
+# -----------------------------
+class Perfil:
+    """cProfile del hilo actual; texto() con las funciones más costosas (tiempo acumulado)."""
+
+    def __init__(self):
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+    def texto(self, limite=60):
+        self._perfil.disable()
+        out = io.StringIO()
+        pstats.Stats(self._perfil, stream=out).strip_dirs().sort_stats("cumulative").print_stats(limite)
+        return out.getvalue()
@@ -0,0 +1,364 @@
+# Almacén columnar compacto de respuestas, basado en los vocabularios cerrados de utils.
+# Enums simples -> uint8 (código en vocabulario()), multi -> bitmask uint32, edad -> uint8,
+# creado_en -> int64 (epoch en ms). nombre_completo va en un bloque UTF-8 con offsets y los
+# *_otro_texto en una tabla lateral (solo las filas que lo tienen). Si un campo trae más valores
+# distintos de los que caben en su código (CSV viejo o sin validar), el último código queda para
+# DESBORDE y los valores que no caben se cuentan ahí (con un aviso), nunca se descartan filas.
+import os
+import numpy as np
+
+try:
+    from .utils import SIMPLE_ENUMS, MULTI_COLS, OTRO_TEXT_FIELDS, EDAD_BANDAS, vocabulario
+except ImportError:
+    from utils import SIMPLE_ENUMS, MULTI_COLS, OTRO_TEXT_FIELDS, EDAD_BANDAS, vocabulario
+
+SIN_DATO = 255                       # código de enum simple sin valor
+EDAD_NULA = 0                        # edad sin valor
+TS_NULO = np.iinfo(np.int64).min     # creado_en sin valor
+MAX_SIMPLE = 255                     # códigos 0..254
+MAX_MULTI = 32                       # bits de un uint32
+MULTI_DTYPE = np.uint32
+DESBORDE = "(otros)"                 # categoría de los valores que no caben en el código
+TEXTO_CAMPOS = list(OTRO_TEXT_FIELDS.values())
+CHUNK = 100_000
+
+
+def _celda(value):
+    if value is None:
+        return ""
+    value = str(value).strip()
+    return "" if value == "nan" else value
+
+
+def _tokens(value):
+    if isinstance(value, (list, tuple)):
+        return list(dict.fromkeys(v for v in (_celda(x) for x in value) if v))
+    return list(dict.fromkeys(x.strip() for x in _celda(value).split(";") if x.strip()))
+
+
+class _Textos:
+    """Lista de textos en un único bloque de bytes UTF-8 + offsets (sin un objeto str por fila)."""
+
+    def __init__(self):
+        self._blob = bytearray()
+        self._ends = np.zeros(1024, dtype=np.int64)
+        self.n = 0
+
+    def extend(self, textos):
+        datos = [t.encode("utf-8") for t in textos]
+        if self.n + len(datos) > len(self._ends):
+            self._ends = np.resize(self._ends, max(2 * len(self._ends), self.n + len(datos)))
+        largos = np.fromiter((len(d) for d in datos), dtype=np.int64, count=len(datos))
+        self._ends[self.n:self.n + len(datos)] = len(self._blob) + np.cumsum(largos)
+        self._blob += b"".join(datos)
+        self.n += len(datos)
+
+    def extend_arrow(self, arr):
+        """Agrega un StringArray de Arrow copiando sus buffers (sin crear objetos str)."""
+        import pyarrow as pa
+
+        arr = arr.combine_chunks() if isinstance(arr, pa.ChunkedArray) else arr
+        arr = arr.cast(pa.large_string())
+        m = len(arr)
+        if self.n + m > len(self._ends):
+            self._ends = np.resize(self._ends, max(2 * len(self._ends), self.n + m))
+        _, offsets_buf, data_buf = arr.buffers()
+        offsets = np.frombuffer(offsets_buf, dtype=np.int64)[arr.offset:arr.offset + m + 1] if m else np.zeros(1, np.int64)
+        self._ends[self.n:self.n + m] = len(self._blob) + offsets[1:] - offsets[0]
+        if m:
+            self._blob += memoryview(data_buf)[offsets[0]:offsets[-1]]
+        self.n += m
+
+    def __getitem__(self, i):
+        start = self._ends[i - 1] if i > 0 else 0
+        return self._blob[start:self._ends[i]].decode("utf-8")
+
+    def nbytes(self):
+        return len(self._blob) + self._ends.nbytes
+
+
+class RespuestasCompactas:
+    """Respuestas en arrays NumPy; crece por bloques (agregar / extender_dataframe)."""
+
+    def __init__(self, capacidad=1024):
+        self.n = 0
+        self._cap = capacidad
+        self.cats = {campo: vocabulario(campo) for campo in SIMPLE_ENUMS + MULTI_COLS}
+        self._pos = {campo: {v: i for i, v in enumerate(cats)} for campo, cats in self.cats.items()}
+        self._simples = {campo: np.full(capacidad, SIN_DATO, dtype=np.uint8) for campo in SIMPLE_ENUMS}
+        self._multi = {campo: np.zeros(capacidad, dtype=MULTI_DTYPE) for campo in MULTI_COLS}
+        self._edad = np.zeros(capacidad, dtype=np.uint8)
+        self._creado = np.full(capacidad, TS_NULO, dtype=np.int64)
+        self.nombres = _Textos()
+        self.otros = {campo: {} for campo in TEXTO_CAMPOS}
+
+    # -----------------------------
+    # Columnas (vistas de las n filas)
+    # -----------------------------
+    def simple(self, campo):
+        return self._simples[campo][:self.n]
+
+    def multi(self, campo):
+        return self._multi[campo][:self.n]
+
+    @property
+    def edad(self):
+        return self._edad[:self.n]
+
+    @property
+    def creado_en(self):
+        return self._creado[:self.n]
+
+    def bits(self, campo, mask=None):
+        """Matriz uint8 (respuestas x categorías) de un campo multi."""
+        values = self.multi(campo) if mask is None else self.multi(campo)[mask]
+        k = len(self.cats[campo])
+        return ((values[:, None] >> np.arange(k, dtype=MULTI_DTYPE)) & 1).astype(np.uint8)
+
+    def nbytes(self):
+        arrays = [*self._simples.values(), *self._multi.values(), self._edad, self._creado]
+        return sum(a[:self.n].nbytes for a in arrays) + self.nombres.nbytes()
+
+    # -----------------------------
+    # Carga
+    # -----------------------------
+    def _reservar(self, extra):
+        need = self.n + extra
+        if need <= self._cap:
+            return
+        cap = max(2 * self._cap, need)
+        for d, fill in ((self._simples, SIN_DATO), (self._multi, 0)):
+            for campo, arr in d.items():
+                grown = np.full(cap, fill, dtype=arr.dtype)
+                grown[:self.n] = arr[:self.n]
+                d[campo] = grown
+        for name, fill in (("_edad", EDAD_NULA), ("_creado", TS_NULO)):
+            arr = getattr(self, name)
+            grown = np.full(cap, fill, dtype=arr.dtype)
+            grown[:self.n] = arr[:self.n]
+            setattr(self, name, grown)
+        self._cap = cap
+
+    def _codigo(self, campo, valor, limite):
+        """
+        Código de un valor; los desconocidos se agregan al vocabulario mientras quepan (el
+        último de los `limite` códigos se guarda para DESBORDE, donde caen los que no).
+        """
+        pos = self._pos[campo]
+        if valor not in pos:
+            if len(pos) < limite - 1:
+                pos[valor] = len(self.cats[campo])
+                self.cats[campo].append(valor)
+                return pos[valor]
+            if DESBORDE not in pos:
+                print(f"⚠️ {campo}: más de {limite - 1} valores distintos; el resto se cuenta como '{DESBORDE}'")
+                pos[DESBORDE] = len(self.cats[campo])
+                self.cats[campo].append(DESBORDE)
+            return pos[DESBORDE]
+        return pos[valor]
+
+    def agregar(self, respuesta):
+        """Agrega una respuesta (payload validado o fila CSV). Retorna su índice."""
+        self._reservar(1)
+        i = self.n
+        for campo in SIMPLE_ENUMS:
+            valor = _celda(respuesta.get(campo))
+            code = self._codigo(campo, valor, MAX_SIMPLE - 1) if valor else None
+            self._simples[campo][i] = SIN_DATO if code is None else code
+        for campo in MULTI_COLS:
+            mask = 0
+            for valor in _tokens(respuesta.get(campo)):
+                mask |= 1 << self._codigo(campo, valor, MAX_MULTI)
+            self._multi[campo][i] = mask
+        try:
+            edad = float(respuesta.get("edad"))
+        except (TypeError, ValueError):
+            edad = 0.0
+        # solo edades enteras (20.7 no es una edad válida, no se trunca)
+        self._edad[i] = int(edad) if edad.is_integer() and 0 < edad < 256 else EDAD_NULA
+        self._creado[i] = _epoch_ms(respuesta.get("creado_en"))
+        self.nombres.extend([_celda(respuesta.get("nombre_completo"))])
+        for campo in TEXTO_CAMPOS:
+            texto = _celda(respuesta.get(campo))
+            if texto:
+                self.otros[campo][i] = texto
+        self.n += 1
+        return i
+
+    def extender_dataframe(self, df, nombres=None):
+        """
+        Agrega un bloque de filas (DataFrame con el layout de respuestas_ia.csv; texto o
+        categóricos). `nombres`: nombre_completo como StringArray de Arrow, si ya se tiene.
+        """
+        import pandas as pd
+
+        m = len(df)
+        if not m:
+            return
+        self._reservar(m)
+        i0, i1 = self.n, self.n + m
+        for campo in SIMPLE_ENUMS:
+            if campo not in df.columns:
+                continue
+            codes, uniques = _factorizar(df[campo])
+            table = np.full(len(uniques) + 1, SIN_DATO, dtype=np.uint8)  # último = nulo (código -1)
+            for k, valor in enumerate(uniques):
+                valor = _celda(valor)
+                code = self._codigo(campo, valor, MAX_SIMPLE - 1) if valor else None
+                table[k] = SIN_DATO if code is None else code
+            self._simples[campo][i0:i1] = table[codes]
+        for campo in MULTI_COLS:
+            if campo not in df.columns:
+                continue
+            # solo se parsean las combinaciones distintas ("chatgpt;copilot", ...): son pocas
+            codes, uniques = _factorizar(df[campo])
+            table = np.zeros(len(uniques) + 1, dtype=MULTI_DTYPE)  # último = celda vacía (código -1)
+            for k, celda in enumerate(uniques):
+                mask = 0
+                for valor in _tokens(celda):
+                    mask |= 1 << self._codigo(campo, valor, MAX_MULTI)
+                table[k] = mask
+            self._multi[campo][i0:i1] = table[codes]
+        if "edad" in df.columns:
+            edad = pd.to_numeric(df["edad"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            valida = (edad > 0) & (edad < 256) & (edad == np.floor(edad))  # NaN: False
+            self._edad[i0:i1] = np.where(valida, edad, EDAD_NULA).astype(np.uint8)
+        if "creado_en" in df.columns:
+            ts = df["creado_en"]
+            if not isinstance(ts.dtype, pd.DatetimeTZDtype):
+                ts = pd.to_datetime(ts, errors="coerce", utc=True, format="ISO8601")
+            self._creado[i0:i1] = ts.dt.tz_convert(None).dt.as_unit("ms").to_numpy().view(np.int64)  # NaT -> TS_NULO
+        if nombres is not None:
+            self.nombres.extend_arrow(nombres)
+        elif "nombre_completo" in df.columns:
+            self.nombres.extend(df["nombre_completo"].fillna("").astype(str).str.strip())
+        else:
+            self.nombres.extend([""] * m)
+        for campo in TEXTO_CAMPOS:
+            if campo in df.columns:
+                valores = df[campo].fillna("").astype(str).str.strip().to_numpy(dtype=object)
+                filas = np.flatnonzero(valores != "")
+                self.otros[campo].update(zip((i0 + filas).tolist(), valores[filas].tolist()))
+        self.n = i1
+
+    @classmethod
+    def desde_csv(cls, path, chunksize=CHUNK, encoding="utf-8-sig"):
+        """Carga respuestas_ia.csv por bloques (nunca todo el texto en memoria a la vez)."""
+        import pandas as pd
+
+        store = cls()
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return store
+        reader = pd.read_csv(path, encoding=encoding, dtype=str, keep_default_na=False, chunksize=chunksize)
+        for chunk in reader:
+            store.extender_dataframe(chunk)
+        return store
+
+    @classmethod
+    def desde_parquet(cls, path, grupos=None):
+        """
+        Carga respuestas_ia.parquet (memory map); los categóricos se traducen por categoría.
+        `grupos`: solo esos row groups (EDA por bloques).
+        """
+        import pyarrow.parquet as pq
+
+        store = cls()
+        archivo = pq.ParquetFile(path, memory_map=True)
+        for i in range(archivo.num_row_groups) if grupos is None else grupos:
+            table = archivo.read_row_group(i)
+            nombres = None
+            if "nombre_completo" in table.column_names:
+                # el Parquet se escribe ya recortado (columnar._tabla_respuestas)
+                nombres = table.column("nombre_completo").fill_null("")
+                table = table.drop_columns(["nombre_completo"])
+            store.extender_dataframe(table.to_pandas(), nombres=nombres)
+        return store
+
+    # -----------------------------
+    # Consultas
+    # -----------------------------
+    def filtrar(self, edad_min=None, edad_max=None, desde=None, hasta=None, **campos):
+        """
+        Máscara booleana de las respuestas que cumplen todos los filtros.
+        campos: facultad="ingenierias" o carrera=[...] (cualquiera de los valores); en campos
+        multi, herramientas=["copilot"] = marcó al menos uno. desde/hasta: ISO o epoch ms.
+        """
+        mask = np.ones(self.n, dtype=bool)
+        for campo, valores in campos.items():
+            if valores is None:
+                continue
+            valores = [valores] if isinstance(valores, str) else list(valores)
+            if campo in self._simples:
+                codes = [self._pos[campo][v] for v in valores if v in self._pos[campo]]
+                mask &= np.isin(self.simple(campo), np.array(codes, dtype=np.uint8))
+            elif campo in self._multi:
+                bits = 0
+                for v in valores:
+                    if v in self._pos[campo]:
+                        bits |= 1 << self._pos[campo][v]
+                mask &= (self.multi(campo) & MULTI_DTYPE(bits)) != 0
+            else:
+                raise KeyError(f"Campo desconocido: {campo}")
+        if edad_min is not None:
+            mask &= (self.edad != EDAD_NULA) & (self.edad >= edad_min)
+        if edad_max is not None:
+            mask &= (self.edad != EDAD_NULA) & (self.edad <= edad_max)
+        if desde is not None:
+            mask &= (self.creado_en != TS_NULO) & (self.creado_en >= _epoch_ms(desde))
+        if hasta is not None:
+            mask &= (self.creado_en != TS_NULO) & (self.creado_en < _epoch_ms(hasta))
+        return mask
+
+    def edad_banda(self):
+        """Código de banda (índice en EDAD_BANDAS) por respuesta; -1 sin edad o fuera de rango."""
+        cortes = np.array([desde for desde, _, _ in EDAD_BANDAS] + [EDAD_BANDAS[-1][1] + 1])
+        edad = self.edad.astype(np.int64)
+        codes = np.searchsorted(cortes, edad, side="right") - 1
+        fuera = (edad == EDAD_NULA) | (codes < 0) | (codes >= len(EDAD_BANDAS))
+        return np.where(fuera, -1, codes)
+
+    def a_dataframe(self, mask=None):
+        """Decodifica a un DataFrame (enums como categóricos, creado_en con zona UTC)."""
+        import pandas as pd
+
+        idx = np.arange(self.n) if mask is None else np.flatnonzero(mask)
+        data = {"creado_en": pd.to_datetime(
+            np.where(self.creado_en[idx] == TS_NULO, np.iinfo(np.int64).min, self.creado_en[idx]),
+            unit="ms", utc=True, errors="coerce")}
+        data["nombre_completo"] = [self.nombres[i] for i in idx]
+        data["edad"] = pd.array(np.where(self.edad[idx] == EDAD_NULA, 0, self.edad[idx]), dtype="UInt8")
+        data["edad"][self.edad[idx] == EDAD_NULA] = pd.NA
+        for campo in SIMPLE_ENUMS:
+            codes = self.simple(campo)[idx].astype(np.int64)
+            codes[codes == SIN_DATO] = -1
+            data[campo] = pd.Categorical.from_codes(codes, categories=self.cats[campo])
+        for campo in MULTI_COLS:
+            cats = self.cats[campo]
+            data[campo] = [";".join(c for k, c in enumerate(cats) if m >> k & 1) for m in self.multi(campo)[idx]]
+        for campo in TEXTO_CAMPOS:
+            data[campo] = [self.otros[campo].get(int(i), "") for i in idx]
+        return pd.DataFrame(data)
+
+
+def _factorizar(serie):
+    """(códigos, valores distintos) de una columna; los categóricos ya vienen factorizados."""
+    import pandas as pd
+
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), list(serie.cat.categories)
+    return pd.factorize(serie, sort=False)
+
+
+def _epoch_ms(value):
+    """Timestamp ISO (o epoch ms) -> epoch ms; TS_NULO si no se puede interpretar."""
+    from datetime import datetime, timezone
+
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    try:
+        ts = datetime.fromisoformat(_celda(value))
+    except ValueError:
+        return TS_NULO
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
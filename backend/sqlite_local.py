@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import threading
+
+BASE_DIR = os.path.dirname(__file__)
+# Base SQLite local del backend (cola de escritura, contadores...). Compartida entre workers.
+LOCAL_DB_PATH = os.getenv("LOCAL_DB_PATH", os.path.join(BASE_DIR, "datos_locales.sqlite3"))
+
+_local = threading.local()
+
+
+def connect(path=None, synchronous="FULL"):
+    """
+    Conexión SQLite por hilo (y por proceso) en modo WAL: lectores y un escritor no se
+    bloquean entre sí y varios workers pueden usar el mismo archivo.
+    `synchronous` aplica al abrir la conexión (NORMAL: sin fsync por commit, ver almacen.py).
+    """
+    path = path or LOCAL_DB_PATH
+    key = (path, os.getpid())
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(key)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=10, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={synchronous}")
+        conn.execute("PRAGMA busy_timeout=10000")
+        conns[key] = conn
+    return conn
+
+
+class transaction:
+    """`with transaction(conn):` -> BEGIN IMMEDIATE ... COMMIT/ROLLBACK."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
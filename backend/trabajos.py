@@ -0,0 +1,182 @@
+# Trabajos en segundo plano con una sola ejecución a la vez por tipo (single-flight).
+# El registro vive en la base SQLite local, compartida entre workers: quien pide un trabajo
+# que ya está pendiente/corriendo (en cualquier worker) recibe el id de ese mismo trabajo.
+# Un lock de archivo (fcntl) garantiza además que dos procesos nunca ejecuten a la vez.
+# Cada trabajo guarda el pid y el arranque de su proceso: un pid reutilizado por otro proceso
+# no lo mantiene "vivo".
+import os
+import json
+import time
+import uuid
+import threading
+import traceback
+
+try:
+    import fcntl
+except ImportError:  # Windows: queda solo la deduplicación por la base
+    fcntl = None
+
+try:
+    from .sqlite_local import connect, transaction
+except ImportError:
+    from sqlite_local import connect, transaction
+
+BASE_DIR = os.path.dirname(__file__)
+LOCK_DIR = BASE_DIR
+# Trabajos terminados que se conservan por tipo (para consultar su estado)
+HISTORIAL = 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id      TEXT PRIMARY KEY,
+    tipo    TEXT NOT NULL,
+    estado  TEXT NOT NULL,             -- pendiente | corriendo | terminado | error
+    pid     INTEGER NOT NULL,
+    arranque TEXT,                     -- boot id + inicio del proceso (ver _arranque)
+    creado  REAL NOT NULL,
+    inicio  REAL,
+    fin     REAL,
+    etapas  TEXT NOT NULL DEFAULT '[]',
+    error   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_tipo ON trabajos (tipo, estado);
+"""
+ACTIVOS = ("pendiente", "corriendo")
+
+_schema_ready = set()
+
+
+def _conn():
+    conn = connect()
+    if os.getpid() not in _schema_ready:
+        conn.executescript(SCHEMA)
+        _schema_ready.add(os.getpid())
+    return conn
+
+
+def _arranque(pid):
+    """
+    "boot_id:inicio" del proceso `pid` (inicio en ticks desde el arranque del sistema, campo 22
+    de /proc/<pid>/stat). None si el proceso no existe o no hay /proc (fuera de Linux).
+    """
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            campos = f.read().rsplit(b")", 1)[1].split()  # el nombre del proceso puede tener espacios
+        with open("/proc/sys/kernel/random/boot_id", encoding="ascii") as f:
+            return f"{f.read().strip()}:{int(campos[19])}"
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+def _vivo(pid, arranque=None):
+    """True si el proceso que registró el trabajo sigue vivo (y no es otro con el mismo pid)."""
+    if arranque is not None:
+        return _arranque(pid) == arranque
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _a_dict(row):
+    if row is None:
+        return None
+    d = dict(row)
+    d["etapas"] = json.loads(d["etapas"])
+    hechas = sum(1 for e in d["etapas"] if e["estado"] == "terminado")
+    d["progreso"] = round(hechas / len(d["etapas"]), 2) if d["etapas"] else 0.0
+    fin = d["fin"] or time.time()
+    d["segundos"] = round(fin - d["inicio"], 3) if d["inicio"] else None
+    return d
+
+
+def estado(job_id):
+    """Registro del trabajo (con progreso 0..1 y duración) o None si no existe."""
+    return _a_dict(_conn().execute("SELECT * FROM trabajos WHERE id = ?", (job_id,)).fetchone())
+
+
+def ultimo(tipo):
+    """Registro más reciente de `tipo` (o None)."""
+    return _a_dict(_conn().execute(
+        "SELECT * FROM trabajos WHERE tipo = ? ORDER BY creado DESC LIMIT 1", (tipo,)
+    ).fetchone())
+
+
+def _guardar(job_id, **campos):
+    if "etapas" in campos:
+        campos["etapas"] = json.dumps(campos["etapas"], ensure_ascii=False)
+    sets = ", ".join(f"{k} = ?" for k in campos)
+    _conn().execute(f"UPDATE trabajos SET {sets} WHERE id = ?", (*campos.values(), job_id))
+
+
+def _lock_path(tipo):
+    return os.path.join(LOCK_DIR, f".{tipo}.lock")
+
+
+def _ejecutar(job_id, tipo, etapas):
+    """Corre las etapas en orden bajo el lock de archivo, registrando tiempos por etapa."""
+    registro = [{"nombre": nombre, "estado": "pendiente", "segundos": None} for nombre, _ in etapas]
+    with open(_lock_path(tipo), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # espera si otro proceso aún corre uno anterior
+        try:
+            _guardar(job_id, estado="corriendo", inicio=time.time(), etapas=registro)
+            for paso, (nombre, fn) in zip(registro, etapas):
+                paso["estado"] = "corriendo"
+                _guardar(job_id, etapas=registro)
+                t0 = time.perf_counter()
+                try:
+                    fn()
+                except SystemExit as e:  # los scripts terminan con sys.exit(0) si no hay datos
+                    if e.code not in (0, None):
+                        raise RuntimeError(f"{nombre} terminó con código {e.code}")
+                paso.update(estado="terminado", segundos=round(time.perf_counter() - t0, 3))
+                _guardar(job_id, etapas=registro)
+            _guardar(job_id, estado="terminado", fin=time.time())
+            print(f"[trabajos] {tipo} {job_id} terminado")
+        except Exception as e:
+            for paso in registro:
+                if paso["estado"] == "corriendo":
+                    paso["estado"] = "error"
+            _guardar(job_id, estado="error", fin=time.time(), etapas=registro, error=str(e))
+            print(f"[trabajos] {tipo} {job_id} falló: {e}")
+            traceback.print_exc()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def iniciar(tipo, etapas):
+    """
+    Lanza `etapas` ([(nombre, callable)]) como trabajo `tipo` en un hilo de este proceso, o se
+    une al que ya esté en curso. Retorna (registro, nuevo).
+    """
+    with transaction(_conn()) as conn:
+        for row in conn.execute(
+            "SELECT id, pid, arranque FROM trabajos WHERE tipo = ? AND estado IN (?, ?) ORDER BY creado",
+            (tipo, *ACTIVOS),
+        ).fetchall():
+            if _vivo(row["pid"], row["arranque"]):
+                return estado(row["id"]), False
+            # el proceso que lo corría murió (reinicio/timeout del worker)
+            conn.execute(
+                "UPDATE trabajos SET estado = 'error', fin = ?, error = 'interrumpido' WHERE id = ?",
+                (time.time(), row["id"]),
+            )
+        job_id = uuid.uuid4().hex
+        registro = [{"nombre": nombre, "estado": "pendiente", "segundos": None} for nombre, _ in etapas]
+        conn.execute(
+            "INSERT INTO trabajos (id, tipo, estado, pid, arranque, creado, etapas) "
+            "VALUES (?, ?, 'pendiente', ?, ?, ?, ?)",
+            (job_id, tipo, os.getpid(), _arranque(os.getpid()), time.time(), json.dumps(registro)),
+        )
+        conn.execute(
+            "DELETE FROM trabajos WHERE tipo = ? AND estado NOT IN (?, ?) AND id NOT IN "
+            "(SELECT id FROM trabajos WHERE tipo = ? ORDER BY creado DESC LIMIT ?)",
+            (tipo, *ACTIVOS, tipo, HISTORIAL),
+        )
+    threading.Thread(target=_ejecutar, args=(job_id, tipo, etapas), name=f"trabajo-{tipo}", daemon=True).start()
+    return estado(job_id), True
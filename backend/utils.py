@@ -1,3 +1,6 @@
+import os
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime, timezone
 
 # -----------------------------
@@ -90,106 +93,204 @@ OTRO_TEXT_FIELDS = {
     "carrera": "carrera_otro_texto",
 }
 
+# Campos multi (exportados como "a;b;c" en respuestas_ia.csv)
+MULTI_COLS = ["usos", "herramientas", "sectores"]
+
+# Enums simples
+SIMPLE_ENUMS = [
+    "familiaridad", "definicion", "frecuencia", "confianza",
+    "percepcion_social", "regulacion", "emocion",
+    "facultad", "carrera"
+]
+
+# Orden para Likert (útil para ordenar resultados)
+LIKERT_ORDERS = {
+    "familiaridad": ["nada", "poco", "algo", "bastante", "muy"],
+    "confianza":    ["nada", "poca", "regular", "bastante", "total"],
+    "percepcion_social": ["muy_negativo", "negativo", "neutro", "positivo", "muy_positivo"],
+    "frecuencia": ["nunca", "mensual", "semanal", "varios_dias_semana", "diaria"],
+    "regulacion": ["estricta", "flexible", "libre", "nsnc"],
+    "emocion": ["curiosidad", "entusiasmo", "indiferencia", "inquietud", "miedo"],
+}
+
+# Bandas de edad (campo derivado "edad_banda", usable en los cruces): (desde, hasta, etiqueta)
+EDAD_BANDAS = [
+    (15, 17, "15-17"),
+    (18, 20, "18-20"),
+    (21, 24, "21-24"),
+    (25, 29, "25-29"),
+    (30, 39, "30-39"),
+    (40, 99, "40+"),
+]
+
+# Cruces del EDA: pares o tríos de campos de SIMPLE_ENUMS, MULTI_COLS o "edad_banda".
+# Con campos multi se cuentan co-ocurrencias. Cada cruce se publica como cross_<a>_<b>[_<c>].
+CRUCES = [
+    ("facultad", "familiaridad"),
+    ("facultad", "confianza"),
+    ("carrera", "confianza"),
+    ("edad_banda", "frecuencia"),
+    ("herramientas", "usos"),
+    ("facultad", "frecuencia", "confianza"),
+]
+
 # -----------------------------
 # Utilidades
 # -----------------------------
 def now_iso_utc() -> str:
     return datetime.now(timezone.utc).isoformat()
 
-def _is_non_empty_string(value):
-    return isinstance(value, str) and value.strip() != ""
+def vocabulario(campo):
+    """Categorías conocidas de un campo en orden estable (orden Likert si lo tiene)."""
+    if campo == "edad_banda":
+        return [label for _, _, label in EDAD_BANDAS]
+    return list(LIKERT_ORDERS.get(campo) or sorted(ENUMS.get(campo, ())))
 
-def validate_payload(payload: dict):
+def edad_banda(edad):
+    """Etiqueta de EDAD_BANDAS para una edad numérica (None si no cae en ninguna)."""
+    for desde, hasta, label in EDAD_BANDAS:
+        if desde <= edad < hasta + 1:
+            return label
+    return None
+
+@contextmanager
+def atomic_write(path, mode="w", encoding="utf-8", newline=""):
     """
-    Valida y 'limpia' el payload entrante.
-    Retorna (ok: bool, data_or_errors: dict)
+    Escribe en un temporal del mismo directorio y lo renombra sobre `path` al terminar,
+    así quien lea el archivo nunca ve una versión a medio escribir.
     """
+    if "b" in mode:
+        encoding = newline = None
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode, encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+# -----------------------------
+# Validador
+# -----------------------------
+# validate_payload() recorre especificaciones armadas una sola vez al importar a partir de
+# ENUMS, ARRAY_FIELDS y OTRO_TEXT_FIELDS: tuplas (campo, frozenset de opciones) en un orden
+# fijo (el de ENUMS), así los errores salen siempre en el mismo orden sin depender del hash de
+# los strings. Mismos mensajes de error que la versión original (ver benchmarks/validacion.py).
+REQUIRED_ENUMS = (
+    "facultad", "carrera",
+    "familiaridad", "definicion", "frecuencia", "confianza",
+    "percepcion_social", "regulacion", "emocion",
+)
+OPTIONAL_FIELDS = ("respondente_id", "origen", "version_app", "idioma", "consentimiento")
+
+_OTRO = frozenset({"otro", "otra"})
+_ENUM_SPECS = tuple((field, frozenset(ENUMS[field])) for field in REQUIRED_ENUMS)
+_ARRAY_SPECS = tuple((field, frozenset(opciones)) for field, opciones in ENUMS.items() if field in ARRAY_FIELDS)
+# (campo base, campo de texto, base es arreglo, mensaje si falta el texto)
+_OTRO_SPECS = tuple(
+    (base, text, True, "Requerido cuando se elige 'otra/otro'.") if base in ARRAY_FIELDS
+    else (base, text, False, "Requerido cuando se elige 'otro/otra'.")
+    for base, text in OTRO_TEXT_FIELDS.items()
+    if base in ARRAY_FIELDS or base in REQUIRED_ENUMS
+)
+
+
+def _en(valor, permitidos):
+    try:
+        return valor in permitidos
+    except TypeError:  # valor no hashable (lista, dict...): nunca es una opción válida
+        return False
+
+
+def _validar(payload, creado_en):
     errors = {}
     data = {}
+    get = payload.get
 
-    # --- Requeridos NO enum ---
     # nombre_completo (1–120 chars)
-    nc = payload.get("nombre_completo")
-    if not _is_non_empty_string(nc) or len(nc.strip()) > 120:
+    v = get("nombre_completo")
+    v = v.strip() if isinstance(v, str) else ""
+    if not v or len(v) > 120:
         errors["nombre_completo"] = "Requerido (1–120 caracteres)."
     else:
-        data["nombre_completo"] = nc.strip()
+        data["nombre_completo"] = v
 
     # edad (15–99)
-    edad = payload.get("edad")
-    if not isinstance(edad, int) or not (15 <= edad <= 99):
+    v = get("edad")
+    if not isinstance(v, int) or not (15 <= v <= 99):
         errors["edad"] = "Debe ser un entero entre 15 y 99."
     else:
-        data["edad"] = edad
+        data["edad"] = v
 
-    # --- Requeridos enum (una sola opción) ---
-    required_enums = [
-        "facultad", "carrera",
-        "familiaridad", "definicion", "frecuencia", "confianza",
-        "percepcion_social", "regulacion", "emocion",
-    ]
-    for field in required_enums:
-        val = payload.get(field)
-        if val is None:
+    # Requeridos enum (una sola opción)
+    for field, opciones in _ENUM_SPECS:
+        v = get(field)
+        if isinstance(v, str) and v in opciones:
+            data[field] = v
+        elif v is None:
             errors[field] = "Campo requerido."
-        elif val not in ENUMS[field]:
-            errors[field] = f"Valor inválido: {val}"
+        elif _en(v, opciones):  # str con hash propio (subclases); igual que el original
+            data[field] = v
         else:
-            data[field] = val
+            errors[field] = f"Valor inválido: {v}"
 
-    # --- Requeridos (array) ---
-    for field in ARRAY_FIELDS:
-        arr = payload.get(field)
-        if not isinstance(arr, list):
+    # Requeridos (array)
+    for field, opciones in _ARRAY_SPECS:
+        v = get(field)
+        if not isinstance(v, list):
             errors[field] = "Debe ser un arreglo (lista)."
             continue
-        invalids = [v for v in arr if v not in ENUMS[field]]
-        if invalids:
-            errors[field] = f"Valores inválidos: {invalids}"
+        try:
+            valido = opciones.issuperset(v)
+        except TypeError:
+            valido = False
+        if valido:
+            data[field] = list(dict.fromkeys(v))  # sin duplicados, conservando el orden
         else:
-            # Elimina duplicados conservando orden
-            seen = set()
-            cleaned = []
-            for v in arr:
-                if v not in seen:
-                    cleaned.append(v)
-                    seen.add(v)
-            data[field] = cleaned
-
-    # --- Campos opcionales de metadatos (si los envías y existen en tu colección) ---
-    for opt in ["respondente_id", "origen", "version_app", "idioma", "consentimiento"]:
+            errors[field] = f"Valores inválidos: {[x for x in v if not _en(x, opciones)]}"
+
+    # Opcionales de metadatos
+    for opt in OPTIONAL_FIELDS:
         if opt in payload:
-            data[opt] = payload.get(opt)
-
-    # --- Campos "otro_texto" (solo si corresponde) ---
-    for base_field, text_field in OTRO_TEXT_FIELDS.items():
-        text_val = payload.get(text_field)
-
-        # enum simple
-        if base_field in required_enums:
-            if data.get(base_field) in {"otro", "otra"}:
-                if not _is_non_empty_string(text_val):
-                    errors[text_field] = "Requerido cuando se elige 'otro/otra'."
-                else:
-                    data[text_field] = text_val.strip()[:120]
-            else:
-                if _is_non_empty_string(text_val):
-                    data[text_field] = text_val.strip()[:120]
-
-        # arrays
-        elif base_field in ARRAY_FIELDS:
-            chosen = data.get(base_field, [])
-            if "otra" in chosen or "otro" in chosen:
-                if not _is_non_empty_string(text_val):
-                    errors[text_field] = "Requerido cuando se elige 'otra/otro'."
-                else:
-                    data[text_field] = text_val.strip()[:120]
-            else:
-                if _is_non_empty_string(text_val):
-                    data[text_field] = text_val.strip()[:120]
-
-    # --- Timestamp controlado por backend ---
-    data["creado_en"] = now_iso_utc()
-
-    ok = len(errors) == 0
-    return (ok, data if ok else errors)
+            data[opt] = get(opt)
+
+    # Textos "otro" (solo si corresponde)
+    for base, text, es_arreglo, mensaje in _OTRO_SPECS:
+        v = get(text)
+        v = v.strip() if isinstance(v, str) else ""
+        if v:
+            data[text] = v[:120]
+        elif (not _OTRO.isdisjoint(data.get(base, ()))) if es_arreglo else data.get(base) in _OTRO:
+            errors[text] = mensaje
+
+    data["creado_en"] = creado_en
+    if errors:
+        return (False, errors)
+    return (True, data)
+
+
+def validate_payload(payload: dict):
+    """
+    Valida y 'limpia' el payload entrante.
+    Retorna (ok: bool, data_or_errors: dict)
+    """
+    return _validar(payload, now_iso_utc())
+
+
+def validate_many(payloads):
+    """
+    Valida un lote de payloads (importaciones masivas). Retorna una lista de
+    (ok, data_or_errors) en el mismo orden; todo el lote comparte el creado_en.
+    """
+    creado_en = now_iso_utc()
+    return [
+        _validar(p, creado_en) if isinstance(p, dict) else (False, {"_": "Se esperaba un objeto JSON."})
+        for p in payloads
+    ]
@@ -0,0 +1,207 @@
+# Appwrite falso para los benchmarks (sin red): servidor HTTP local con las rutas de documentos
+# que usa el backend (create_document, create/upsert_documents y list_documents con
+# limit / cursorAfter / orderAsc / orderDesc / greaterThanEqual / lessThan sobre $createdAt
+# o $updatedAt) y latencia configurable por petición.
+#
+# La colección tiene n documentos sintéticos que se generan al pedirlos (sintetico.respuesta_i),
+# así 1M de documentos no ocupan memoria, más los que se creen por la API.
+#
+#   python benchmarks/appwrite_falso.py [--puerto 0] [--docs N] [--latencia-ms 20]
+# Imprime la URL base (APPWRITE_ENDPOINT) en la primera línea y atiende hasta que lo maten.
+import os
+import sys
+import json
+import time
+import uuid
+import bisect
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qsl
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import sintetico  # noqa: E402
+
+PASO_MS = 1000
+
+
+def _iso(ms):
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).isoformat(timespec="milliseconds")
+
+
+def _ms(iso):
+    ts = datetime.fromisoformat(iso)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return int(ts.timestamp() * 1000)
+
+
+class Coleccion:
+    """Documentos ordenados por $createdAt (= $updatedAt): n sintéticos + los creados por la API."""
+
+    def __init__(self, n=0, semilla=1):
+        self.n = n
+        self.semilla = semilla
+        # los sintéticos terminan una hora antes de arrancar: los nuevos siempre quedan después
+        self.inicio_ms = int(time.time() * 1000) - n * PASO_MS - 3600 * 1000
+        self._lock = threading.Lock()
+        self._creados = []          # documentos creados por la API, en orden de creación
+        self._creados_ms = []
+        self._indice = {}           # $id -> posición global
+
+    def __len__(self):
+        return self.n + len(self._creados)
+
+    def _ms_de(self, i):
+        return self.inicio_ms + i * PASO_MS if i < self.n else self._creados_ms[i - self.n]
+
+    def documento(self, i):
+        if i >= self.n:
+            return self._creados[i - self.n]
+        creado = _iso(self._ms_de(i))
+        doc = sintetico.respuesta_i(i, self.semilla, creado)
+        doc.update({"$id": f"s{i:012d}", "$createdAt": creado, "$updatedAt": creado})
+        return doc
+
+    def posicion(self, doc_id):
+        if doc_id.startswith("s") and doc_id[1:].isdigit() and int(doc_id[1:]) < self.n:
+            return int(doc_id[1:])
+        return self._indice.get(doc_id)
+
+    def primer_indice(self, ms):
+        """Primer índice con $createdAt >= ms."""
+        if ms <= self.inicio_ms:
+            return 0
+        if ms <= self.inicio_ms + (self.n - 1) * PASO_MS:
+            return -(-(ms - self.inicio_ms) // PASO_MS)
+        return self.n + bisect.bisect_left(self._creados_ms, ms)
+
+    def crear(self, doc_id, data, upsert=False):
+        """Retorna (documento, status) con 409 si el $id ya existe (salvo upsert)."""
+        with self._lock:
+            if doc_id in ("unique()", "", None):
+                doc_id = uuid.uuid4().hex[:20]
+            pos = self.posicion(doc_id)
+            if pos is not None:
+                if not upsert:
+                    return {"message": "Document already exists", "code": 409,
+                            "type": "document_already_exists"}, 409
+                if pos >= self.n:
+                    self._creados[pos - self.n].update(data)
+                    return self._creados[pos - self.n], 200
+            ms = max(int(time.time() * 1000), self._creados_ms[-1] + 1 if self._creados_ms else 0)
+            creado = _iso(ms)
+            doc = {**data, "$id": doc_id, "$createdAt": creado, "$updatedAt": creado}
+            self._indice[doc_id] = len(self)
+            self._creados.append(doc)
+            self._creados_ms.append(ms)
+            return doc, 201
+
+    def listar(self, queries):
+        lo, hi, limite, desc, cursor = 0, len(self), 25, False, None
+        for q in queries:
+            metodo, valores = q.get("method"), q.get("values") or []
+            if metodo == "limit":
+                limite = int(valores[0])
+            elif metodo == "orderDesc":
+                desc = True
+            elif metodo == "cursorAfter":
+                cursor = valores[0]
+            elif metodo == "greaterThanEqual":
+                lo = max(lo, self.primer_indice(_ms(valores[0])))
+            elif metodo == "lessThan":
+                hi = min(hi, self.primer_indice(_ms(valores[0])))
+        if cursor is not None:
+            pos = self.posicion(cursor)
+            if pos is None:
+                return {"message": f"Document with the requested ID '{cursor}' could not be found.",
+                        "code": 400, "type": "general_cursor_not_found"}, 400
+            if desc:
+                hi = min(hi, pos)
+            else:
+                lo = max(lo, pos + 1)
+        total = max(0, hi - lo)
+        rango = range(hi - 1, max(lo, hi - limite) - 1, -1) if desc else range(lo, min(hi, lo + limite))
+        return {"total": total, "documents": [self.documento(i) for i in rango]}, 200
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: el pool del cliente reutiliza conexiones
+    # encabezados y cuerpo salen en dos escrituras: sin esto Nagle + ACK diferido suman ~40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, cuerpo, status=200):
+        datos = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _ruta_documentos(self):
+        partes = urlsplit(self.path).path.rstrip("/").split("/")
+        return partes[-1] == "documents" and "collections" in partes
+
+    def _cuerpo(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(largo) or b"{}")
+
+    def _latencia(self):
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+    def do_GET(self):
+        self._latencia()
+        if not self._ruta_documentos():
+            return self._responder({"message": "Not found", "code": 404}, 404)
+        queries = [json.loads(v) for k, v in parse_qsl(urlsplit(self.path).query) if k.startswith("queries")]
+        self._responder(*self.server.coleccion.listar(queries))
+
+    def _escribir(self, upsert):
+        self._latencia()
+        if not self._ruta_documentos():
+            return self._responder({"message": "Not found", "code": 404}, 404)
+        cuerpo = self._cuerpo()
+        coleccion = self.server.coleccion
+        if "documents" in cuerpo:  # create_documents / upsert_documents
+            docs = [coleccion.crear(d.pop("$id", "unique()"), d, upsert)[0] for d in cuerpo["documents"]]
+            return self._responder({"total": len(docs), "documents": docs}, 201)
+        self._responder(*coleccion.crear(cuerpo.get("documentId"), cuerpo.get("data") or {}, upsert))
+
+    def do_POST(self):
+        self._escribir(upsert=False)
+
+    def do_PUT(self):
+        self._escribir(upsert=True)
+
+
+def servidor(n=0, latencia_ms=0.0, puerto=0, semilla=1):
+    """ThreadingHTTPServer listo para serve_forever(); la URL base queda en .url."""
+    srv = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+    srv.daemon_threads = True
+    srv.coleccion = Coleccion(n, semilla)
+    srv.latencia = latencia_ms / 1000
+    srv.url = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    return srv
+
+
+def _opcion(args, nombre, tipo, defecto):
+    return tipo(args[args.index(nombre) + 1]) if nombre in args else defecto
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    srv = servidor(
+        n=_opcion(args, "--docs", int, 0),
+        latencia_ms=_opcion(args, "--latencia-ms", float, 0.0),
+        puerto=_opcion(args, "--puerto", int, 0),
+    )
+    print(srv.url, flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,436 @@
+# Suite de benchmarks sin red: todo corre contra el Appwrite falso (appwrite_falso.py) con
+# datos sintéticos (sintetico.py), en un directorio temporal (no toca los CSV ni la base local
+# del backend). Cada caso pesado corre en su propio proceso para medir también su pico de memoria.
+#
+#   python benchmarks/correr.py [--suites validacion,api,exportar,analisis,consultas]
+#       [--tamanos 1000,100000,1000000] [--latencia-ms 20] [--concurrencia 1,8,32]
+#       [--peticiones 2000] [--almacen appwrite|sqlite] [--salida reporte.json]
+#       [--comparar base.json] [--umbral 0.10]
+#
+# El reporte JSON (por defecto benchmarks/resultados/<fecha>_<commit>.json) guarda una fila por
+# caso con `segundos` (menor es mejor). Con --comparar se contrasta contra un reporte anterior
+# y se termina con código 1 si algún caso empeoró más que el umbral.
+import os
+import io
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import platform
+import tempfile
+import warnings
+import subprocess
+import contextlib
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows: sin pico de memoria
+    resource = None
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(BENCH_DIR)
+RESULTADOS_DIR = os.path.join(BENCH_DIR, "resultados")
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, BENCH_DIR)
+
+SUITES = ("validacion", "api", "exportar", "analisis", "consultas")
+TAMANOS = (1_000, 100_000, 1_000_000)
+CONCURRENCIA = (1, 8, 32)
+
+
+# -----------------------------
+# Procesos auxiliares
+# -----------------------------
+def _rss_mb():
+    if resource is None:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _en_hijo(fn, *args):
+    """Corre fn(*args) en un proceso nuevo (spawn): imports y memoria limpios por caso."""
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def appwrite_falso(docs=0, latencia_ms=0.0):
+    """Levanta appwrite_falso.py en otro proceso y deja APPWRITE_ENDPOINT apuntando a él."""
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "appwrite_falso.py"),
+         "--docs", str(docs), "--latencia-ms", str(latencia_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    anterior = os.environ.get("APPWRITE_ENDPOINT", "")
+    try:
+        url = proc.stdout.readline().strip()
+        if not url:
+            raise RuntimeError("El Appwrite falso no arrancó")
+        os.environ["APPWRITE_ENDPOINT"] = url
+        yield url
+    finally:
+        proc.kill()
+        proc.wait()
+        os.environ["APPWRITE_ENDPOINT"] = anterior
+
+
+@contextlib.contextmanager
+def servidor_app():
+    """Backend real (gunicorn con la configuración de render.yaml; werkzeug si no hay gunicorn)."""
+    puerto = _puerto_libre()
+    try:
+        import gunicorn  # noqa: F401
+        cmd = [sys.executable, "-m", "gunicorn", "backend.app:app", "--workers=2", "--threads=8",
+               "--timeout=120", f"--bind=127.0.0.1:{puerto}", "--log-level=warning"]
+    except ImportError:
+        cmd = [sys.executable, "-c",
+               "from werkzeug.serving import run_simple; from backend.app import app; "
+               f"run_simple('127.0.0.1', {puerto}, app, threaded=True)"]
+    proc = subprocess.Popen(cmd, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{puerto}"
+    try:
+        for _ in range(300):
+            try:
+                requests.get(url + "/", timeout=5)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+        else:
+            raise RuntimeError("El backend no arrancó")
+        yield url
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+# -----------------------------
+# Suites
+# -----------------------------
+def suite_validacion(n=20000):
+    """validate_payload / validate_many sobre payloads válidos y mezclados."""
+    from validacion import payload_aleatorio, medir
+    from backend.utils import validate_payload, validate_many
+    import sintetico
+
+    rng = random.Random(7)
+    conjuntos = {
+        "validos": [sintetico.respuesta(rng) for _ in range(n)],
+        "mezcla": [payload_aleatorio(rng) for _ in range(n)],
+    }
+    filas = []
+    for nombre, payloads in conjuntos.items():
+        for caso, fn in (("validate_payload", lambda ps: [validate_payload(p) for p in ps]),
+                         ("validate_many", validate_many)):
+            us = medir(fn, payloads)
+            filas.append({"suite": "validacion", "caso": f"{caso}_{nombre}", "n": n,
+                          "segundos": round(us * n / 1e6, 6), "us_por_op": round(us, 3)})
+    return filas
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else None
+
+
+def _carga(url, concurrencia, peticiones):
+    """POST /api/response con `concurrencia` clientes hasta completar `peticiones`."""
+    import sintetico
+    por_cliente = max(1, peticiones // concurrencia)
+
+    def cliente(k):
+        rng = random.Random(k)
+        sesion = requests.Session()
+        lat, errores = [], 0
+        for _ in range(por_cliente):
+            t0 = time.perf_counter()
+            r = sesion.post(url + "/api/response", json=sintetico.respuesta(rng), timeout=60)
+            lat.append(time.perf_counter() - t0)
+            errores += r.status_code >= 300
+        return lat, errores
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrencia) as pool:
+        resultados = list(pool.map(cliente, range(concurrencia)))
+    total = time.perf_counter() - t0
+    lat = [x for r in resultados for x in r[0]]
+    return {
+        "suite": "api", "caso": f"post_response_c{concurrencia}", "n": len(lat),
+        "concurrencia": concurrencia, "segundos": round(total, 4),
+        "req_por_s": round(len(lat) / total, 1),
+        "p50_ms": round(_percentil(lat, 0.50) * 1000, 2),
+        "p95_ms": round(_percentil(lat, 0.95) * 1000, 2),
+        "errores": sum(r[1] for r in resultados),
+    }
+
+
+def suite_api(concurrencias, peticiones, latencia_ms, almacen="appwrite"):
+    """
+    Throughput de /api/response (gunicorn 2x8 como en Render) contra Appwrite con latencia,
+    o contra el almacén SQLite embebido (almacen="sqlite").
+    """
+    filas = []
+    os.environ["ALMACEN"] = almacen
+    try:
+        with appwrite_falso(0, latencia_ms), servidor_app() as url:
+            _carga(url, 4, 40)  # calentamiento (clientes Appwrite, pools, imports perezosos)
+            for c in concurrencias:
+                fila = _carga(url, c, peticiones)
+                fila["almacen"] = almacen
+                if almacen == "appwrite":
+                    fila["latencia_appwrite_ms"] = latencia_ms
+                else:
+                    fila["caso"] += f"_{almacen}"
+                filas.append(fila)
+    finally:
+        os.environ["ALMACEN"] = "appwrite"
+    return filas
+
+
+@contextlib.contextmanager
+def _silencio():
+    """Sin los prints del pipeline ni los avisos de deprecación del SDK (que reactiva sus filtros)."""
+    warnings.simplefilter("ignore", DeprecationWarning)
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        yield
+
+
+def _hijo_exportar(tmp, n):
+    with _silencio():
+        from backend import exportar_csv
+        exportar_csv.CSV_PATH = os.path.join(tmp, "respuestas_ia.csv")
+        exportar_csv.IDS_PATH = os.path.join(tmp, "respuestas_ia.ids")
+        exportar_csv.STATE_PATH = os.path.join(tmp, "respuestas_ia.estado.json")
+        t0 = time.perf_counter()
+        exportar_csv.exportar(incremental=False)
+        completo = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        exportar_csv.exportar(incremental=True)
+        incremental = time.perf_counter() - t0
+    return completo, incremental, _rss_mb()
+
+
+def suite_exportar(tamanos, latencia_ms):
+    """exportar() completo y exportar() incremental sin cambios, por tamaño de colección."""
+    filas = []
+    for n in tamanos:
+        tmp = tempfile.mkdtemp(prefix="bench_export_")
+        try:
+            with appwrite_falso(n, latencia_ms):
+                completo, incremental, rss = _en_hijo(_hijo_exportar, tmp, n)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        filas.append({"suite": "exportar", "caso": "completo", "n": n, "segundos": round(completo, 4),
+                      "docs_por_s": round(n / completo, 1), "rss_mb": rss, "latencia_appwrite_ms": latencia_ms})
+        filas.append({"suite": "exportar", "caso": "incremental_sin_cambios", "n": n,
+                      "segundos": round(incremental, 4), "latencia_appwrite_ms": latencia_ms})
+    return filas
+
+
+def _hijo_generar(tmp, n):
+    import sintetico
+    from backend import columnar
+    csv_path = sintetico.escribir_csv(os.path.join(tmp, "respuestas_ia.csv"), n)
+    if columnar.HAS_ARROW:
+        with _silencio():
+            columnar.csv_a_parquet(csv_path)
+    return csv_path
+
+
+def _hijo_analisis(tmp, usar_parquet, modo="memoria"):
+    with _silencio():
+        from backend import analisis_datos, columnar
+        analisis_datos.SRC_CSV = os.path.join(tmp, "respuestas_ia.csv")
+        analisis_datos.OUT_CSV = os.path.join(tmp, "eda_ia_consolidado.csv")
+        analisis_datos.EDA_MODO = modo
+        if not usar_parquet:
+            columnar.vigente = lambda *a: False  # fuerza la lectura del CSV
+        t0 = time.perf_counter()
+        analisis_datos.main(reconciliar=False)
+        segundos = time.perf_counter() - t0
+    return segundos, _rss_mb()
+
+
+def suite_analisis(tamanos):
+    """analisis_datos.main() leyendo el Parquet (camino normal), solo el CSV y el CSV por bloques."""
+    from backend import columnar
+    filas = []
+    for n in tamanos:
+        tmp = tempfile.mkdtemp(prefix="bench_eda_")
+        try:
+            _en_hijo(_hijo_generar, tmp, n)
+            fuentes = ("parquet", "csv", "bloques") if columnar.HAS_ARROW else ("csv", "bloques")
+            for fuente in fuentes:
+                modo = "bloques" if fuente == "bloques" else "memoria"
+                segundos, rss = _en_hijo(_hijo_analisis, tmp, fuente == "parquet", modo)
+                filas.append({"suite": "analisis", "caso": f"main_{fuente}", "n": n,
+                              "segundos": round(segundos, 4), "filas_por_s": round(n / segundos, 1),
+                              "rss_mb": rss})
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+    return filas
+
+
+# Filtros de /api/query: sin filtro, un enum, dos campos y rangos de edad/fecha
+CONSULTAS = {
+    "sin_filtro": {},
+    "facultad": {"facultad": ["ingenierias"]},
+    "carrera_herramienta": {"carrera": ["ingenieria_sistemas"], "herramientas": ["copilot"]},
+    "facultad_edad": {"facultad": ["ingenierias", "salud"], "edad_min": 18, "edad_max": 25},
+}
+
+
+def _hijo_consultas(tmp, repeticiones=5):
+    with _silencio():
+        from backend import consultas
+        consultas.SRC_CSV = os.path.join(tmp, "respuestas_ia.csv")
+        consultas.IDS_PATH = os.path.join(tmp, "respuestas_ia.ids")
+        t0 = time.perf_counter()
+        consultas.indice()
+        tiempos = {"carga": time.perf_counter() - t0}
+        for caso, filtros in CONSULTAS.items():
+            mejor = float("inf")
+            for _ in range(repeticiones):
+                t0 = time.perf_counter()
+                consultas.consultar(filtros)
+                mejor = min(mejor, time.perf_counter() - t0)
+            tiempos[caso] = mejor
+    return tiempos, _rss_mb()
+
+
+def suite_consultas(tamanos):
+    """consultas: carga del índice de bitmaps y consultas filtradas (mejor de 5)."""
+    filas = []
+    for n in tamanos:
+        tmp = tempfile.mkdtemp(prefix="bench_query_")
+        try:
+            _en_hijo(_hijo_generar, tmp, n)
+            tiempos, rss = _en_hijo(_hijo_consultas, tmp)
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        for caso, segundos in tiempos.items():
+            fila = {"suite": "consultas", "caso": caso, "n": n, "segundos": round(segundos, 5)}
+            if caso == "carga":
+                fila["rss_mb"] = rss
+            filas.append(fila)
+    return filas
+
+
+# -----------------------------
+# Reporte
+# -----------------------------
+def _git(*args):
+    try:
+        return subprocess.run(["git", *args], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _clave(fila):
+    return fila["suite"], fila["caso"], fila["n"]
+
+
+def comparar(actual, base, umbral):
+    """Imprime la variación de `segundos` caso por caso. Retorna los casos que empeoraron más que umbral."""
+    previos = {_clave(f): f for f in base["resultados"]}
+    regresiones = []
+    print(f"\n📊 Comparación contra {base['version'].get('commit')} ({base['fecha']}):")
+    for fila in actual["resultados"]:
+        previa = previos.get(_clave(fila))
+        if not previa or not previa.get("segundos"):
+            continue
+        cambio = fila["segundos"] / previa["segundos"] - 1
+        marca = "🔴" if cambio > umbral else ("🟢" if cambio < -umbral else "⚪")
+        print(f"   {marca} {fila['suite']}/{fila['caso']} n={fila['n']}: "
+              f"{previa['segundos']:.4f}s -> {fila['segundos']:.4f}s ({cambio:+.1%})")
+        if cambio > umbral:
+            regresiones.append(fila)
+    return regresiones
+
+
+def _opcion(args, nombre, tipo=str, defecto=None):
+    return tipo(args[args.index(nombre) + 1]) if nombre in args else defecto
+
+
+def _lista(texto, tipo=str):
+    return [tipo(x) for x in texto.split(",") if x.strip()]
+
+
+def main(args):
+    suites = _opcion(args, "--suites", _lista, list(SUITES))
+    tamanos = _opcion(args, "--tamanos", lambda t: _lista(t, int), list(TAMANOS))
+    concurrencias = _opcion(args, "--concurrencia", lambda t: _lista(t, int), list(CONCURRENCIA))
+    latencia_ms = _opcion(args, "--latencia-ms", float, 20.0)
+    peticiones = _opcion(args, "--peticiones", int, 2000)
+    almacen = _opcion(args, "--almacen", str, "appwrite")
+
+    # Variables de Appwrite ficticias y base local temporal, antes de importar el backend
+    tmp = tempfile.mkdtemp(prefix="bench_")
+    os.environ.update({
+        "APPWRITE_ENDPOINT": "http://127.0.0.1:9/v1", "APPWRITE_PROJECT_ID": "bench",
+        "APPWRITE_API_KEY": "bench", "APPWRITE_DATABASE_ID": "bench", "APPWRITE_COLLECTION_ID": "bench",
+        "LOCAL_DB_PATH": os.path.join(tmp, "datos_locales.sqlite3"),
+        "ALMACEN": "appwrite", "ALMACEN_SQLITE_PATH": os.path.join(tmp, "respuestas.sqlite3"),
+        "PYTHONWARNINGS": "ignore::DeprecationWarning", "WRITE_BEHIND": "0",
+    })
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    reporte = {
+        "version": {"commit": commit, "sucio": bool(_git("status", "--porcelain", "--", "backend"))},
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parametros": {"tamanos": tamanos, "concurrencia": concurrencias,
+                       "latencia_ms": latencia_ms, "peticiones": peticiones,
+                       "almacen": almacen},
+        "resultados": [],
+    }
+    corridas = {
+        "validacion": lambda: suite_validacion(),
+        "api": lambda: suite_api(concurrencias, peticiones, latencia_ms, almacen),
+        "exportar": lambda: suite_exportar(tamanos, latencia_ms),
+        "analisis": lambda: suite_analisis(tamanos),
+        "consultas": lambda: suite_consultas(tamanos),
+    }
+    try:
+        for suite in suites:
+            print(f"⏱️ {suite}...", flush=True)
+            for fila in corridas[suite]():
+                reporte["resultados"].append(fila)
+                extra = {k: v for k, v in fila.items() if k not in ("suite", "caso", "n", "segundos")}
+                print(f"   {fila['caso']} n={fila['n']}: {fila['segundos']}s {extra}", flush=True)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    salida = _opcion(args, "--salida") or os.path.join(
+        RESULTADOS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}_{commit or 'sin-git'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, ensure_ascii=False, indent=2)
+    print(f"✅ Reporte escrito en: {salida}")
+
+    base = _opcion(args, "--comparar")
+    if base:
+        with open(base, encoding="utf-8") as f:
+            regresiones = comparar(reporte, json.load(f), _opcion(args, "--umbral", float, 0.10))
+        if regresiones:
+            print(f"❌ {len(regresiones)} caso(s) más lentos que el umbral")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,72 @@
+# Respuestas sintéticas (siempre válidas) a partir de utils.ENUMS / CARRERAS, para los
+# benchmarks. Cada respuesta i depende solo de (semilla, i): el Appwrite falso puede generar
+# el documento i al pedirlo sin tener la colección completa en memoria.
+import os
+import sys
+import random
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.utils import ENUMS, CARRERAS, ARRAY_FIELDS, OTRO_TEXT_FIELDS, LIKERT_ORDERS  # noqa: E402
+
+# Pesos de las escalas Likert (sesgados hacia el centro, como en las respuestas reales)
+PESOS_LIKERT = [1, 3, 5, 3, 1]
+_OTRO = {"otro", "otra"}
+_CARRERAS = sorted(CARRERAS)
+_OPCIONES = {campo: sorted(valores) for campo, valores in ENUMS.items()}
+_SIMPLES = [c for c in ENUMS if c not in ARRAY_FIELDS and c != "carrera"]
+
+
+def _simple(rng, campo):
+    orden = LIKERT_ORDERS.get(campo)
+    if orden:
+        return rng.choices(orden, weights=PESOS_LIKERT[:len(orden)])[0]
+    return rng.choice(_OPCIONES[campo])
+
+
+def respuesta(rng, creado_en=None):
+    """Payload válido del formulario (con textos 'otro' cuando corresponde)."""
+    p = {
+        "nombre_completo": f"Estudiante {rng.randrange(10**6):06d}",
+        "edad": min(99, 16 + int(rng.expovariate(1 / 5))),
+        "carrera": rng.choice(_CARRERAS),
+    }
+    for campo in _SIMPLES:
+        p[campo] = _simple(rng, campo)
+    for campo in sorted(ARRAY_FIELDS):
+        p[campo] = rng.sample(_OPCIONES[campo], rng.randint(1, 3))
+    for base, texto in OTRO_TEXT_FIELDS.items():
+        valor = p.get(base)
+        if (valor in _OTRO) if isinstance(valor, str) else not _OTRO.isdisjoint(valor or ()):
+            p[texto] = f"otro {rng.randrange(1000)}"
+    if creado_en is not None:
+        p["creado_en"] = creado_en
+    return p
+
+
+def respuesta_i(i, semilla=1, creado_en=None):
+    """respuesta() determinista para el índice i."""
+    return respuesta(random.Random(semilla * 1_000_003 + i), creado_en)
+
+
+def respuestas(n, semilla=1, inicio=None, paso=timedelta(minutes=1)):
+    """Genera n respuestas con creado_en creciente desde `inicio` (por defecto hace n minutos)."""
+    inicio = inicio or datetime.now(timezone.utc) - paso * n
+    for i in range(n):
+        yield respuesta_i(i, semilla, (inicio + paso * i).isoformat(timespec="milliseconds"))
+
+
+def fila_csv(p):
+    """Payload -> fila de respuestas_ia.csv (arreglos como 'a;b;c')."""
+    return {k: ";".join(v) if isinstance(v, list) else v for k, v in p.items()}
+
+
+def escribir_csv(path, n, semilla=1):
+    """respuestas_ia.csv sintético de n filas (mismo esquema y encoding que el export)."""
+    from backend.exportar_csv import csv_writer
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv_writer(f)
+        writer.writeheader()
+        writer.writerows(fila_csv(p) for p in respuestas(n, semilla))
+    return path
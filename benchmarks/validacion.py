@@ -0,0 +1,195 @@
+# Benchmark del validador: versión original (copiada tal cual de utils.validate_payload antes
+# de optimizarlo) vs. validador actual y validate_many(). Antes de medir comprueba que ambos
+# den exactamente el mismo resultado (ok y errores/datos) sobre payloads aleatorios. El orden
+# de las claves no se compara: la original recorre el set ARRAY_FIELDS (depende del hash).
+#
+#   python benchmarks/validacion.py [n_payloads]
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from backend.utils import (  # noqa: E402
+    ENUMS, ARRAY_FIELDS, OTRO_TEXT_FIELDS, now_iso_utc, validate_payload, validate_many,
+)
+
+
+# -----------------------------
+# Implementación original (referencia)
+# -----------------------------
+def _is_non_empty_string(value):
+    return isinstance(value, str) and value.strip() != ""
+
+def validate_payload_original(payload: dict):
+    """
+    Valida y 'limpia' el payload entrante.
+    Retorna (ok: bool, data_or_errors: dict)
+    """
+    errors = {}
+    data = {}
+
+    # --- Requeridos NO enum ---
+    # nombre_completo (1–120 chars)
+    nc = payload.get("nombre_completo")
+    if not _is_non_empty_string(nc) or len(nc.strip()) > 120:
+        errors["nombre_completo"] = "Requerido (1–120 caracteres)."
+    else:
+        data["nombre_completo"] = nc.strip()
+
+    # edad (15–99)
+    edad = payload.get("edad")
+    if not isinstance(edad, int) or not (15 <= edad <= 99):
+        errors["edad"] = "Debe ser un entero entre 15 y 99."
+    else:
+        data["edad"] = edad
+
+    # --- Requeridos enum (una sola opción) ---
+    required_enums = [
+        "facultad", "carrera",
+        "familiaridad", "definicion", "frecuencia", "confianza",
+        "percepcion_social", "regulacion", "emocion",
+    ]
+    for field in required_enums:
+        val = payload.get(field)
+        if val is None:
+            errors[field] = "Campo requerido."
+        elif val not in ENUMS[field]:
+            errors[field] = f"Valor inválido: {val}"
+        else:
+            data[field] = val
+
+    # --- Requeridos (array) ---
+    for field in ARRAY_FIELDS:
+        arr = payload.get(field)
+        if not isinstance(arr, list):
+            errors[field] = "Debe ser un arreglo (lista)."
+            continue
+        invalids = [v for v in arr if v not in ENUMS[field]]
+        if invalids:
+            errors[field] = f"Valores inválidos: {invalids}"
+        else:
+            # Elimina duplicados conservando orden
+            seen = set()
+            cleaned = []
+            for v in arr:
+                if v not in seen:
+                    cleaned.append(v)
+                    seen.add(v)
+            data[field] = cleaned
+
+    # --- Campos opcionales de metadatos (si los envías y existen en tu colección) ---
+    for opt in ["respondente_id", "origen", "version_app", "idioma", "consentimiento"]:
+        if opt in payload:
+            data[opt] = payload.get(opt)
+
+    # --- Campos "otro_texto" (solo si corresponde) ---
+    for base_field, text_field in OTRO_TEXT_FIELDS.items():
+        text_val = payload.get(text_field)
+
+        # enum simple
+        if base_field in required_enums:
+            if data.get(base_field) in {"otro", "otra"}:
+                if not _is_non_empty_string(text_val):
+                    errors[text_field] = "Requerido cuando se elige 'otro/otra'."
+                else:
+                    data[text_field] = text_val.strip()[:120]
+            else:
+                if _is_non_empty_string(text_val):
+                    data[text_field] = text_val.strip()[:120]
+
+        # arrays
+        elif base_field in ARRAY_FIELDS:
+            chosen = data.get(base_field, [])
+            if "otra" in chosen or "otro" in chosen:
+                if not _is_non_empty_string(text_val):
+                    errors[text_field] = "Requerido cuando se elige 'otra/otro'."
+                else:
+                    data[text_field] = text_val.strip()[:120]
+            else:
+                if _is_non_empty_string(text_val):
+                    data[text_field] = text_val.strip()[:120]
+
+    # --- Timestamp controlado por backend ---
+    data["creado_en"] = now_iso_utc()
+
+    ok = len(errors) == 0
+    return (ok, data if ok else errors)
+
+
+# -----------------------------
+# Payloads sintéticos (válidos y con errores)
+# -----------------------------
+def payload_aleatorio(rng):
+    p = {
+        "nombre_completo": rng.choice(["Ana Pérez", "  Luis  ", "", "x" * 130, None, 5]),
+        "edad": rng.choice([15, 22, 40, 99, 14, 100, "20", None, 21.5]),
+    }
+    for field, allowed in ENUMS.items():
+        opciones = sorted(allowed)
+        if field in ARRAY_FIELDS:
+            p[field] = rng.choice([
+                rng.sample(opciones, rng.randint(0, 3)),
+                rng.sample(opciones, 2) + ["desconocido"],
+                [opciones[0], opciones[0]],
+                "no_lista",
+            ])
+        else:
+            p[field] = rng.choice([rng.choice(opciones)] * 6 + ["invalido", None])
+        if rng.random() < 0.2:
+            p.pop(field)
+    for text in OTRO_TEXT_FIELDS.values():
+        p[text] = rng.choice(["  detalle  ", "", "   ", None, "y" * 200])
+    for opt in ("respondente_id", "origen"):
+        if rng.random() < 0.3:
+            p[opt] = f"{opt}-{rng.randint(1, 99)}"
+    return p
+
+
+def payload_valido(rng):
+    p = {"nombre_completo": "Persona Prueba", "edad": rng.randint(15, 99)}
+    for field, allowed in ENUMS.items():
+        opciones = sorted(allowed)
+        p[field] = rng.sample(opciones, 2) if field in ARRAY_FIELDS else rng.choice(opciones)
+    for text in OTRO_TEXT_FIELDS.values():
+        p[text] = "detalle"
+    return p
+
+
+def _sin_timestamp(res):
+    ok, d = res
+    return ok, {k: v for k, v in d.items() if k != "creado_en"}
+
+
+def medir(fn, payloads, repeticiones=7):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn(payloads)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor / len(payloads) * 1e6  # µs por payload
+
+
+def main(n=20000):
+    rng = random.Random(7)
+    mezcla = [payload_aleatorio(rng) for _ in range(n)]
+    validos = [payload_valido(rng) for _ in range(n)]
+
+    for p in mezcla + validos:
+        a, b = _sin_timestamp(validate_payload_original(p)), _sin_timestamp(validate_payload(p))
+        assert a == b, (p, a, b)
+    print(f"✅ Resultados idénticos en {2 * n} payloads")
+
+    original = lambda ps: [validate_payload_original(p) for p in ps]
+    actual = lambda ps: [validate_payload(p) for p in ps]
+    for nombre, payloads in (("válidos", validos), ("mezcla", mezcla)):
+        t_orig, t_comp, t_lote = medir(original, payloads), medir(actual, payloads), medir(validate_many, payloads)
+        print(
+            f"{nombre:>8}: original {t_orig:6.2f} µs | actual {t_comp:6.2f} µs "
+            f"({t_orig / t_comp:.1f}x) | validate_many {t_lote:6.2f} µs ({t_orig / t_lote:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -27,11 +27,13 @@
   async function init(){
     setStatus("cargando...");
     try{
-      // Cargar EDA consolidado; si no existe, mostrar el raw
-      const eda = await fetchCsv("/csv-data/eda_ia_consolidado.csv");
-      if(eda && eda.length){
+      // Cargar EDA (JSON por dataset); si no hay respuestas, mostrar el raw
+      const stats = await fetchStats();
+      const datasets = stats ? stats.datasets : null;
+      const total = datasets && datasets.resumen ? Number((datasets.resumen[0] || {}).value || 0) : 0;
+      if(total > 0){
         setStatus("EDA consolidado");
-        renderEda(eda);
+        renderEda(datasets);
       }else{
         const raw = await fetchCsv("/csv-data/respuestas_ia.csv");
         if(raw && raw.length){
@@ -47,29 +49,72 @@
       document.getElementById("csvInfo").innerHTML = `<p class="warn">Error cargando CSV: ${e}</p>`;
     }
 
+    // Actividad en vivo (durante una campaña de recolección)
+    actualizarActividad();
+    setInterval(actualizarActividad, 15000);
+
     // Recalcular (llama al backend para regenerar CSVs)
     document.getElementById("btnRecompute").addEventListener("click", async ()=>{
       setStatus("recalculando…");
       const res = await fetch("/api/recompute", {method: "POST"});
       const json = await res.json().catch(()=>({}));
-      if(json.ok){
+      if(!json.ok){
+        setStatus("error");
+        alert("Error al recalcular: " + (json.error || "desconocido"));
+        return;
+      }
+      // el recálculo corre en segundo plano: consultar su estado hasta que termine
+      const trabajo = await esperarTrabajo(json.id);
+      if(trabajo && trabajo.estado === "terminado"){
         setStatus("actualizado");
         // recargar vista
         location.reload();
       }else{
         setStatus("error");
-        alert("Error al recalcular: " + (json.error || "desconocido"));
+        alert("Error al recalcular: " + ((trabajo && trabajo.error) || "desconocido"));
       }
     });
   }
 
+  async function esperarTrabajo(id){
+    for(;;){
+      await new Promise(r => setTimeout(r, 1000));
+      const res = await fetch(`/api/recompute/${id}`, {cache: "no-store"});
+      const json = await res.json().catch(()=>({}));
+      if(!json.ok) return null;
+      const t = json.trabajo;
+      if(t.estado === "terminado" || t.estado === "error") return t;
+      const etapa = t.etapas.find(e => e.estado === "corriendo");
+      setStatus(`recalculando… ${Math.round(t.progreso * 100)}%` + (etapa ? ` (${etapa.nombre})` : ""));
+    }
+  }
+
   function setStatus(text){
     const s = document.getElementById("csvStatus");
     s.textContent = "estado: " + text;
   }
 
+  async function actualizarActividad(){
+    try{
+      const res = await fetch("/api/actividad?ventanas=5m,1h,24h", {cache: "no-store"});
+      const json = await res.json().catch(()=>null);
+      if(!json || !json.ok) return;
+      const v = json.ventanas;
+      document.getElementById("actividad").textContent =
+        `actividad: ${v["5m"]} en 5 min · ${v["1h"]} en 1 h · ${v["24h"]} en 24 h`;
+    }catch(e){ /* sin conexión: se reintenta en el próximo ciclo */ }
+  }
+
+  // /api/stats responde con ETag: el navegador revalida y, si no hay datos nuevos, recibe un 304
+  async function fetchStats(){
+    const res = await fetch("/api/stats", {cache: "no-cache"});
+    if(!res.ok) return null;
+    const json = await res.json().catch(()=>null);
+    return json && json.ok ? json : null;
+  }
+
   async function fetchCsv(url){
-    const res = await fetch(url, {cache: "no-store"});
+    const res = await fetch(url, {cache: "no-cache"});
     if(!res.ok) return [];
     const text = await res.text();
     // Parse muy simple (no hay comas internas porque usamos ; para arrays)
@@ -122,12 +167,11 @@
     document.getElementById("tables").appendChild(wrap);
   }
 
-  function renderEda(eda){
+  function renderEda(datasets){
     const info = document.getElementById("csvInfo");
-    info.innerHTML = `<p>Fuente: <code>eda_ia_consolidado.csv</code>. Filtra por columna <b>dataset</b> para ver diferentes bloques.</p>`;
+    info.innerHTML = `<p>Fuente: <code>/api/stats</code> (descarga: <a href="/csv-data/eda_ia_consolidado.csv">eda_ia_consolidado.csv</a>). Cada tabla es un bloque <b>dataset</b>.</p>`;
 
     // Secciones: resumen, edad_stats, por_fecha, por_facultad, por_carrera, freq_simple, freq_multi, cross_*
-    const datasets = groupBy(eda, x => x.dataset);
     // Resumen
     if(datasets.resumen){
       renderTable("Resumen", ["metric","value"], datasets.resumen);
@@ -156,6 +200,14 @@
     if(datasets.cross_facultad_confianza){
       renderTable("Facultad × Confianza", ["facultad","confianza","conteo"], datasets.cross_facultad_confianza);
     }
+    // Otros cruces (cross_<campo>_<campo>): columnas = las de sus filas
+    Object.keys(datasets)
+      .filter(k => k.startsWith("cross_") && !["cross_facultad_familiaridad","cross_facultad_confianza"].includes(k))
+      .forEach(k => {
+        const rows = datasets[k];
+        const cols = Object.keys(rows[0] || {}).filter(h => h !== "conteo");
+        renderTable("Cruce " + cols.join(" × "), [...cols, "conteo"], rows);
+      });
   }
 
   function renderRaw(raw){
@@ -163,13 +215,4 @@
     info.innerHTML = `<p>Fuente: <code>respuestas_ia.csv</code>. Muestra los datos crudos exportados.</p>`;
     renderTable("Respuestas (raw)", raw._headers, raw);
   }
-
-  function groupBy(arr, keyFn){
-    const out = {};
-    for(const x of arr){
-      const k = keyFn(x) || "_";
-      (out[k] ||= []).push(x);
-    }
-    return out;
-  }
 })();
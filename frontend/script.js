@@ -39,6 +39,15 @@ document.addEventListener("DOMContentLoaded", () => {
     });
   }
 
+  // Clave de idempotencia: la misma en cada reintento del mismo envío (doble clic, error de red),
+  // así el backend no guarda la respuesta dos veces. Cambia si el usuario edita el formulario.
+  let claveEnvio = null;
+  const nuevaClave = () => (window.crypto && crypto.randomUUID)
+    ? crypto.randomUUID()
+    : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+  form.addEventListener("input", () => { claveEnvio = null; });
+  form.addEventListener("change", () => { claveEnvio = null; });
+
   form.addEventListener("submit", async (e) => {
     e.preventDefault();
     mensaje.textContent = "Enviando...";
@@ -114,10 +123,11 @@ document.addEventListener("DOMContentLoaded", () => {
     });
 
     // --- Envío robusto: si el backend devuelve HTML por 500, lo mostramos ---
+    claveEnvio = claveEnvio || nuevaClave();
     try {
       const res = await fetch("/api/response", {
         method: "POST",
-        headers: { "Content-Type": "application/json" },
+        headers: { "Content-Type": "application/json", "Idempotency-Key": claveEnvio },
         body: JSON.stringify(data),
       });
 
@@ -131,6 +141,7 @@ document.addEventListener("DOMContentLoaded", () => {
       if (result.ok) {
         mensaje.textContent = "✅ ¡Gracias! Tu respuesta ha sido registrada.";
         form.reset();
+        claveEnvio = null;
 
         // Re-ocultar posibles "otro"
         definicionOtro?.classList.add("oculto");
@@ -0,0 +1,54 @@
+# Las pruebas corren aisladas del backend real: base local, almacén y snapshot en un directorio
+# temporal, sin pipeline de arranque ni métricas. Cada prueba recibe además su propia base local.
+import os
+import sys
+import tempfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_TMP = tempfile.mkdtemp(prefix="formulario_ia_tests_")
+
+os.environ.update({
+    "ALMACEN": "sqlite",
+    "ALMACEN_SQLITE_PATH": os.path.join(_TMP, "respuestas.sqlite3"),
+    "LOCAL_DB_PATH": os.path.join(_TMP, "datos_locales.sqlite3"),
+    "SNAPSHOT_PATH": os.path.join(_TMP, "eda_ia.snapshot"),
+    "PIPELINE_ARRANQUE": "no",
+    "METRICAS": "0",
+    "WRITE_BEHIND": "0",
+})
+sys.path[:0] = [RAIZ, os.path.join(RAIZ, "benchmarks")]
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def base_local(tmp_path, monkeypatch):
+    """Base SQLite local nueva por prueba (los módulos vuelven a crear su esquema)."""
+    from backend import sqlite_local
+    monkeypatch.setattr(sqlite_local, "LOCAL_DB_PATH", str(tmp_path / "datos_locales.sqlite3"))
+    for nombre, modulo in list(sys.modules.items()):
+        if nombre.startswith("backend.") and isinstance(getattr(modulo, "_schema_ready", None), set):
+            modulo._schema_ready.clear()
+    return sqlite_local.LOCAL_DB_PATH
+
+
+@pytest.fixture
+def export_aislado(tmp_path, monkeypatch):
+    """exportar_csv/agregados/trabajos apuntando a tmp_path, con un almacén SQLite vacío."""
+    from backend import agregados, almacen, analisis_datos, exportar_csv, trabajos
+
+    rutas = {
+        "CSV_PATH": tmp_path / "respuestas_ia.csv",
+        "IDS_PATH": tmp_path / "respuestas_ia.ids",
+        "STATE_PATH": tmp_path / "respuestas_ia.estado.json",
+    }
+    for nombre, ruta in rutas.items():
+        monkeypatch.setattr(exportar_csv, nombre, str(ruta))
+    monkeypatch.setattr(agregados, "SRC_CSV", str(rutas["CSV_PATH"]))
+    monkeypatch.setattr(agregados, "IDS_PATH", str(rutas["IDS_PATH"]))
+    monkeypatch.setattr(analisis_datos, "SRC_CSV", str(rutas["CSV_PATH"]))
+    monkeypatch.setattr(trabajos, "LOCK_DIR", str(tmp_path))
+    monkeypatch.setattr("backend.duplicados.EXPORT_DUPLICADOS", "no")
+    alm = almacen.AlmacenSQLite(path=str(tmp_path / "respuestas.sqlite3"))
+    monkeypatch.setattr(almacen, "_almacen", alm)
+    return alm
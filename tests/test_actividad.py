@@ -0,0 +1,114 @@
+import threading
+
+import pytest
+
+from backend import actividad
+
+# 2026-03-16 es lunes; Bogotá es UTC-5 todo el año
+LUNES = "2026-03-16"
+
+
+@pytest.fixture
+def sin_retencion(monkeypatch):
+    """Sin poda al sumar: las pruebas usan fechas fijas, lejos de time.time()."""
+    monkeypatch.setattr(actividad, "ACTIVIDAD_MINUTOS_HORAS", 1e9)
+    monkeypatch.setattr(actividad, "ACTIVIDAD_HORAS_DIAS", 1e9)
+
+
+def sumar(*locales, facultad="Ingeniería"):
+    conn = actividad._conn()
+    for local in locales:
+        actividad.aplicar(conn, {"creado_en": f"{local}-05:00", "facultad": facultad, "carrera": "Sistemas"})
+
+
+def test_semana_empieza_el_lunes_en_hora_local():
+    lunes = actividad.momento(LUNES)
+    for local in ("2026-03-16T00:00", "2026-03-18T10:30", "2026-03-22T23:59:59"):
+        assert actividad.inicio(actividad.momento(local), "semana") == lunes
+    assert actividad.inicio(actividad.momento("2026-03-23T00:00"), "semana") == lunes + 7 * 86400
+    # domingo 23:30 en Bogotá ya es lunes en UTC: sigue en la semana anterior
+    domingo = actividad.instante("2026-03-23T04:30:00+00:00")
+    assert actividad.inicio(domingo, "semana") == lunes
+    assert actividad.iso_local(lunes) == "2026-03-16T00:00:00-05:00"
+
+
+def test_dia_y_hora_con_el_offset_de_bogota():
+    ts = actividad.instante("2026-03-17T03:10:00+00:00")  # 16 de marzo, 22:10 local
+    assert actividad.iso_local(actividad.inicio(ts, "dia")) == "2026-03-16T00:00:00-05:00"
+    assert actividad.iso_local(actividad.inicio(ts, "hora")) == "2026-03-16T22:00:00-05:00"
+    assert actividad.iso_local(actividad.inicio(ts, "minuto")) == "2026-03-16T22:10:00-05:00"
+    assert actividad.instante(1773717000000) == ts  # epoch ms
+
+
+def test_aplicar_suma_en_cada_granularidad(sin_retencion):
+    sumar("2026-03-16T22:10:05", "2026-03-16T22:10:50", "2026-03-16T23:00:00")
+    dia = actividad.momento(LUNES)
+    assert actividad.serie("dia", dia, dia + 86400) == [(dia, 3)]
+    assert actividad.serie("semana", dia, dia + 1) == [(dia, 3)]
+    assert [c for _, c in actividad.serie("hora", dia, dia + 86400)] == [2, 1]
+    assert [c for _, c in actividad.serie("minuto", dia, dia + 86400)] == [2, 1]
+    assert actividad.serie("dia", dia, dia + 86400, por="facultad") == [(dia, "Ingeniería", 3)]
+
+
+@pytest.mark.parametrize("texto, fuera, dentro", [
+    ("5m", "2026-03-16T11:55:59", "2026-03-16T11:56:00"),
+    ("24h", "2026-03-15T12:59:59", "2026-03-15T13:00:00"),
+    ("7d", "2026-03-09T12:59:59", "2026-03-09T13:00:00"),
+])
+def test_ventana_cuenta_los_buckets_que_empiezan_dentro(sin_retencion, texto, fuera, dentro):
+    ahora = actividad.momento("2026-03-16T12:00:30")
+    sumar(fuera, dentro, "2026-03-16T12:00:10")
+    assert actividad.ventana(actividad.duracion(texto), ahora) == 2
+    assert actividad.ventana(actividad.duracion(texto), ahora, facultades=["Artes"]) == 0
+
+
+def test_granularidad_de_cada_ventana():
+    assert actividad.granularidad_para(actividad.duracion("5m")) == "minuto"
+    assert actividad.granularidad_para(actividad.duracion("24h")) == "hora"
+    assert actividad.granularidad_para(actividad.duracion("7d")) == "hora"
+    assert actividad.granularidad_para(actividad.duracion("8d")) == "dia"
+
+
+def test_aplicar_no_guarda_minutos_ni_horas_vencidos():
+    sumar("2020-01-06T10:00:00")
+    conn = actividad._conn()
+    granularidades = {r[0] for r in conn.execute("SELECT granularidad FROM actividad")}
+    assert granularidades == {"dia", "semana"}
+
+
+def test_podar_respeta_la_retencion(sin_retencion, monkeypatch):
+    ahora = actividad.momento("2026-03-16T12:00")
+    sumar("2026-03-14T11:00", "2026-03-14T13:00", "2025-12-15T12:00", "2025-12-17T12:00")
+    monkeypatch.setattr(actividad, "ACTIVIDAD_MINUTOS_HORAS", 48)
+    monkeypatch.setattr(actividad, "ACTIVIDAD_HORAS_DIAS", 90)
+    actividad.podar(ahora=ahora)
+
+    minutos = actividad.serie("minuto", 0, ahora)
+    assert [actividad.iso_local(ini) for ini, _ in minutos] == ["2026-03-14T13:00:00-05:00"]
+    horas = {actividad.iso_local(ini)[:10] for ini, _ in actividad.serie("hora", 0, ahora)}
+    assert horas == {"2025-12-17", "2026-03-14"}
+    # días y semanas no se podan
+    assert sum(c for _, c in actividad.serie("dia", 0, ahora)) == 4
+    assert sum(c for _, c in actividad.serie("semana", 0, ahora)) == 4
+
+
+def test_poda_periodica_con_varios_threads(sin_retencion, monkeypatch):
+    podas = []
+    monkeypatch.setattr(actividad, "PODA_CADA", 50)
+    monkeypatch.setattr(actividad, "podar", lambda conn=None, ahora=None: podas.append(1))
+    antes = next(actividad._sumadas)
+
+    def trabajar():
+        for _ in range(100):
+            sumar("2026-03-16T12:00:00")
+
+    hilos = [threading.Thread(target=trabajar) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    dia = actividad.momento(LUNES)
+    assert actividad.serie("dia", dia, dia + 1) == [(dia, 800)]
+    # cada respuesta avanza el contador exactamente una vez
+    assert next(actividad._sumadas) == antes + 801
+    assert len(podas) == 800 // 50
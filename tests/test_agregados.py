@@ -0,0 +1,96 @@
+import os
+import time
+
+import pytest
+import sintetico
+
+from backend import agregados
+
+
+@pytest.fixture
+def export(tmp_path):
+    """respuestas_ia.csv sintético de 50 filas con sus ids (d0..d49)."""
+    csv_path = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 50)
+    ids_path = tmp_path / "respuestas_ia.ids"
+    ids_path.write_text("".join(f"d{i}\n" for i in range(50)), encoding="utf-8")
+    return csv_path, str(ids_path)
+
+
+def test_reconstruir_conserva_lo_registrado_despues_del_export(export):
+    csv_path, ids_path = export
+    agregados.reconstruir(csv_path, ids_path)
+    exportada = sintetico.respuesta_i(0)
+    nueva = sintetico.respuesta_i(1000, creado_en="2026-01-01T12:00:00+00:00")
+    assert not agregados.registrar(exportada, "d0")  # ya contada por el export
+    assert agregados.registrar(nueva, "n1")
+
+    agregados.reconstruir(csv_path, ids_path)
+    agg = agregados.leer()
+    assert agg["total"] == 51
+    assert agg["por_fecha"]["2026-01-01"] == 1
+    assert [doc_id for _, doc_id, _ in agregados.pendientes()] == ["n1"]
+
+    # cuando el export la trae, sale de los pendientes y no se cuenta dos veces
+    with open(ids_path, "a", encoding="utf-8") as f:
+        f.write("n1\n")
+    with open(csv_path, "a", encoding="utf-8", newline="") as f:
+        from backend.exportar_csv import csv_writer
+        csv_writer(f).writerow(sintetico.fila_csv(nueva))
+    agregados.reconstruir(csv_path, ids_path)
+    assert agregados.leer()["total"] == 51
+    assert agregados.pendientes() == []
+
+
+def test_pendientes_vencidos_se_descartan(export, monkeypatch):
+    csv_path, ids_path = export
+    agregados.registrar(sintetico.respuesta_i(1000), "viejo")
+    monkeypatch.setattr(time, "time", lambda real=time.time: real() + 100 * 3600)
+    agregados.reconstruir(csv_path, ids_path)
+    assert agregados.leer()["total"] == 50
+    assert agregados.pendientes() == []
+
+
+def test_edad_min_max_siguen_las_modificaciones():
+    a, b = sintetico.respuesta_i(1), sintetico.respuesta_i(2)
+    a["edad"], b["edad"] = 18, 40
+    agregados.registrar(a, "a")
+    agregados.registrar(b, "b")
+    agregados.actualizar(b, {**b, "edad": 30})
+    edad = agregados.leer()["edad"]
+    assert (edad["minimo"], edad["maximo"], edad["suma"], edad["n"]) == (18.0, 30.0, 48, 2)
+    agregados.actualizar(a, {**a, "edad": 25})
+    assert agregados.leer()["edad"]["minimo"] == 25.0
+
+
+def test_edad_no_entera_no_cuenta():
+    assert agregados._edad("20") == 20
+    assert agregados._edad(20.0) == 20
+    assert agregados._edad("20.7") is None
+    assert agregados._edad("nan") is None
+    assert agregados._edad(0) is None
+
+
+def test_sin_csv_no_se_vacian_los_agregados(export, tmp_path):
+    csv_path, ids_path = export
+    agregados.reconstruir(csv_path, ids_path)
+    assert agregados.reconstruir(str(tmp_path / "no_existe.csv"), ids_path) is None
+    assert agregados.leer()["total"] == 50
+
+
+def test_no_se_publican_ceros_sobre_un_eda_real(export, tmp_path):
+    csv_path, ids_path = export
+    eda = str(tmp_path / "eda.csv")
+    agregados.reconstruir(csv_path, ids_path)
+    assert agregados.publicar_si_cambio(eda)
+    original = open(eda, "rb").read()
+
+    # base local con "base" pero sin respuestas (p. ej. reconstruida desde un CSV vacío)
+    vacio = tmp_path / "vacio.csv"
+    vacio.write_bytes(open(csv_path, "rb").readline())
+    agregados.reconstruir(str(vacio), ids_path)
+    assert agregados.leer()["total"] == 0
+    assert not agregados.representativos(eda)
+    assert not agregados.publicar_si_cambio(eda)
+    assert open(eda, "rb").read() == original
+    assert agregados.representativos(str(tmp_path / "sin_eda.csv"))
+    assert os.path.exists(eda)
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import almacen
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_arrancar_no_importa_appwrite():
+    codigo = (
+        "import sys; import backend.app, backend.almacen, backend.cola_respuestas; "
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('appwrite', 'requests')))"
+    )
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], capture_output=True, text=True, check=True, cwd=RAIZ,
+        env={**os.environ, "ALMACEN": "appwrite"},
+    ).stdout
+    assert salida.strip() == "[]"
+
+
+def test_guardar_sin_id_genera_uno(tmp_path):
+    alm = almacen.AlmacenSQLite(path=str(tmp_path / "respuestas.sqlite3"))
+    a, b = alm.guardar({"facultad": "x"}), alm.guardar({"facultad": "y"})
+    assert a and b and a != b
+    with pytest.raises(almacen.Conflicto):
+        alm.guardar({"facultad": "z"}, doc_id=a)
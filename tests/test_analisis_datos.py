@@ -0,0 +1,18 @@
+import sintetico
+
+from backend import agregados, analisis_datos, estadisticas
+
+
+def test_eda_en_memoria_igual_a_los_agregados(tmp_path, monkeypatch):
+    src = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 500)
+    out = str(tmp_path / "eda_ia_consolidado.csv")
+    monkeypatch.setattr(analisis_datos, "SRC_CSV", src)
+    monkeypatch.setattr(analisis_datos, "OUT_CSV", out)
+    monkeypatch.setattr(analisis_datos, "EDA_MODO", "memoria")
+    analisis_datos.main(reconciliar=False)
+    assert not list(tmp_path.glob("*.tmp*"))  # escrito con atomic_write, sin restos
+
+    agregados.reconstruir(src, str(tmp_path / "sin_ids"))
+    esperado = str(tmp_path / "esperado.csv")
+    agregados.escribir_eda_csv(esperado)
+    assert estadisticas.filas_snapshot(out) == estadisticas.filas_snapshot(esperado)
@@ -0,0 +1,78 @@
+import inspect
+import threading
+
+import appwrite.client
+import requests
+import appwrite_falso
+import pytest
+from appwrite.exception import AppwriteException
+
+from backend import appwrite_config
+
+
+@pytest.fixture
+def falso(monkeypatch):
+    vistos = []
+
+    class Handler(appwrite_falso.Handler):
+        def parse_request(self):
+            ok = super().parse_request()
+            if ok:
+                vistos.append((self.client_address, self.headers.get("x-appwrite-key"),
+                               self.headers.get("x-appwrite-project")))
+            return ok
+
+    srv = appwrite_falso.servidor()
+    srv.RequestHandlerClass = Handler
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setattr(appwrite_config, "APPWRITE_ENDPOINT", srv.url)
+    monkeypatch.setattr(appwrite_config, "APPWRITE_PROJECT_ID", "proyecto")
+    monkeypatch.setattr(appwrite_config, "APPWRITE_API_KEY", "clave")
+    monkeypatch.setattr(appwrite_config, "APPWRITE_DATABASE_ID", "db")
+    monkeypatch.setattr(appwrite_config, "APPWRITE_COLLECTION_ID", "col")
+    monkeypatch.setattr(appwrite_config, "_client", None)
+    monkeypatch.setattr(appwrite.client, "requests", appwrite.client.requests)
+    yield vistos
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_llamadas_por_el_sdk_reutilizan_la_conexion(falso):
+    db = appwrite_config.get_databases()
+    assert appwrite.client.requests is appwrite_config._TRANSPORTE
+    for i in range(5):
+        db.create_document("db", "col", f"doc{i}", {"edad": 20 + i})
+    docs = db.list_documents("db", "col")["documents"]
+    assert sorted(d["$id"] for d in docs) == [f"doc{i}" for i in range(5)]
+    # los encabezados del SDK llegan intactos y todo pasa por una sola conexión keep-alive
+    assert {(clave, proyecto) for _, clave, proyecto in falso} == {("clave", "proyecto")}
+    assert len({direccion for direccion, _, _ in falso}) == 1
+
+
+def test_errores_siguen_siendo_appwrite_exception(falso):
+    db = appwrite_config.get_databases()
+    db.create_document("db", "col", "repetido", {"edad": 20})
+    with pytest.raises(AppwriteException) as e:
+        db.create_document("db", "col", "repetido", {"edad": 21})
+    assert e.value.code == 409
+
+
+def test_contrato_con_el_sdk():
+    """El transporte del SDK es requests.request() del módulo appwrite.client (ver _Transporte)."""
+    assert "requests.request(" in inspect.getsource(appwrite.client.Client.call)
+    assert appwrite.client.requests in (requests, appwrite_config._TRANSPORTE)
+
+
+def test_otros_client_no_usan_la_sesion(falso, monkeypatch):
+    appwrite_config.get_client()  # instala el transporte
+    usadas = []
+
+    def sin_red(method, url, **kwargs):
+        usadas.append(kwargs)
+        raise OSError("sin red")
+
+    monkeypatch.setattr(requests, "request", sin_red)
+    plano = appwrite.client.Client().set_endpoint(appwrite_config.APPWRITE_ENDPOINT)
+    with pytest.raises(AppwriteException):
+        plano.call("get", "/health", {"content-type": "application/json"})
+    assert len(usadas) == 1 and "timeout" not in usadas[0]
@@ -0,0 +1,84 @@
+import csv
+import gzip
+import io
+import os
+import time
+from datetime import date
+
+import pytest
+import sintetico
+
+from backend import app as app_mod
+from backend import agregados, artefactos, trabajos
+
+
+@pytest.fixture
+def cliente(tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos, "LOCK_DIR", str(tmp_path))
+    monkeypatch.setattr(app_mod, "BASE_DIR", str(tmp_path))
+    return app_mod.app.test_client()
+
+
+def _esperar(path):
+    fin = time.time() + 10
+    trabajo = trabajos.ultimo("comprimir-" + os.path.basename(path))
+    while trabajo and trabajos.estado(trabajo["id"])["estado"] in trabajos.ACTIVOS and time.time() < fin:
+        time.sleep(0.02)
+
+
+def test_copias_al_pedir_el_archivo(cliente, tmp_path):
+    path = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 200)
+    original = open(path, "rb").read()
+
+    primera = cliente.get("/csv-data/respuestas_ia.csv", headers={"Accept-Encoding": "gzip"})
+    assert primera.headers.get("Content-Encoding") is None and primera.data == original
+    _esperar(path)
+    assert artefactos.programar(path) is None  # ya al día: no hay otro trabajo
+
+    segunda = cliente.get("/csv-data/respuestas_ia.csv", headers={"Accept-Encoding": "gzip"})
+    assert segunda.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(segunda.data) == original
+
+
+def test_copia_vieja_no_se_sirve(tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos, "LOCK_DIR", str(tmp_path))
+    path = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 20)
+    artefactos.comprimir(path)
+    acepta = {"gzip": True, "br": True}
+    assert artefactos.variante(path, acepta)[1] is not None
+    os.utime(path, ns=(time.time_ns() + 10**9,) * 2)  # el CSV cambió después de comprimir
+    assert artefactos.variante(path, acepta) == (path, None)
+    assert artefactos.programar(path) is not None
+    _esperar(path)
+    assert artefactos.variante(path, acepta)[1] is not None
+
+
+def test_export_incremental_no_comprime(export_aislado):
+    from backend import exportar_csv
+
+    for i in range(5):
+        export_aislado.guardar(sintetico.respuesta_i(i), f"d{i}")
+    exportar_csv.exportar(incremental=False)
+    export_aislado.guardar(sintetico.respuesta_i(5), "d5")
+    exportar_csv.exportar()
+    assert not os.path.exists(exportar_csv.CSV_PATH + ".gz")
+
+
+def test_filtrado_omite_filas_incompletas(tmp_path):
+    path = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 30)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n\ntruncada,sin\n")
+    facultad = sintetico.respuesta_i(0)["facultad"]
+    texto = b"".join(artefactos.filtrar_csv(path, facultades=facultad)).decode("utf-8-sig")
+    filas = list(csv.DictReader(io.StringIO(texto)))
+    esperadas = [p for p in sintetico.respuestas(30) if p["facultad"] == facultad]
+    assert [r["nombre_completo"] for r in filas] == [p["nombre_completo"] for p in esperadas]
+
+
+def test_filtrado_por_fecha(cliente, tmp_path):
+    sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 30)
+    assert cliente.get("/api/export/respuestas.csv?desde=2024-1-2").status_code == 400
+    hoy = date.fromisoformat(agregados.fecha_local(list(sintetico.respuestas(30))[-1]["creado_en"]))
+    resp = cliente.get(f"/api/export/respuestas.csv?desde={hoy.isoformat()}&hasta={hoy.isoformat()}")
+    assert resp.status_code == 200
+    assert len(list(csv.reader(io.StringIO(resp.data.decode("utf-8-sig"))))) > 1
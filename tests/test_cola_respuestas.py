@@ -0,0 +1,130 @@
+import types
+
+import pytest
+import sintetico
+
+from backend import almacen, cola_respuestas
+
+
+class ErrorAlmacen(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class AlmacenConFallas(almacen.AlmacenSQLite):
+    """AlmacenSQLite que falla a pedido: `error_lote` en guardar_lote y {id: código} en guardar."""
+
+    def __init__(self, path):
+        super().__init__(path=path)
+        self.error_lote = None
+        self.rechazos = {}
+        self.lotes = 0
+
+    def guardar_lote(self, docs):
+        self.lotes += 1
+        if self.error_lote:
+            raise self.error_lote
+        return super().guardar_lote(docs)
+
+    def guardar(self, data, doc_id=None):
+        if doc_id in self.rechazos:
+            raise ErrorAlmacen(self.rechazos[doc_id])
+        return super().guardar(data, doc_id)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    """Reloj manual para la bitácora: reloj[0] es time.time()."""
+    ahora = [1_000_000.0]
+    monkeypatch.setattr(cola_respuestas, "time", types.SimpleNamespace(time=lambda: ahora[0]))
+    monkeypatch.setattr(cola_respuestas, "random", types.SimpleNamespace(uniform=lambda a, b: 0.5))
+    return ahora
+
+
+@pytest.fixture
+def alm(tmp_path, monkeypatch, reloj):
+    """Almacén de prueba y sin hilo de vaciado: las pruebas llaman vaciar_lote() directamente."""
+    alm = AlmacenConFallas(str(tmp_path / "respuestas.sqlite3"))
+    monkeypatch.setattr(almacen, "_almacen", alm)
+    monkeypatch.setattr(cola_respuestas, "asegurar_flusher", lambda: types.SimpleNamespace(despertar=lambda: None))
+    return alm
+
+
+def encolar(*ids):
+    for i, doc_id in enumerate(ids):
+        cola_respuestas.encolar(sintetico.respuesta_i(i), doc_id)
+
+
+def fila(doc_id):
+    return cola_respuestas._conn().execute("SELECT * FROM cola_respuestas WHERE id = ?", (doc_id,)).fetchone()
+
+
+def test_vaciar_lote_guarda_y_confirma(alm):
+    encolar("a", "b", "c")
+    cola_respuestas.encolar(sintetico.respuesta_i(9), "a")  # mismo id: no se encola dos veces
+    assert cola_respuestas.pendientes() == {"pendientes": 3, "fallidos": 0}
+    assert cola_respuestas.vaciar_lote() == 3
+    assert cola_respuestas.pendientes() == {"pendientes": 0, "fallidos": 0}
+    assert alm.obtener("a")["carrera"] == sintetico.respuesta_i(0)["carrera"]
+    assert cola_respuestas.vaciar_lote() == 0
+
+
+def test_reserva_con_lease(alm, reloj):
+    encolar("a", "b", "c")
+    assert [r["id"] for r in cola_respuestas._reservar(2)] == ["a", "b"]
+    assert [r["id"] for r in cola_respuestas._reservar(10)] == ["c"]
+    assert cola_respuestas._reservar(10) == []  # reservadas por otro worker
+
+    reloj[0] += cola_respuestas.LEASE_SECONDS  # el worker que las tomó murió: el lease vence
+    assert [r["id"] for r in cola_respuestas._reservar(10)] == ["a", "b", "c"]
+
+
+def test_error_transitorio_reprograma_con_backoff(alm, reloj):
+    encolar("a", "b")
+    alm.error_lote = ErrorAlmacen(503)
+    inicio = reloj[0]
+    assert cola_respuestas.vaciar_lote() == 0
+    r = fila("a")
+    assert (r["intentos"], r["fallido"], r["reservado_hasta"]) == (1, 0, 0)
+    assert r["proximo_intento"] == inicio + 2 + 0.5
+    assert "503" in r["ultimo_error"]
+
+    # antes del próximo intento no se reenvía
+    assert cola_respuestas.vaciar_lote() == 0
+    assert alm.lotes == 1
+
+    reloj[0] = r["proximo_intento"]
+    alm.error_lote = ErrorAlmacen(429)
+    assert cola_respuestas.vaciar_lote() == 0
+    assert alm.lotes == 2
+    assert fila("a")["proximo_intento"] == reloj[0] + 4 + 0.5
+
+    reloj[0] = fila("a")["proximo_intento"]
+    alm.error_lote = None
+    assert cola_respuestas.vaciar_lote() == 2
+    assert cola_respuestas.pendientes() == {"pendientes": 0, "fallidos": 0}
+
+
+def test_backoff_tiene_tope(alm, reloj):
+    encolar("a")
+    cola_respuestas._reprogramar({"id": "a", "intentos": 20}, "timeout")
+    assert fila("a")["proximo_intento"] == reloj[0] + cola_respuestas.MAX_BACKOFF + 0.5
+
+
+def test_lote_rechazado_se_envia_uno_por_uno(alm):
+    alm.guardar({"carrera": "previa"}, doc_id="ya")  # un envío anterior llegó sin respuesta
+    encolar("ok", "ya", "invalida", "caida")
+    alm.error_lote = ErrorAlmacen(400)
+    alm.rechazos = {"invalida": 400, "caida": 503}
+
+    # "ya" responde 409: cuenta como guardada
+    assert cola_respuestas.vaciar_lote() == 2
+    assert alm.obtener("ok") is not None
+    assert fila("ok") is None and fila("ya") is None
+    assert alm.obtener("ya")["carrera"] == "previa"
+    # otro 4xx queda como fallido para revisión; un 5xx se reintenta
+    invalida, caida = fila("invalida"), fila("caida")
+    assert (invalida["fallido"], invalida["intentos"]) == (1, 1)
+    assert (caida["fallido"], caida["intentos"]) == (0, 1)
+    assert cola_respuestas.pendientes() == {"pendientes": 1, "fallidos": 1}
@@ -0,0 +1,104 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+import sintetico
+from werkzeug.datastructures import MultiDict
+
+from backend import agregados, consultas
+from backend.exportar_csv import csv_writer
+
+INICIO = datetime(2026, 3, 1, 3, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def csv_consultas(tmp_path, monkeypatch):
+    """respuestas_ia.csv (+ ids) de 300 respuestas repartidas en ~9 días."""
+    path, ids_path = tmp_path / "respuestas_ia.csv", tmp_path / "respuestas_ia.ids"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv_writer(f)
+        writer.writeheader()
+        writer.writerows(sintetico.fila_csv(p) for p in sintetico.respuestas(300, inicio=INICIO, paso=timedelta(minutes=43)))
+    ids_path.write_text("".join(f"c{i}\n" for i in range(300)))
+    monkeypatch.setattr(consultas, "SRC_CSV", str(path))
+    monkeypatch.setattr(consultas, "IDS_PATH", str(ids_path))
+    monkeypatch.setattr(consultas, "_indice", None)
+    return path
+
+
+def _pandas(path, filtros):
+    """El mismo filtro con pandas sobre el CSV (referencia)."""
+    df = pd.read_csv(path, encoding="utf-8-sig", dtype=str, keep_default_na=False)
+    m = pd.Series(True, index=df.index)
+    for campo, valores in filtros.items():
+        if campo in consultas.RANGOS:
+            continue
+        if campo in consultas.MULTI_COLS:
+            m &= df[campo].str.split(";").map(lambda xs: bool(set(xs) & set(valores)))
+        else:
+            m &= df[campo].isin(valores)
+    edad = pd.to_numeric(df["edad"])
+    if "edad_min" in filtros:
+        m &= edad >= filtros["edad_min"]
+    if "edad_max" in filtros:
+        m &= edad <= filtros["edad_max"]
+    dia = (pd.to_datetime(df["creado_en"], utc=True) - timedelta(hours=5)).dt.date
+    if "desde" in filtros:
+        m &= dia >= filtros["desde"]
+    if "hasta" in filtros:
+        m &= dia <= filtros["hasta"]
+    return df[m]
+
+
+CASOS = [
+    {},
+    {"facultad": ["ingenierias", "ciencias_exactas_aplicadas"]},
+    {"herramientas": ["chatgpt", "copilot"], "edad_min": 18, "edad_max": 25},
+    {"familiaridad": ["poco", "muy"], "usos": ["trabajo"], "desde": date(2026, 3, 3), "hasta": date(2026, 3, 6)},
+    {"facultad": ["no_existe"]},
+]
+
+
+@pytest.mark.parametrize("filtros", CASOS)
+def test_igual_a_filtrar_con_pandas(csv_consultas, filtros):
+    total, rows = consultas.consultar(filtros, ["por_facultad", "por_fecha"])
+    esperado = _pandas(csv_consultas, filtros)
+    assert total == len(esperado)
+    assert total > 0 or filtros == {"facultad": ["no_existe"]}
+    por_facultad = {r["facultad"]: r["conteo"] for r in rows if r["dataset"] == "por_facultad"}
+    assert por_facultad == esperado["facultad"].value_counts().to_dict()
+    dias = (pd.to_datetime(esperado["creado_en"], utc=True) - timedelta(hours=5)).dt.date.astype(str)
+    assert {r["fecha"]: r["conteo"] for r in rows if r["dataset"] == "por_fecha"} == dias.value_counts().to_dict()
+
+
+def test_parametro_vacio_no_filtra(csv_consultas):
+    filtros = consultas.filtros_de(MultiDict([("facultad", ""), ("usos", " , ")]))
+    assert filtros == {}
+    assert consultas.consultar(filtros)[0] == 300
+
+
+def test_respuestas_pendientes_de_export(csv_consultas):
+    # recibida (por cualquier worker) antes de la primera consulta
+    agregados.registrar(sintetico.respuesta_i(1000, creado_en=INICIO.isoformat()), "n1")
+    # una que el CSV ya trae no se cuenta dos veces
+    agregados.registrar(sintetico.respuesta_i(5), "c5")
+    assert consultas.consultar({})[0] == 301
+
+    # índice ya cargado: otro worker registra una respuesta (misma base local)
+    nueva = sintetico.respuesta_i(1001, creado_en=INICIO.isoformat())
+    agregados.registrar(nueva, "n2")
+    total, _ = consultas.consultar({"facultad": [nueva["facultad"]]})
+    assert total == len(_pandas(csv_consultas, {"facultad": [nueva["facultad"]]})) + 1 + (
+        sintetico.respuesta_i(1000)["facultad"] == nueva["facultad"]
+    )
+    assert consultas.consultar({})[0] == 302
+
+
+def test_ids_incompletos_no_duplican_pendientes(csv_consultas):
+    with open(consultas.IDS_PATH, "w") as f:
+        f.writelines(f"c{i}\n" for i in range(250))  # export viejo: faltan los ids de la cola
+    agregados.registrar(sintetico.respuesta_i(299), "c299")  # ya en el CSV, sin id conocido
+    assert consultas.consultar({})[0] == 300
+
+    agregados.registrar(sintetico.respuesta_i(1001, creado_en=INICIO.isoformat()), "n2")
+    assert consultas.consultar({})[0] == 301
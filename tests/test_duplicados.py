@@ -0,0 +1,58 @@
+import csv
+import time
+
+import pytest
+import sintetico
+
+from backend import almacen, duplicados, exportar_csv
+
+
+@pytest.fixture
+def con_duplicados(export_aislado, tmp_path, monkeypatch):
+    monkeypatch.setattr(duplicados, "EXPORT_DUPLICADOS", "marcar")
+    monkeypatch.setattr(duplicados.escribir_reporte, "__defaults__", (False, str(tmp_path / "duplicados.csv")))
+    monkeypatch.setattr(almacen, "PAGE_SIZE", 4)  # varias páginas: huellas consultadas por lote
+    return export_aislado
+
+
+def _guardar(alm, i, base):
+    # cada 3a respuesta repite el contenido de una anterior (otro creado_en, nombre con otra grafía)
+    p = sintetico.respuesta_i(base)
+    if base != i:
+        p["nombre_completo"] = p["nombre_completo"].upper() + "  "
+    alm.guardar({**p, "creado_en": f"2026-03-01T10:{i:02d}:00.000+00:00"}, f"d{i}")
+    time.sleep(0.002)  # $updatedAt con resolución de ms
+
+
+def _reporte(tmp_path):
+    with open(tmp_path / "duplicados.csv", encoding="utf-8-sig") as f:
+        return [(r["id"], r["original_id"]) for r in csv.DictReader(f)]
+
+
+def test_completo_e_incremental_contra_la_tabla(con_duplicados, tmp_path):
+    alm = con_duplicados
+    for i in range(20):
+        _guardar(alm, i, i - 5 if i % 3 == 2 and i >= 5 else i)
+    exportar_csv.exportar(incremental=False)
+    esperados = [(f"d{i}", f"d{i - 5}") for i in range(20) if i % 3 == 2 and i >= 5]
+    assert _reporte(tmp_path) == esperados
+    assert duplicados._conn().execute("SELECT COUNT(*) FROM huellas").fetchone()[0] == 20 - len(esperados)
+    assert duplicados._conn().execute("SELECT COUNT(*) FROM huellas_completo").fetchone()[0] == 0
+
+    _guardar(alm, 20, 1)   # repite una fila del export anterior
+    _guardar(alm, 21, 21)
+    exportar_csv.exportar()
+    assert _reporte(tmp_path) == esperados + [("d20", "d1")]
+
+    # un export completo nuevo da el mismo índice
+    exportar_csv.exportar(incremental=False)
+    assert _reporte(tmp_path) == esperados + [("d20", "d1")]
+
+
+def test_colapsar_omite_duplicados_entre_paginas(con_duplicados, monkeypatch):
+    monkeypatch.setattr(duplicados, "EXPORT_DUPLICADOS", "colapsar")
+    alm = con_duplicados
+    for i in range(10):
+        _guardar(alm, i, i % 5)
+    exportar_csv.exportar(incremental=False)
+    assert open(exportar_csv.IDS_PATH).read().split() == [f"d{i}" for i in range(5)]
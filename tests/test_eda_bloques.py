@@ -0,0 +1,46 @@
+import pytest
+import sintetico
+
+from backend import analisis_datos, columnar, eda_bloques, estadisticas
+from backend.exportar_csv import csv_writer
+
+
+@pytest.fixture
+def export(tmp_path, monkeypatch):
+    """respuestas_ia.csv con textos 'otro' que traen comas, comillas y saltos de línea."""
+    path = tmp_path / "respuestas_ia.csv"
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv_writer(f)
+        writer.writeheader()
+        for i, p in enumerate(sintetico.respuestas(1200)):
+            if i % 7 == 0:
+                p["definicion"], p["definicion_otro_texto"] = "otro", f'línea 1\n"cita", {i}\nlínea 3'
+            writer.writerow(sintetico.fila_csv(p))
+    monkeypatch.setattr(analisis_datos, "SRC_CSV", str(path))
+    return path
+
+
+def _eda(tmp_path, monkeypatch, modo):
+    out = tmp_path / f"eda_{modo}.csv"
+    monkeypatch.setattr(analisis_datos, "OUT_CSV", str(out))
+    monkeypatch.setattr(analisis_datos, "EDA_MODO", modo)
+    analisis_datos.main(reconciliar=False)
+    return estadisticas.filas_snapshot(str(out))
+
+
+def test_bloques_igual_a_una_pasada(export, tmp_path, monkeypatch):
+    monkeypatch.setattr(eda_bloques, "EDA_PROCESOS", 0)
+    monkeypatch.setattr(eda_bloques, "EDA_BLOQUE_MB", 16 / 1024)  # ~16 KB: decenas de bloques
+    assert len(list(eda_bloques.rangos(str(export), 16 * 1024, eda_bloques._encabezado(str(export))[1]))) > 10
+    assert _eda(tmp_path, monkeypatch, "bloques") == _eda(tmp_path, monkeypatch, "memoria")
+
+
+def test_pool_y_parquet_dan_lo_mismo(export, monkeypatch):
+    esperado = eda_bloques.calcular(str(export), procesos=0, bloque_mb=1024)
+    assert esperado["total"] == 1200
+    assert eda_bloques.calcular(str(export), procesos=2, bloque_mb=16 / 1024) == esperado
+
+    monkeypatch.setattr(columnar, "CHUNK", 250)  # varios row groups
+    columnar.csv_a_parquet(str(export))
+    assert columnar.vigente(columnar.ruta_parquet(str(export)), str(export))
+    assert eda_bloques.calcular(str(export), procesos=0) == esperado
@@ -0,0 +1,62 @@
+import json
+import threading
+
+import pytest
+import sintetico
+
+from backend import agregados, estadisticas
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    monkeypatch.setattr(estadisticas, "SNAPSHOT_PATH", str(tmp_path / "eda_ia.snapshot"))
+    monkeypatch.setattr(estadisticas, "EDA_CSV", str(tmp_path / "eda_ia_consolidado.csv"))
+    monkeypatch.setattr(estadisticas, "_actual", {"snapshot": None})
+    monkeypatch.setattr(estadisticas, "ESTADISTICAS_INTERVALO", 60)
+    src = sintetico.escribir_csv(str(tmp_path / "respuestas_ia.csv"), 50)
+    agregados.reconstruir(src, str(tmp_path / "sin_ids"))
+    return monkeypatch
+
+
+def _total(snap):
+    cuerpo = json.loads(snap.respuesta(("resumen",))[1])
+    return next(f["value"] for f in cuerpo["datasets"]["resumen"] if f["metric"] == "total_respuestas")
+
+
+def test_publicaciones_seguidas_se_juntan(stats):
+    primero = estadisticas.vigente()
+    assert primero.version == agregados.version() and _total(primero) == 50
+
+    agregados.registrar(sintetico.respuesta_i(100), "n1")
+    assert estadisticas.vigente() is primero  # dentro del intervalo: se sirve el anterior
+
+    stats.setattr(estadisticas, "ESTADISTICAS_INTERVALO", 0)
+    nuevo = estadisticas.vigente()
+    assert nuevo.version == agregados.version() and _total(nuevo) == 51
+
+
+def test_publica_fuera_del_lock(stats):
+    primero = estadisticas.vigente()
+    stats.setattr(estadisticas, "ESTADISTICAS_INTERVALO", 0)
+    agregados.registrar(sintetico.respuesta_i(100), "n1")
+
+    serializar = estadisticas.serializar
+    dentro, seguir = threading.Event(), threading.Event()
+    servidos = []
+
+    def lento(version, datasets):
+        assert not estadisticas._lock.locked()
+        dentro.set()
+        seguir.wait(5)
+        return serializar(version, datasets)
+
+    stats.setattr(estadisticas, "serializar", lento)
+    hilo = threading.Thread(target=lambda: servidos.append(estadisticas.vigente()))
+    hilo.start()
+    assert dentro.wait(5)
+    # mientras otro hilo republica, una consulta responde con el snapshot anterior sin esperar
+    assert estadisticas.vigente() is primero
+    seguir.set()
+    hilo.join(5)
+    assert servidos[0].version == agregados.version()
+    assert estadisticas.vigente() is servidos[0]
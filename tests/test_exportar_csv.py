@@ -0,0 +1,88 @@
+import json
+import os
+import time
+
+import sintetico
+
+from backend import columnar, exportar_csv, trabajos
+
+
+def _sembrar(alm, desde, hasta):
+    for i in range(desde, hasta):
+        alm.guardar(sintetico.respuesta_i(i, creado_en=f"2026-03-01T10:{i:02d}:00.000+00:00"), f"d{i}")
+    time.sleep(0.002)  # $updatedAt con resolución de ms
+
+
+def _esperar(trabajo, limite=10):
+    fin = time.time() + limite
+    while trabajos.estado(trabajo["id"])["estado"] in trabajos.ACTIVOS and time.time() < fin:
+        time.sleep(0.02)
+    return trabajos.estado(trabajo["id"])
+
+
+def test_incremental_igual_al_completo(export_aislado):
+    alm = export_aislado
+    _sembrar(alm, 0, 30)
+    exportar_csv.exportar(incremental=False)
+    assert columnar.vigente(columnar.ruta_parquet(exportar_csv.CSV_PATH), exportar_csv.CSV_PATH)
+
+    _sembrar(alm, 30, 35)
+    alm.guardar_lote([(f"d{i}", {**sintetico.respuesta_i(i), "edad": 50 + i}) for i in (3, 4)])
+    exportar_csv.exportar()
+    incremental = open(exportar_csv.CSV_PATH, "rb").read()
+    ids = open(exportar_csv.IDS_PATH).read().split()
+    with open(exportar_csv.STATE_PATH) as f:
+        estado = json.load(f)
+    assert ids == [f"d{i}" for i in range(35)]
+    assert estado["updated_at"] == max(d["$updatedAt"] for pagina in alm.paginas() for d in pagina)
+
+    # sin cambios en el almacén el CSV queda igual
+    exportar_csv.exportar()
+    assert open(exportar_csv.CSV_PATH, "rb").read() == incremental
+
+    exportar_csv.exportar(incremental=False)
+    assert open(exportar_csv.CSV_PATH, "rb").read() == incremental
+
+
+def test_parquet_en_segundo_plano_con_intervalo(export_aislado, monkeypatch):
+    alm = export_aislado
+    monkeypatch.setattr(columnar, "PARQUET_INTERVALO", 0.5)
+    parquet = columnar.ruta_parquet(exportar_csv.CSV_PATH)
+    _sembrar(alm, 0, 10)
+    exportar_csv.exportar(incremental=False)
+
+    _sembrar(alm, 10, 12)
+    exportar_csv.exportar(fondo=True)  # primera reescritura: sin espera
+    primero = trabajos.ultimo("parquet-respuestas_ia")
+    assert _esperar(primero)["estado"] == "terminado"
+    assert columnar.vigente(parquet, exportar_csv.CSV_PATH)
+
+    # dos exports seguidos dentro del intervalo: una sola reescritura, más tarde
+    _sembrar(alm, 12, 13)
+    exportar_csv.exportar(fondo=True)
+    segundo = trabajos.ultimo("parquet-respuestas_ia")
+    assert segundo["id"] != primero["id"]
+    assert not columnar.vigente(parquet, exportar_csv.CSV_PATH)
+    _sembrar(alm, 13, 14)
+    exportar_csv.exportar(fondo=True)
+    assert trabajos.ultimo("parquet-respuestas_ia")["id"] == segundo["id"]
+    assert _esperar(segundo)["estado"] == "terminado"
+    assert columnar.vigente(parquet, exportar_csv.CSV_PATH)
+    assert columnar.leer(parquet).num_rows == 14
+
+
+def test_lote_con_la_misma_marca_no_reescribe(export_aislado):
+    alm = export_aislado
+    alm.guardar_lote([(f"d{i}", sintetico.respuesta_i(i)) for i in range(8)])  # mismo $updatedAt
+    exportar_csv.exportar(incremental=False)
+    antes = os.stat(exportar_csv.CSV_PATH)
+
+    exportar_csv.exportar()
+    despues = os.stat(exportar_csv.CSV_PATH)
+    assert (despues.st_ino, despues.st_mtime_ns) == (antes.st_ino, antes.st_mtime_ns)
+
+    # un cambio posterior sí entra
+    time.sleep(0.002)
+    alm.guardar_lote([("d3", {**sintetico.respuesta_i(3), "edad": 77})])
+    exportar_csv.exportar()
+    assert "77" in open(exportar_csv.CSV_PATH, encoding="utf-8-sig").read().splitlines()[4].split(",")
@@ -0,0 +1,59 @@
+import pytest
+import sintetico
+
+from backend import app as app_mod
+from backend import idempotencia
+
+
+@pytest.fixture
+def cliente(export_aislado):
+    return app_mod.app.test_client()
+
+
+def _payload(i, **cambios):
+    p = {k: v for k, v in sintetico.respuesta_i(i).items() if k != "creado_en"}
+    return {**p, **cambios}
+
+
+def _n(alm):
+    return sum(len(pagina) for pagina in alm.paginas())
+
+
+def test_reintento_con_la_misma_clave(cliente, export_aislado):
+    primera = cliente.post("/api/response", json=_payload(1), headers={"Idempotency-Key": "envio-1"})
+    segunda = cliente.post("/api/response", json=_payload(1), headers={"Idempotency-Key": "envio-1"})
+    assert primera.status_code == 201
+    assert segunda.status_code == 201 and segunda.headers["Idempotent-Replayed"] == "true"
+    assert segunda.get_json() == primera.get_json()
+    assert _n(export_aislado) == 1
+
+
+def test_misma_clave_con_otras_respuestas(cliente, export_aislado):
+    assert cliente.post("/api/response", json=_payload(1), headers={"Idempotency-Key": "envio-1"}).status_code == 201
+    otra = cliente.post("/api/response", json=_payload(2), headers={"Idempotency-Key": "envio-1"})
+    assert otra.status_code == 422
+    assert _n(export_aislado) == 1
+
+
+def test_respondente_id_no_es_clave(cliente, export_aislado):
+    # la misma persona responde dos veces: las dos se guardan
+    for i in (1, 2):
+        assert cliente.post("/api/response", json=_payload(i, respondente_id="r-7")).status_code == 201
+    assert _n(export_aislado) == 2
+
+
+def test_conflicto_del_almacen_compara_el_contenido(cliente, export_aislado):
+    """Sin la fila en la tabla de claves (podada), el 409 del almacén decide por el contenido guardado."""
+    primera = cliente.post("/api/response", json=_payload(1), headers={"Idempotency-Key": "envio-1"})
+    idempotencia._conn().execute("DELETE FROM idempotencia")
+
+    mismo = cliente.post("/api/response", json=_payload(1), headers={"Idempotency-Key": "envio-1"})
+    assert mismo.status_code == 200
+    cuerpo = mismo.get_json()
+    assert cuerpo["duplicado"] and cuerpo["id"] == primera.get_json()["id"]
+    assert cuerpo["creado_en"] == primera.get_json()["creado_en"]
+
+    idempotencia._conn().execute("DELETE FROM idempotencia")
+    otra = cliente.post("/api/response", json=_payload(2), headers={"Idempotency-Key": "envio-1"})
+    assert otra.status_code == 422
+    assert _n(export_aislado) == 1
@@ -0,0 +1,74 @@
+import json
+
+import sintetico
+
+from backend import agregados, importar
+
+
+def _ndjson(payloads):
+    return "\n".join(json.dumps(p, ensure_ascii=False) for p in payloads) + "\n"
+
+
+def _ids(almacen):
+    return [d["$id"] for pagina in almacen.paginas() for d in pagina]
+
+
+def test_reimportar_no_duplica(export_aislado):
+    payloads = [sintetico.respuesta_i(i) for i in range(30)]
+    texto = _ndjson(payloads + [payloads[0]])  # la última repite la primera
+
+    primero = importar.importar_texto(texto, "ndjson", procesos=0, lote=7)
+    assert (primero["validas"], primero["repetidas"], primero["guardadas"]) == (31, 1, 30)
+    ids = _ids(export_aislado)
+    assert len(ids) == 30
+
+    segundo = importar.importar_texto(texto, "ndjson", procesos=0, lote=7)
+    assert segundo["guardadas"] == 30 and segundo["rechazadas"] == 0
+    assert _ids(export_aislado) == ids
+    assert agregados.leer()["total"] == 30
+
+
+def test_sin_creado_en_el_id_no_depende_de_la_hora():
+    p = {k: v for k, v in sintetico.respuesta_i(3).items() if k != "creado_en"}
+    (ok1, d1, id1), = importar.procesar("json", [p])
+    (ok2, d2, id2), = importar.procesar("json", [dict(p)])
+    assert ok1 and ok2 and id1 == id2 and len(id1) <= 36
+    (_, _, otro), = importar.procesar("json", [{**p, "creado_en": "2024-01-01T00:00:00+00:00"}])
+    assert otro != id1
+
+
+def test_reporte_de_errores_csv():
+    validas = [sintetico.fila_csv(sintetico.respuesta_i(i)) for i in range(3)]
+    header = [*validas[0], "creado_en"]
+    filas = [
+        validas[0],
+        {**validas[1], "edad": "200"},
+        {**validas[2], "facultad": "nada"},
+        {**validas[0], "creado_en": "ayer"},
+    ]
+    lineas = [",".join(header)] + [",".join(f'"{f.get(c, "")}"' for c in header) for f in filas]
+    lineas.append('"solo una columna"')
+    reporte = importar.importar_texto("\n".join(lineas) + "\n", "csv", guardar=False, procesos=0)
+
+    assert (reporte["total"], reporte["validas"], reporte["rechazadas"]) == (5, 1, 4)
+    errores = {e["fila"]: e["errores"] for e in reporte["errores"]}
+    assert list(errores) == [3, 4, 5, 6]
+    assert set(errores[3]) == {"edad"}
+    assert errores[4] == {"facultad": "Valor inválido: nada"}
+    assert errores[5]["_"].startswith("Fila ilegible")
+    assert errores[6]["_"].startswith(f"Fila ilegible: se esperaban {len(header)} columnas")
+
+
+def test_endpoint_desactivado_sin_token(export_aislado, monkeypatch):
+    from backend import app as app_mod
+
+    cliente = app_mod.app.test_client()
+    cuerpo = _ndjson([sintetico.respuesta_i(1)])
+    assert cliente.post("/api/responses/batch", data=cuerpo, content_type="application/x-ndjson").status_code == 404
+
+    monkeypatch.setattr(app_mod, "IMPORT_TOKEN", "clave")
+    assert cliente.post("/api/responses/batch", data=cuerpo, content_type="application/x-ndjson").status_code == 401
+    ok = cliente.post("/api/responses/batch", data=cuerpo, content_type="application/x-ndjson",
+                      headers={"Authorization": "Bearer clave"})
+    assert ok.status_code == 200 and ok.get_json()["guardadas"] == 1
+    assert len(_ids(export_aislado)) == 1
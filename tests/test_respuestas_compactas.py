@@ -0,0 +1,64 @@
+import pandas as pd
+import sintetico
+
+from backend.respuestas_compactas import DESBORDE, EDAD_NULA, MAX_MULTI, MAX_SIMPLE, SIN_DATO, RespuestasCompactas
+from backend.utils import vocabulario
+
+
+def test_edad_no_entera_es_invalida():
+    store = RespuestasCompactas()
+    for edad in (20, "21", "22.0", 20.7, "x", None, 300):
+        store.agregar({**sintetico.respuesta_i(0), "edad": edad})
+    assert store.edad.tolist() == [20, 21, 22, EDAD_NULA, EDAD_NULA, EDAD_NULA, EDAD_NULA]
+
+    bloque = RespuestasCompactas()
+    bloque.extender_dataframe(pd.DataFrame({"edad": ["20", "21", "22.0", "20.7", "x", "", "300"]}))
+    assert bloque.edad.tolist() == store.edad.tolist()
+
+
+def test_multi_con_muchos_valores_no_se_descarta():
+    store = RespuestasCompactas()
+    libres = [f"otra-{i}" for i in range(20)]  # fuera del vocabulario: antes se perdían pasando 16
+    store.agregar({"herramientas": libres})
+    assert store.filtrar(herramientas=[libres[-1]]).tolist() == [True]
+    assert store.bits("herramientas").sum() == len(libres)
+
+
+
+def test_valores_que_no_caben_van_a_desborde(capsys):
+    store = RespuestasCompactas()
+    store.agregar({"herramientas": [f"mas-{i}" for i in range(MAX_MULTI)]})
+    assert store.cats["herramientas"][-1] == DESBORDE and len(store.cats["herramientas"]) == MAX_MULTI
+    assert store.filtrar(herramientas=[DESBORDE]).tolist() == [True]
+    assert "herramientas" in capsys.readouterr().out
+
+    bloque = RespuestasCompactas()
+    bloque.extender_dataframe(pd.DataFrame({
+        "usos": [";".join(f"u{i}" for i in range(MAX_MULTI + 1))],
+        "carrera": ["c0"],
+    }))
+    bloque.extender_dataframe(pd.DataFrame({"carrera": [f"c{i}" for i in range(MAX_SIMPLE + 10)]}))
+    assert bloque.n == 1 + MAX_SIMPLE + 10
+    assert bloque.cats["carrera"][-1] == DESBORDE and len(bloque.cats["carrera"]) == MAX_SIMPLE - 1
+    assert (bloque.simple("carrera") != SIN_DATO).all()
+
+
+def test_eda_con_valores_desbordados(tmp_path, monkeypatch):
+    from backend import analisis_datos, estadisticas
+
+    rows = [sintetico.fila_csv(p) for p in sintetico.respuestas(400)]
+    for i, row in enumerate(rows):
+        row["carrera"] = f"carrera-heredada-{i}"
+        row["herramientas"] += f";herramienta-{i % 50}"
+    src = tmp_path / "respuestas_ia.csv"
+    pd.DataFrame(rows).to_csv(src, index=False, encoding="utf-8-sig")
+    monkeypatch.setattr(analisis_datos, "SRC_CSV", str(src))
+    monkeypatch.setattr(analisis_datos, "OUT_CSV", str(tmp_path / "eda.csv"))
+    monkeypatch.setattr(analisis_datos, "EDA_MODO", "memoria")
+    analisis_datos.main(reconciliar=False)
+
+    filas = estadisticas.filas_snapshot(str(tmp_path / "eda.csv"))
+    total = next(f["value"] for f in filas if f["metric"] == "total_respuestas")
+    por_carrera = {f["carrera"]: f["conteo"] for f in filas if f["dataset"] == "por_carrera"}
+    assert total == 400 and sum(por_carrera.values()) == 400
+    assert por_carrera[DESBORDE] == 400 - (MAX_SIMPLE - 2 - len(vocabulario("carrera")))
@@ -0,0 +1,47 @@
+import os
+import threading
+import time
+
+import pytest
+
+from backend import trabajos
+
+
+@pytest.fixture(autouse=True)
+def locks(tmp_path, monkeypatch):
+    monkeypatch.setattr(trabajos, "LOCK_DIR", str(tmp_path))
+
+
+def _esperar(trabajo):
+    while trabajos.estado(trabajo["id"])["estado"] in trabajos.ACTIVOS:
+        time.sleep(0.01)
+
+
+def _insertar_activo(pid, arranque):
+    trabajos._conn().execute(
+        "INSERT INTO trabajos (id, tipo, estado, pid, arranque, creado, etapas) "
+        "VALUES ('viejo', 'prueba', 'corriendo', ?, ?, ?, '[]')",
+        (pid, arranque, time.time()),
+    )
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/stat"), reason="requiere /proc")
+def test_pid_reutilizado_no_mantiene_vivo_el_trabajo():
+    assert trabajos._arranque(os.getpid()) == trabajos._arranque(os.getpid()) is not None
+    # mismo pid (este proceso) pero otro arranque: el proceso que lo corría ya no existe
+    _insertar_activo(os.getpid(), "otro-boot:1")
+    trabajo, nuevo = trabajos.iniciar("prueba", [("nada", lambda: None)])
+    assert nuevo and trabajo["id"] != "viejo"
+    _esperar(trabajo)
+    viejo = trabajos.estado("viejo")
+    assert (viejo["estado"], viejo["error"]) == ("error", "interrumpido")
+
+
+def test_trabajo_en_curso_se_comparte():
+    listo = threading.Event()
+    primero, nuevo = trabajos.iniciar("prueba", [("esperar", lambda: listo.wait(5))])
+    segundo, otra_vez = trabajos.iniciar("prueba", [("esperar", lambda: None)])
+    listo.set()
+    assert nuevo and not otra_vez and segundo["id"] == primero["id"]
+    _esperar(primero)
+
@@ -0,0 +1,53 @@
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from validacion import payload_aleatorio, payload_valido, validate_payload_original
+
+from backend.utils import ENUMS, ARRAY_FIELDS, REQUIRED_ENUMS, validate_many, validate_payload
+
+RAIZ = Path(__file__).resolve().parents[1]
+
+
+def _sin_timestamp(res):
+    ok, d = res
+    return ok, {k: v for k, v in d.items() if k != "creado_en"}
+
+
+@pytest.mark.parametrize("semilla", [1, 2, 3])
+def test_igual_al_validador_original(semilla):
+    rng = random.Random(semilla)
+    payloads = [payload_aleatorio(rng) for _ in range(3000)] + [payload_valido(rng) for _ in range(500)]
+    payloads += [{}, {"facultad": 3, "usos": [1, "x"]}, {"herramientas": ["chatgpt", "chatgpt"]}]
+    for p in payloads:
+        assert _sin_timestamp(validate_payload(p)) == _sin_timestamp(validate_payload_original(p)), p
+    lote = validate_many(payloads)
+    assert [_sin_timestamp(r) for r in lote] == [_sin_timestamp(validate_payload(p)) for p in payloads]
+    assert len({r[1].get("creado_en") for r in lote if r[0]}) == 1
+
+
+def test_valores_no_hashables_son_invalidos():
+    ok, errores = validate_payload({"facultad": ["lista"], "usos": [["x"]]})
+    assert not ok
+    assert errores["facultad"] == "Valor inválido: ['lista']"
+    assert errores["usos"] == "Valores inválidos: [['x']]"
+
+
+def test_orden_de_errores_fijo():
+    ok, errores = validate_payload({})
+    arreglos = [f for f in ENUMS if f in ARRAY_FIELDS]
+    assert not ok
+    assert list(errores) == ["nombre_completo", "edad", *REQUIRED_ENUMS, *arreglos]
+
+    # Mismo orden con otra semilla de hash de strings (antes dependía del set ARRAY_FIELDS).
+    codigo = "from backend.utils import validate_payload; print(list(validate_payload({})[1]))"
+    salidas = {
+        subprocess.run(
+            [sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+            env={"PYTHONHASHSEED": str(seed), "PATH": ""}, cwd=RAIZ,
+        ).stdout
+        for seed in (0, 1, 2, 3)
+    }
+    assert salidas == {str(list(errores)) + "\n"}